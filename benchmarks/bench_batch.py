@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+批量调度 vs 逐个处理压缩包 的基准测试
+
+生成若干大小不一的压缩包（大小按几何级数分布，模拟一次投递里有大有小），
+分别用「逐个压缩包并行解压」和「批量调度共用一个工作池」处理，比较总耗时。
+
+用法: python benchmarks/bench_batch.py [--archives 24] [--workers 8] [--pool thread]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.batch import BatchScheduler, collect_archives
+from filemover.engine import FileMoverEngine, ProcessOptions
+from filemover.matcher import KeywordMatcher
+from filemover.parallel import POOL_KINDS, POOL_THREAD
+
+
+def make_archives(directory, count, base_entries):
+    """第 i 个压缩包约有 base_entries * 1.25^i 个成员"""
+    line = b"FileMover batch benchmark 0123456789abcdefghijklmnopqrstuvwxyz\n"
+    payload = line * 256
+    for i in range(count):
+        entries = int(base_entries * 1.25 ** (i % 12))
+        with zipfile.ZipFile(os.path.join(directory, f"drop_{i:03d}.zip"), "w",
+                             zipfile.ZIP_DEFLATED) as zf:
+            for k in range(entries):
+                name = "report" if k % 3 == 0 else "data"
+                zf.writestr(f"d{k % 20}/{name}_{k}.txt", payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--archives", type=int, default=24)
+    parser.add_argument("--entries", type=int, default=300, help="最小压缩包的成员数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--pool", choices=POOL_KINDS, default=POOL_THREAD)
+    parser.add_argument("--max-open", type=int, default=4)
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher(["report"])
+    with tempfile.TemporaryDirectory() as work:
+        inbound = os.path.join(work, "inbound")
+        os.makedirs(inbound)
+        make_archives(inbound, args.archives, args.entries)
+        archives = collect_archives([inbound])
+        print(f"{len(archives)} 个压缩包，{args.workers} 个工作者，{args.pool} 工作池")
+
+        out = os.path.join(work, "sequential")
+        engine = FileMoverEngine()
+        options = ProcessOptions("copy", workers=args.workers, pool_kind=args.pool)
+        start = time.perf_counter()
+        for archive_path in archives:
+            name = os.path.splitext(os.path.basename(archive_path))[0]
+            engine.process(archive_path, matcher, os.path.join(out, name), options)
+        sequential = time.perf_counter() - start
+        shutil.rmtree(out)
+
+        out = os.path.join(work, "batch")
+        # 与逐个处理用同样的选项（运行日志、空间检查都开启）
+        scheduler = BatchScheduler(args.workers, args.pool, args.max_open, engine=FileMoverEngine(),
+                                   options=options)
+        start = time.perf_counter()
+        results = scheduler.run(archives, matcher, out)
+        batched = time.perf_counter() - start
+        assert all(r.error is None and r.failed_count == 0 for r in results)
+
+        print(f"逐个处理:   {sequential:8.3f} s")
+        print(f"批量调度:   {batched:8.3f} s")
+        print(f"加速比:     {sequential / batched:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+按内容匹配的扫描速度基准测试
+
+生成一个日志压缩包（默认 200 个 4 MB 的日志，约三分之一在末尾提到订单号），
+先测纯内存中的扫描速度（不含解压），再用 1、2、4…… 个工作者（线程池和进程池）
+扫描整个压缩包，报告每秒扫描的 MB 数以及平均每个工作者（核）的 MB/s。
+
+用法: python benchmarks/bench_content.py [--files 200] [--mb 4] [--keywords 50]
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.content import ContentMatcher, scan_archive
+from filemover.index import ArchiveIndex
+from filemover.matcher import KeywordMatcher
+from filemover.parallel import POOL_KINDS
+
+
+def make_log(size, order_id=None):
+    """size 字节的日志；给出 order_id 时写在最后一行（最坏情况：扫到末尾才命中）"""
+    line = b"2025-06-24 12:00:00 INFO request handled user=42 latency=13ms path=/api/v1/items\n"
+    data = (line * (size // len(line) + 1))[:size]
+    if order_id:
+        tail = f"ORDER-{order_id}\n".encode()
+        data = data[:size - len(tail)] + tail
+    return data
+
+
+def make_archive(path, files, size):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(files):
+            zf.writestr(f"logs/app_{i}.log", make_log(size, 10000 + i if i % 3 == 0 else None))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--mb", type=int, default=4, help="每个日志的大小（MB）")
+    parser.add_argument("--keywords", type=int, default=50, help="订单号关键字数量")
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    size = args.mb * 1024 * 1024
+    keywords = [f"ORDER-{10000 + 3 * k}" for k in range(args.keywords)]
+    content = ContentMatcher(KeywordMatcher(keywords))
+    worker_counts = args.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+
+    # 纯扫描：数据已在内存中，只有正则搜索的开销
+    data = make_log(size)
+    start = time.perf_counter()
+    rounds = 0
+    while time.perf_counter() - start < 1.0:
+        content.scan(io.BytesIO(data))
+        rounds += 1
+    elapsed = time.perf_counter() - start
+    print(f"{len(keywords)} 个关键字，纯内存扫描: {rounds * size / elapsed / 1024 / 1024:.0f} MB/s")
+
+    with tempfile.TemporaryDirectory() as work:
+        archive_path = os.path.join(work, "logs.zip")
+        make_archive(archive_path, args.files, size)
+        index = ArchiveIndex.build(archive_path)
+        positions = list(range(len(index)))
+        total_mb = sum(index.file_sizes) / 1024 / 1024
+        print(f"{args.files} 个日志，共 {total_mb:.0f} MB（解压后），"
+              f"压缩包 {os.path.getsize(archive_path) / 1024 / 1024:.1f} MB")
+        print(f"{'工作池':<10}{'工作者':>6}{'耗时(s)':>10}{'MB/s':>10}{'MB/s/核':>10}{'命中':>6}")
+
+        for pool_kind in POOL_KINDS:
+            for workers in worker_counts:
+                start = time.perf_counter()
+                hits, scanned = scan_archive(archive_path, index, positions, content, workers,
+                                             pool_kind)
+                elapsed = time.perf_counter() - start
+                rate = scanned / elapsed / 1024 / 1024
+                print(f"{pool_kind:<10}{workers:>6}{elapsed:>10.3f}{rate:>10.0f}"
+                      f"{rate / min(workers, os.cpu_count() or 1):>10.0f}{len(hits):>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+增量处理的基准测试
+
+先完整处理一个压缩包，再生成只改动了一部分成员的新版本，
+分别用增量处理（CRC 缓存命中 / 缓存被删除需要重新计算）和完整重新处理，比较耗时。
+理想情况下增量处理的耗时与改动量成正比。
+
+用法: python benchmarks/bench_incremental.py [--entries 20000] [--size 16384] [--changed 0.01]
+"""
+
+import argparse
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.engine import FileMoverEngine, ProcessOptions
+from filemover.incremental import crc_cache_path
+from filemover.matcher import KeywordMatcher
+
+
+def make_archive(path, count, size, changed=()):
+    """第 i 个成员的内容由 i 决定，changed 中的成员内容不同"""
+    line = b"FileMover incremental benchmark 0123456789abcdef\n"
+    body = (line * (size // len(line) + 1))[:size - 16]
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(count):
+            tag = b"changed" if i in changed else b"original"
+            zf.writestr(f"d{i % 100}/file_{i}.txt", body + tag + str(i).encode().rjust(8))
+
+
+def timed(engine, archive_path, matcher, out, options):
+    start = time.perf_counter()
+    result = engine.process(archive_path, matcher, out, options)
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=16384, help="每个成员的大小（字节）")
+    parser.add_argument("--changed", type=float, default=0.01, help="新版本中改动的成员比例")
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+
+    matcher = KeywordMatcher(["file_1"])
+    step = max(1, int(1 / args.changed)) if args.changed > 0 else args.entries + 1
+    changed = set(range(0, args.entries, step))
+
+    with tempfile.TemporaryDirectory() as work:
+        old = os.path.join(work, "v1.zip")
+        new = os.path.join(work, "v2.zip")
+        make_archive(old, args.entries, args.size)
+        make_archive(new, args.entries, args.size, changed)
+        out = os.path.join(work, "out")
+
+        full = ProcessOptions("copy", workers=args.workers)
+        incremental = ProcessOptions("copy", workers=args.workers, incremental=True)
+        engine = FileMoverEngine()
+
+        # 第一次运行同时建立 CRC 缓存
+        initial, _ = timed(engine, old, matcher, out, incremental)
+        warm, result = timed(engine, new, matcher, out, incremental)
+        assert result.skipped_count == args.entries - len(changed), result
+
+        # 删掉 CRC 缓存，需要读目标文件计算 CRC
+        shutil.rmtree(out)
+        timed(engine, old, matcher, out, full)
+        for directory in glob.glob(os.path.join(out, "*")):
+            if os.path.exists(crc_cache_path(directory)):
+                os.remove(crc_cache_path(directory))
+        cold, _ = timed(engine, new, matcher, out, incremental)
+        shutil.rmtree(out)
+
+        rerun, _ = timed(engine, new, matcher, out, full)
+
+        print(f"{args.entries} 个成员，每个 {args.size} 字节，改动 {len(changed)} 个 "
+              f"({len(changed) / args.entries:.1%})")
+        print(f"首次处理:            {initial:8.3f} s")
+        print(f"完整处理新版本:      {rerun:8.3f} s")
+        print(f"增量处理（缓存命中）: {warm:8.3f} s  ({warm / rerun:.1%})")
+        print(f"增量处理（无缓存）:   {cold:8.3f} s  ({cold / rerun:.1%})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+预览列表基准测试：百万个成员的压缩包打开多快、滚动一页要多久
+
+生成一个有 --entries 个空文件的 ZIP（默认 100 万个，生成需要半分钟左右），报告：
+原来用 zipfile 建立索引的耗时、预览列表显示第一页的耗时、读完并分类全部成员的耗时，
+修改关键字（缩小范围 / 换成无关的关键字）后重新分类的耗时，随机取一页的平均耗时，
+以及列表占用的内存（索引加各列数组，与可见行数无关）。
+
+用法: python benchmarks/bench_listing.py [--entries 1000000] [--rows 12]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.index import ArchiveIndex
+from filemover.listing import VIEW_ALL, VIEW_MATCHED, PreviewListing
+from filemover.matcher import KeywordMatcher
+
+
+def make_archive(path, entries):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(entries):
+            zf.writestr(f"data/part{i % 1000}/report_{i}.csv", b"")
+
+
+def wait_done(listing):
+    while not listing.status().done:
+        if listing.status().error:
+            raise RuntimeError(listing.status().error)
+        time.sleep(0.005)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1000000)
+    parser.add_argument("--rows", type=int, default=12, help="一页的行数")
+    parser.add_argument("--pages", type=int, default=2000, help="随机取多少页")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        archive_path = os.path.join(work, "many.zip")
+        start = time.perf_counter()
+        make_archive(archive_path, args.entries)
+        print(f"生成 {args.entries} 个成员的压缩包: {time.perf_counter() - start:.1f} 秒，"
+              f"{os.path.getsize(archive_path) / 1024 / 1024:.1f} MB")
+
+        start = time.perf_counter()
+        ArchiveIndex.build(archive_path)
+        print(f"zipfile 建立索引（原来打开前要等待的时间）: {time.perf_counter() - start:.2f} 秒")
+
+        output_dir = os.path.join(work, "out")
+        start = time.perf_counter()
+        listing = PreviewListing(archive_path, output_dir)
+        listing.start(KeywordMatcher(["report_1"]))
+        while listing.count() < args.rows and not listing.status().error:
+            time.sleep(0.0005)
+        print(f"显示第一页: {(time.perf_counter() - start) * 1000:.0f} ms")
+        wait_done(listing)
+        print(f"读完并分类全部成员: {time.perf_counter() - start:.2f} 秒，"
+              f"匹配 {listing.count(VIEW_MATCHED)} 个")
+        print(f"列表占用内存: {listing.nbytes / 1024 / 1024:.1f} MB，"
+              f"其中索引 {listing.index.nbytes / 1024 / 1024:.1f} MB")
+
+        for label, keywords in [("缩小范围 report_1 -> report_12", ["report_12"]),
+                                ("换成无关的关键字", ["part7/"])]:
+            start = time.perf_counter()
+            listing.set_matcher(KeywordMatcher(keywords))
+            wait_done(listing)
+            print(f"{label}: {time.perf_counter() - start:.2f} 秒，"
+                  f"匹配 {listing.count(VIEW_MATCHED)} 个")
+
+        rng = random.Random(0)
+        for view in (VIEW_ALL, VIEW_MATCHED):
+            count = listing.count(view)
+            start = time.perf_counter()
+            for _ in range(args.pages):
+                listing.rows(view, rng.randrange(max(1, count - args.rows)), args.rows)
+            elapsed = time.perf_counter() - start
+            print(f"随机取一页（{view}，{args.rows} 行）: {elapsed / args.pages * 1e6:.0f} µs")
+        listing.close()
+
+
+if __name__ == "__main__":
+    main()
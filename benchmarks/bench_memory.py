@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+省内存模式基准测试：成员数以百万计的 ZIP，峰值内存随成员数怎样增长
+
+为每个 --entries（默认 50 万和 500 万）直接按 ZIP 格式写出一个只有空文件的压缩包
+（不经过 zipfile），每种做法在单独的子进程中运行，报告耗时和峰值内存（VmHWM）：
+  zipfile        原来的做法：ZipFile.filelist 加上去掉目录后的列表
+  index          建立完整的紧凑索引（ArchiveIndex.build，逐块解析中央目录）
+  process        普通处理（完整索引、匹配标记）
+  low-preview    省内存模式的预览（逐块读取中央目录统计）
+  low-process    省内存模式的处理
+处理只解压少量匹配的文件、跳过未匹配的文件，测量的是随成员数增长的部分，而不是写文件。
+省内存模式的峰值内存应当基本不随成员数变化。
+
+用法: python benchmarks/bench_memory.py [--entries 500000 5000000] [--modes zipfile low-process]
+"""
+
+import argparse
+import os
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from filemover.engine import UNMATCHED_SKIP, FileMoverEngine, ProcessOptions
+from filemover.index import ArchiveIndex
+from filemover.matcher import KeywordMatcher
+
+MODES = ("zipfile", "index", "process", "low-preview", "low-process")
+
+# 匹配约千分之一的成员（report_1234 开头的序号）
+KEYWORDS = ["report_1234"]
+
+_LOCAL = struct.Struct("<4s5H3L2H")
+_CENTRAL = struct.Struct("<4s6H3L5H2L")
+_ZIP64_END = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_END = struct.Struct("<4s4H2LH")
+
+
+def make_archive(path, entries):
+    """写出 entries 个空文件（STORED）的 ZIP64 压缩包；中央目录先写到临时文件再接在后面"""
+    with open(path, "wb", buffering=1024 * 1024) as f, \
+            tempfile.TemporaryFile(buffering=1024 * 1024) as central:
+        offset = 0
+        for i in range(entries):
+            name = f"data/part{i % 1000}/report_{i}.csv".encode()
+            f.write(_LOCAL.pack(b"PK\003\004", 20, 0, 0, 0, 0x21, 0, 0, 0, len(name), 0))
+            f.write(name)
+            central.write(_CENTRAL.pack(b"PK\001\002", 20, 20, 0, 0, 0, 0x21, 0, 0, 0,
+                                        len(name), 0, 0, 0, 0, 0, offset))
+            central.write(name)
+            offset += _LOCAL.size + len(name)
+        central_size = central.tell()
+        central.seek(0)
+        shutil.copyfileobj(central, f, 1024 * 1024)
+        end = offset + central_size
+        f.write(_ZIP64_END.pack(b"PK\006\006", _ZIP64_END.size - 12, 45, 45, 0, 0,
+                                entries, entries, central_size, offset))
+        f.write(_ZIP64_LOCATOR.pack(b"PK\006\007", 0, end, 1))
+        f.write(_END.pack(b"PK\005\006", 0, 0, 0xFFFF, 0xFFFF, 0xFFFFFFFF, 0xFFFFFFFF, 0))
+
+
+def peak_rss_mb():
+    """本进程的峰值常驻内存（MB）"""
+    with open("/proc/self/status", "r") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def run_child(mode, archive_path, work):
+    """在子进程中执行一种做法，输出 耗时 峰值内存 匹配数"""
+    matcher = KeywordMatcher(KEYWORDS)
+    engine = FileMoverEngine()
+    start = time.perf_counter()
+    if mode == "zipfile":
+        with zipfile.ZipFile(archive_path) as zip_file:
+            members = [f for f in zip_file.filelist if not f.is_dir()]
+            count = sum(1 for f in members if matcher.match(f.filename))
+    elif mode == "index":
+        count = len(ArchiveIndex.build(archive_path))
+    elif mode in ("process", "low-process"):
+        options = ProcessOptions("copy", unmatched_policy=UNMATCHED_SKIP, resume=False,
+                                 low_memory=mode == "low-process")
+        result = engine.process(archive_path, matcher, os.path.join(work, mode), options)
+        count = result.matched_count
+    else:
+        result = engine.preview(archive_path, matcher, ProcessOptions(low_memory=True))
+        count = result.matched_count
+    print(f"{time.perf_counter() - start} {peak_rss_mb()} {count}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, nargs="+", default=[500000, 5000000])
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_child(*args.child)
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as work:
+        for entries in args.entries:
+            archive_path = os.path.join(work, f"many_{entries}.zip")
+            start = time.perf_counter()
+            make_archive(archive_path, entries)
+            print(f"生成 {entries} 个成员的压缩包: {time.perf_counter() - start:.1f} 秒，"
+                  f"{os.path.getsize(archive_path) / 1024 / 1024:.0f} MB")
+            for mode in args.modes:
+                child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode,
+                                        archive_path, work], capture_output=True, text=True)
+                if child.returncode != 0:
+                    print(f"  {mode:12s} 失败（退出码 {child.returncode}）: "
+                          f"{child.stderr.strip().splitlines()[-1:]}")
+                    continue
+                seconds, peak, count = child.stdout.split()
+                results[mode, entries] = float(peak)
+                print(f"  {mode:12s} {float(seconds):7.2f} 秒  峰值内存 {float(peak):7.0f} MB  "
+                      f"匹配 {count}")
+            os.remove(archive_path)
+
+    if len(args.entries) > 1:
+        low, high = min(args.entries), max(args.entries)
+        print(f"成员数从 {low} 增加到 {high}，峰值内存的增加量：")
+        for mode in args.modes:
+            if (mode, low) in results and (mode, high) in results:
+                growth = results[mode, high] - results[mode, low]
+                per_entry = growth * 1024 * 1024 / (high - low)
+                print(f"  {mode:12s} {growth:+8.0f} MB（每个成员 {per_entry:.0f} 字节）")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+并行解压引擎的扩展性基准测试
+
+两种负载：大量小文件（默认 100k 个 1 KB），以及少量大文件（默认 8 个 64 MB）。
+对每种负载分别用 1、2、4、8 个工作者（线程池和进程池）解压并报告加速比。
+
+用法: python benchmarks/bench_parallel.py [--small 100000] [--huge 8] [--huge-mb 64]
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.index import ArchiveIndex
+from filemover.parallel import POOL_KINDS, ExtractTask, ParallelExtractor
+
+
+def make_archive(path, count, size, method):
+    """生成 count 个大小为 size 的成员（内容可压缩）"""
+    line = b"FileMover parallel benchmark line 0123456789abcdef\n"
+    payload = (line * (size // len(line) + 1))[:size]
+    with zipfile.ZipFile(path, "w", method) as zf:
+        for i in range(count):
+            zf.writestr(f"d{i % 100}/f_{i}.txt", payload)
+
+
+def plan(archive_path, out_dir):
+    """每个成员一个不重名的目标路径"""
+    index = ArchiveIndex.build(archive_path)
+    return [ExtractTask(index.zipinfo(i), os.path.join(out_dir, f"{i}.out"), index.file_sizes[i], True, i)
+            for i in range(len(index))]
+
+
+def bench(label, archive_path, work, worker_counts):
+    print(f"\n== {label} ==")
+    print(f"{'工作池':<10}{'工作者':>6}{'耗时(s)':>10}{'加速比':>8}")
+    for pool_kind in POOL_KINDS:
+        baseline = None
+        for workers in worker_counts:
+            out_dir = os.path.join(work, "out")
+            os.makedirs(out_dir)
+            tasks = plan(archive_path, out_dir)
+            start = time.perf_counter()
+            results = ParallelExtractor(archive_path, workers, pool_kind).run(tasks)
+            elapsed = time.perf_counter() - start
+            shutil.rmtree(out_dir)
+            assert all(results)
+            baseline = baseline or elapsed
+            print(f"{pool_kind:<10}{workers:>6}{elapsed:>10.3f}{baseline / elapsed:>7.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--small", type=int, default=100000)
+    parser.add_argument("--huge", type=int, default=8)
+    parser.add_argument("--huge-mb", type=int, default=64)
+    parser.add_argument("--workers", default="1,2,4,8")
+    args = parser.parse_args()
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    print(f"CPU 核数: {os.cpu_count()}")
+    with tempfile.TemporaryDirectory() as work:
+        small = os.path.join(work, "small.zip")
+        make_archive(small, args.small, 1024, zipfile.ZIP_DEFLATED)
+        bench(f"{args.small} 个 1 KB 小文件 (deflate)", small, work, worker_counts)
+        os.remove(small)
+
+        huge = os.path.join(work, "huge.zip")
+        make_archive(huge, args.huge, args.huge_mb * 1024 * 1024, zipfile.ZIP_DEFLATED)
+        bench(f"{args.huge} 个 {args.huge_mb} MB 大文件 (deflate)", huge, work, worker_counts)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+远程压缩包基准测试：通过 HTTP Range 按需读取时实际取回多少字节
+
+在本机启动一个支持 Range 和 If-Match 的静态文件服务（代替对象存储，标准库的 http.server
+不支持 Range），生成一个 --files 个成员、每个 --size 字节的 ZIP（数据不可压缩），报告：
+整个下载的耗时；预览（只取结尾记录和中央目录）、用 zipfile 列出成员、只解压约百分之一匹配的成员、
+解压全部成员时取回的字节数占压缩包大小的比例、请求次数和耗时。
+--latency-ms 给每个请求加上延迟，模拟对象存储的往返时间，看预读减少了多少请求。
+
+用法: python benchmarks/bench_remote.py [--files 2000] [--size 65536] [--latency-ms 5]
+"""
+
+import argparse
+import http.server
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.engine import UNMATCHED_SKIP, FileMoverEngine, ProcessOptions
+from filemover.matcher import KeywordMatcher
+from filemover.remote import forget, open_url, remote_stats
+
+
+class RangeRequestHandler(http.server.SimpleHTTPRequestHandler):
+    """静态文件服务：支持单段 Range、If-Match，返回强 ETag"""
+
+    latency = 0.0
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404)
+            return
+        with f:
+            st = os.fstat(f.fileno())
+            size = st.st_size
+            etag = f'"{size:x}-{st.st_mtime_ns:x}"'
+            if_match = self.headers.get("If-Match")
+            if if_match and if_match != etag:
+                self.send_error(412)
+                return
+            if self.latency:
+                time.sleep(self.latency)
+            match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+            if match is None:
+                start, end = 0, size - 1
+                self.send_response(200)
+            else:
+                start = int(match.group(1))
+                end = min(size - 1, int(match.group(2))) if match.group(2) else size - 1
+                if start >= size:
+                    self.send_error(416)
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+            self.send_header("Content-Length", str(end - start + 1))
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.end_headers()
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(directory, latency):
+    """在后台线程中启动服务，返回 (服务器, 基础地址)"""
+    handler = type("Handler", (RangeRequestHandler,), {"latency": latency})
+    server = http.server.ThreadingHTTPServer(
+        ("127.0.0.1", 0), lambda *a, **kw: handler(*a, directory=directory, **kw))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def make_archive(path, files, size):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(files):
+            name = f"data/report_{i}.bin" if i % 100 == 0 else f"data/other_{i}.bin"
+            zf.writestr(name, os.urandom(size))
+
+
+def report(label, url, start):
+    elapsed = time.perf_counter() - start
+    stats = remote_stats(url)
+    print(f"{label}: 取回 {stats.bytes_fetched / 1024 / 1024:8.2f} MB"
+          f"（{stats.bytes_fetched / stats.size * 100:5.1f}%），"
+          f"{stats.requests:5d} 次请求，{elapsed:6.2f} 秒")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="每个成员的字节数")
+    parser.add_argument("--latency-ms", type=float, default=5.0, help="每个请求额外的延迟")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        served = os.path.join(work, "served")
+        os.makedirs(served)
+        archive_path = os.path.join(served, "archive.zip")
+        make_archive(archive_path, args.files, args.size)
+        size = os.path.getsize(archive_path)
+        print(f"压缩包: {args.files} 个成员，{size / 1024 / 1024:.1f} MB，"
+              f"每个请求延迟 {args.latency_ms:g} ms")
+
+        server, base = serve(served, args.latency_ms / 1000)
+        url = base + "archive.zip"
+        try:
+            start = time.perf_counter()
+            with urllib.request.urlopen(url) as response, \
+                    open(os.path.join(work, "downloaded.zip"), "wb") as f:
+                shutil.copyfileobj(response, f, 1024 * 1024)
+            print(f"整个下载: {size / 1024 / 1024:8.2f} MB（100.0%），"
+                  f"    1 次请求，{time.perf_counter() - start:6.2f} 秒")
+
+            matcher = KeywordMatcher(["report_"])
+            scenarios = [
+                ("预览（中央目录）", lambda: FileMoverEngine().preview(url, matcher)),
+                ("zipfile 列出成员", lambda: zipfile.ZipFile(open_url(url)).namelist()),
+                ("只解压匹配的 1%", lambda: FileMoverEngine().process(
+                    url, matcher, os.path.join(work, "matched"),
+                    ProcessOptions("copy", unmatched_policy=UNMATCHED_SKIP, resume=False))),
+                ("解压全部成员", lambda: FileMoverEngine().process(
+                    url, matcher, os.path.join(work, "all"),
+                    ProcessOptions("copy", resume=False))),
+            ]
+            for label, run in scenarios:
+                # 每个场景从空缓存开始
+                forget(url)
+                start = time.perf_counter()
+                run()
+                report(f"{label:12s}", url, start)
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+直接打包输出的基准测试：与"解压到文件夹再打包"比较
+
+生成一个 ZIP（--entries 个成员，按 --size 字节的可压缩文本），分别测量：
+  folders+zip  原来的做法：复制模式解压到匹配/未匹配文件夹，再用 zipfile 把两个文件夹重新打成 ZIP
+  repack zip   直接打包输出为 ZIP（原样复制压缩数据）
+  repack tar   直接打包输出为 tar（解压后写入）
+以及顺序读一遍源压缩包的耗时作为下限参考。
+
+用法: python benchmarks/bench_repack.py [--entries 20000] [--size 4096]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from filemover.engine import (MATCHED_DIR_NAME, UNMATCHED_DIR_NAME, FileMoverEngine,
+                              ProcessOptions)
+from filemover.matcher import KeywordMatcher
+from filemover.repack import REPACK_TAR, REPACK_ZIP
+
+WORDS = ["alpha", "beta", "gamma", "delta", "report", "invoice", "total", "amount", "2024"]
+
+
+def make_archive(path, entries, size):
+    rng = random.Random(0)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for i in range(entries):
+            text = " ".join(rng.choice(WORDS) for _ in range(size // 6 + 1))[:size]
+            name = f"data/{'report' if i % 3 == 0 else 'other'}_{i}.txt"
+            zf.writestr(name, text.encode())
+
+
+def zip_folder(folder, path):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name in os.listdir(folder):
+            zf.write(os.path.join(folder, name), name)
+
+
+def timed(label, func, baseline=None):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    ratio = f"（{baseline / elapsed:.1f}x）" if baseline else ""
+    print(f"{label:<14}{elapsed:8.2f} 秒{ratio}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=4096, help="每个成员解压后的字节数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work:
+        archive_path = os.path.join(work, "source.zip")
+        make_archive(archive_path, args.entries, args.size)
+        print(f"{args.entries} 个成员，解压后 {args.entries * args.size / 1024 / 1024:.1f} MB，"
+              f"压缩包 {os.path.getsize(archive_path) / 1024 / 1024:.1f} MB")
+        matcher = KeywordMatcher(["report"])
+
+        def read_through():
+            with open(archive_path, "rb") as f:
+                while f.read(1024 * 1024):
+                    pass
+
+        def folders_then_zip():
+            output_dir = os.path.join(work, "folders")
+            FileMoverEngine().process(archive_path, matcher, output_dir,
+                                      ProcessOptions("copy", resume=False))
+            for label in (MATCHED_DIR_NAME, UNMATCHED_DIR_NAME):
+                zip_folder(os.path.join(output_dir, label), os.path.join(work, f"{label}.zip"))
+
+        def repack(fmt):
+            return lambda: FileMoverEngine().process(
+                archive_path, matcher, os.path.join(work, f"repack_{fmt}"),
+                ProcessOptions(repack=fmt, resume=False))
+
+        timed("顺序读一遍", read_through)
+        baseline = timed("folders+zip", folders_then_zip)
+        shutil.rmtree(os.path.join(work, "folders"))
+        timed("repack zip", repack(REPACK_ZIP), baseline)
+        timed("repack tar", repack(REPACK_TAR), baseline)
+
+
+if __name__ == "__main__":
+    main()
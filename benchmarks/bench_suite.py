@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+整条处理流程的基准测试套件：在本地生成合成压缩包，测量预览、匹配和各操作模式
+
+负载（压缩包按参数生成一次后缓存，同样的参数每次内容都相同）：
+  tiny      大量小文件
+  huge      少量大文件
+  dupnames  大量同名文件（重名处理）
+  stored / deflated / lzma  同一批中等大小的文件用三种压缩方式
+  deep      很深的目录路径
+
+场景：preview（冷启动预览，含解析中央目录）、match（只匹配关键字，索引已建立）、
+listing（预览列表读完并分类）、move / copy / link（完整处理到新的输出目录）、
+repack（直接打包输出为两个 ZIP）。
+
+每个场景在单独的子进程中运行，报告耗时、成员/秒、MB/秒（按解压后大小）、
+峰值内存（VmHWM / ru_maxrss），以及 Linux 下 /proc/self/io 中的读写系统调用次数和字节数
+（只统计子进程本身，--workers 大于 1 且使用进程池时工作进程的读写不计入）。
+结果写成 JSON，--compare 与之前（其他提交）的结果对比。
+
+用法: python benchmarks/bench_suite.py [--workloads tiny huge] [--scenarios preview copy]
+      [--scale 0.5] [--repeat 3] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from filemover.engine import OPERATION_MODES, FileMoverEngine, ProcessOptions
+from filemover.index import ArchiveIndex
+from filemover.listing import PreviewListing
+from filemover.matcher import KeywordMatcher
+from filemover.repack import REPACK_ZIP
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# 负载名 -> (成员数, 每个成员的字节数, 压缩方式)；成员数按 --scale 缩放
+WORKLOADS = {
+    "tiny": (20000, 256, zipfile.ZIP_DEFLATED),
+    "huge": (3, 48 * 1024 * 1024, zipfile.ZIP_DEFLATED),
+    "dupnames": (10000, 1024, zipfile.ZIP_DEFLATED),
+    "stored": (400, 64 * 1024, zipfile.ZIP_STORED),
+    "deflated": (400, 64 * 1024, zipfile.ZIP_DEFLATED),
+    "lzma": (400, 64 * 1024, zipfile.ZIP_LZMA),
+    "deep": (3000, 1024, zipfile.ZIP_DEFLATED),
+}
+SCENARIOS = ("preview", "match", "listing") + OPERATION_MODES + ("repack",)
+
+# 约三分之一的成员名中带 report，另有一些关键字不会命中
+KEYWORDS = ["report", "INVOICE", "2019-13"] + [f"nomatch{k}" for k in range(50)]
+
+# 同名负载中不同文件名的个数；深路径负载的目录层数
+DUP_BASENAMES = 50
+DEEP_LEVELS = 40
+
+# /proc/self/io 中记录的计数
+IO_FIELDS = ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes")
+
+
+def read_proc_io():
+    """当前进程的读写计数（不支持时返回 None）"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            values = dict(line.split(":") for line in f if ":" in line)
+    except OSError:
+        return None
+    return {k: int(values[k]) for k in IO_FIELDS if k in values}
+
+
+def peak_rss_mb(who="self"):
+    """峰值常驻内存（MB），不支持时返回 None
+
+    Linux 上优先读 /proc/self/status 的 VmHWM：ru_maxrss 会从 fork 出子进程的父进程继承。
+    """
+    if who == "self":
+        try:
+            with open("/proc/self/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) / 1024
+        except OSError:
+            pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    # Linux 上单位是 KB，macOS 上是字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    return usage.ru_maxrss * scale / 1024 / 1024
+
+
+def git_commit():
+    """当前提交（带未提交的修改时加 -dirty），不在 git 仓库中时返回 None"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-dirty" if dirty else "")
+
+
+def make_payload(rng, size):
+    """size 字节、可压缩但不是简单重复的日志式数据"""
+    lines = []
+    total = 0
+    while total < min(size, 1024 * 1024):
+        line = (f"2025-06-{rng.randint(1, 30):02d} {rng.randint(0, 23):02d}:00:00 INFO "
+                f"id={rng.randrange(10 ** 9)} user={rng.randrange(1000)} "
+                f"latency={rng.randrange(500)}ms\n").encode()
+        lines.append(line)
+        total += len(line)
+    block = b"".join(lines)
+    if size <= len(block):
+        return block[:size]
+    # 大文件按 1 MB 一块重复，每块开头写入不同的序号
+    chunks = []
+    for n in range(size // len(block) + 1):
+        chunks.append(f"block {n:08d} ".encode() + block[16:])
+    return b"".join(chunks)[:size]
+
+
+def member_name(workload, rng, i):
+    tag = "report" if i % 3 == 0 else "data"
+    if workload == "dupnames":
+        return f"batch{i}/{tag}_{i % DUP_BASENAMES}.txt"
+    if workload == "deep":
+        depth = rng.randint(DEEP_LEVELS // 2, DEEP_LEVELS)
+        parts = [f"level{k}_{rng.randrange(4)}" for k in range(depth)]
+        return "/".join(parts) + f"/{tag}_{i}.log"
+    return f"dir{i % 100}/{tag}_{i}.log"
+
+
+def make_archive(path, workload, count, size, method):
+    rng = random.Random(f"{workload}-{count}-{size}")
+    payloads = [make_payload(rng, size) for _ in range(min(count, 8))]
+    temp_path = path + ".tmp"
+    with zipfile.ZipFile(temp_path, "w", method) as zf:
+        for i in range(count):
+            zf.writestr(member_name(workload, rng, i), payloads[i % len(payloads)])
+    os.replace(temp_path, path)
+
+
+def workload_archive(cache_dir, workload, scale):
+    """取得负载的压缩包，参数相同时直接复用之前生成的"""
+    count, size, method = WORKLOADS[workload]
+    count = max(1, int(count * scale))
+    path = os.path.join(cache_dir, f"{workload}-{count}x{size}.zip")
+    if not os.path.exists(path):
+        start = time.perf_counter()
+        make_archive(path, workload, count, size, method)
+        print(f"生成 {workload}: {count} 个成员 × {size} 字节，"
+              f"{time.perf_counter() - start:.1f} 秒", file=sys.stderr)
+    return path
+
+
+def run_scenario(spec):
+    """在子进程中执行一个场景，返回测量结果（dict）"""
+    archive_path, scenario = spec["archive"], spec["scenario"]
+    matcher = KeywordMatcher(KEYWORDS)
+    engine = FileMoverEngine()
+    index = None
+    if scenario == "match":
+        index = ArchiveIndex.build(archive_path)
+
+    rss_before = peak_rss_mb()
+    io_before = read_proc_io()
+    start = time.perf_counter()
+    if scenario == "preview":
+        result = engine.preview(archive_path, matcher)
+        entries, nbytes, matched = result.total_count, result.total_bytes, result.matched_count
+    elif scenario == "match":
+        flags = index.match_flags(matcher)
+        entries, nbytes, matched = len(index), sum(index.file_sizes), flags.count(1)
+    elif scenario == "listing":
+        listing = PreviewListing(archive_path, spec["output"])
+        listing.start(matcher)
+        while not listing.status().done:
+            if listing.status().error:
+                raise RuntimeError(listing.status().error)
+            time.sleep(0.001)
+        listing.close()
+        entries, nbytes = len(listing.index), sum(listing.index.file_sizes)
+        matched = listing.status().matched_count
+    else:
+        if scenario == "repack":
+            options = ProcessOptions(repack=REPACK_ZIP, resume=False)
+        else:
+            options = ProcessOptions(scenario, workers=spec["workers"], pool_kind=spec["pool"],
+                                     resume=False)
+        result = engine.process(archive_path, matcher, spec["output"], options)
+        entries, matched = result.total_count, result.matched_count
+        nbytes = sum(engine.load_index(archive_path).file_sizes)
+    elapsed = time.perf_counter() - start
+    io_after = read_proc_io()
+
+    report = {
+        "seconds": elapsed,
+        "entries": entries,
+        "matched": matched,
+        "bytes": nbytes,
+        "entries_per_sec": entries / elapsed if elapsed else None,
+        "mb_per_sec": nbytes / 1024 / 1024 / elapsed if elapsed else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+        "children_peak_rss_mb": peak_rss_mb("children"),
+    }
+    if io_before is not None and io_after is not None:
+        report["io"] = {k: io_after[k] - io_before[k] for k in io_after if k in io_before}
+    return report
+
+
+def run_child(spec):
+    """启动一个子进程执行场景（每个场景的峰值内存和读写计数互不影响）"""
+    completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--child",
+                                json.dumps(spec)], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr
+                           else f"子进程退出码 {completed.returncode}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, old_path):
+    """与之前的结果对比每秒处理的成员数"""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    previous = {(r["workload"], r["scenario"]): r for r in old["results"]}
+    print(f"\n对比 {old_path}（{old['meta'].get('commit')}）:")
+    print(f"{'负载':<10}{'场景':<9}{'之前(个/秒)':>14}{'现在(个/秒)':>14}{'变化':>9}")
+    for r in results:
+        before = previous.get((r["workload"], r["scenario"]))
+        if not before or not before.get("entries_per_sec") or not r.get("entries_per_sec"):
+            continue
+        ratio = r["entries_per_sec"] / before["entries_per_sec"]
+        print(f"{r['workload']:<10}{r['scenario']:<9}{before['entries_per_sec']:>14.0f}"
+              f"{r['entries_per_sec']:>14.0f}{ratio:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workloads", nargs="+", choices=sorted(WORKLOADS),
+                        default=list(WORKLOADS))
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--scale", type=float, default=1.0, help="成员数的缩放比例")
+    parser.add_argument("--repeat", type=int, default=1, help="每个场景运行几次，取最快的一次")
+    parser.add_argument("-j", "--workers", type=int, default=1)
+    parser.add_argument("--pool", choices=("thread", "process"), default="thread")
+    parser.add_argument("--cache-dir", default=os.path.join(tempfile.gettempdir(),
+                                                           "filemover-bench"),
+                        help="生成的压缩包缓存在这里")
+    parser.add_argument("--output", default="bench_results.json", help="结果 JSON 文件")
+    parser.add_argument("--compare", metavar="OLD_JSON", help="与之前的结果对比")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scenario(json.loads(args.child))))
+        return
+
+    os.makedirs(args.cache_dir, exist_ok=True)
+    results = []
+    print(f"{'负载':<10}{'场景':<9}{'耗时(s)':>9}{'个/秒':>10}{'MB/秒':>9}{'峰值MB':>8}"
+          f"{'读调用':>9}{'写调用':>9}")
+    for workload in args.workloads:
+        archive_path = workload_archive(args.cache_dir, workload, args.scale)
+        for scenario in args.scenarios:
+            best = None
+            for _ in range(max(1, args.repeat)):
+                with tempfile.TemporaryDirectory(dir=args.cache_dir) as work:
+                    spec = {"archive": archive_path, "scenario": scenario,
+                            "output": os.path.join(work, "out"), "workers": args.workers,
+                            "pool": args.pool}
+                    report = run_child(spec)
+                if best is None or report["seconds"] < best["seconds"]:
+                    best = report
+            best = {"workload": workload, "scenario": scenario, **best}
+            results.append(best)
+            io = best.get("io", {})
+            print(f"{workload:<10}{scenario:<9}{best['seconds']:>9.3f}"
+                  f"{best['entries_per_sec']:>10.0f}{best['mb_per_sec']:>9.1f}"
+                  f"{best['peak_rss_mb'] or 0:>8.0f}"
+                  f"{io.get('syscr', '-'):>9}{io.get('syscw', '-'):>9}")
+
+    meta = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "workers": args.workers,
+        "pool": args.pool,
+        "workloads": {w: list(WORKLOADS[w]) for w in args.workloads},
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, ensure_ascii=False, indent=1)
+    print(f"结果已写入 {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
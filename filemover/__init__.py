@@ -0,0 +1,3 @@
+"""
+FileMover 处理核心（不依赖 tkinter）
+"""
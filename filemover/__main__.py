@@ -0,0 +1,12 @@
+"""
+python -m filemover
+"""
+
+import multiprocessing
+import sys
+
+from .cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
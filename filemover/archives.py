@@ -0,0 +1,534 @@
+"""
+压缩包格式后端：ZIP、tar（.gz/.bz2/.xz/.zst），以及可选的 7z（py7zr）和 RAR（rarfile）
+
+每个后端提供相同的接口：
+  entries()               列出文件成员（不含目录），只读元数据
+  iter_members(wanted)    按压缩包中的顺序顺序读一遍，逐个给出 (成员, 数据流)
+  open_member(entry)      单独打开一个成员
+
+tar 和 7z 是固实格式，随机打开成员要从头解压，代价极高；
+这类后端的 solid 为 True，处理时只用 iter_members 一次顺序读完。
+"""
+
+import os
+import posixpath
+import queue
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+import zipfile
+from collections import deque, namedtuple
+
+from .extract import DEFAULT_CHUNK_SIZE, zipinfo_mode, zipinfo_mtime
+from .index import ArchiveIndex, ZipMemberReader, open_archive_file
+from .remote import is_url, url_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import py7zr
+    import py7zr.io
+except ImportError:
+    py7zr = None
+
+try:
+    import rarfile
+except ImportError:
+    rarfile = None
+
+# 一个文件成员：压缩包内路径、解压后大小、CRC32（格式不记录时为 None）、
+# 修改时间戳和 Unix 权限位（没有时为 None）、在 entries() 中的序号
+ArchiveEntry = namedtuple("ArchiveEntry", ["name", "size", "crc", "mtime", "mode", "position"])
+
+FORMAT_ZIP = "zip"
+FORMAT_TAR = "tar"
+FORMAT_7Z = "7z"
+FORMAT_RAR = "rar"
+
+# 扩展名 -> (格式, tar 的压缩方式)
+_EXTENSIONS = {
+    ".zip": (FORMAT_ZIP, None),
+    ".tar": (FORMAT_TAR, ""),
+    ".tar.gz": (FORMAT_TAR, "gz"),
+    ".tgz": (FORMAT_TAR, "gz"),
+    ".tar.bz2": (FORMAT_TAR, "bz2"),
+    ".tbz2": (FORMAT_TAR, "bz2"),
+    ".tar.xz": (FORMAT_TAR, "xz"),
+    ".txz": (FORMAT_TAR, "xz"),
+    ".tar.zst": (FORMAT_TAR, "zst"),
+    ".tzst": (FORMAT_TAR, "zst"),
+    ".7z": (FORMAT_7Z, None),
+    ".rar": (FORMAT_RAR, None),
+}
+
+ARCHIVE_EXTENSIONS = tuple(_EXTENSIONS)
+
+
+class UnsupportedArchive(Exception):
+    """不认识的压缩包格式，或缺少对应的可选依赖"""
+
+
+def archive_extension(path):
+    """压缩包的扩展名（识别 .tar.gz 这样的双扩展名），不认识时返回 None"""
+    if is_url(path):
+        path = url_path(path)
+    lower = path.lower()
+    for ext in sorted(_EXTENSIONS, key=len, reverse=True):
+        if lower.endswith(ext):
+            return ext
+    return None
+
+
+def archive_stem(path):
+    """去掉压缩包扩展名后的文件名（a.tar.gz -> a）"""
+    name = os.path.basename(url_path(path) if is_url(path) else path)
+    ext = archive_extension(name)
+    return name[:-len(ext)] if ext else os.path.splitext(name)[0]
+
+
+def is_archive(path):
+    return archive_extension(path) is not None
+
+
+def archive_format(path):
+    """压缩包的格式，不认识时返回 None"""
+    ext = archive_extension(path)
+    if ext is None:
+        # 没有扩展名的 ZIP 也照常处理（远程的按 ZIP 尝试，由索引报告错误）
+        if is_url(path):
+            return FORMAT_ZIP
+        return FORMAT_ZIP if zipfile.is_zipfile(path) else None
+    return _EXTENSIONS[ext][0]
+
+
+def open_archive(path, index=None, fileobj=None):
+    """按格式打开压缩包；ZIP 可以传入已经建好的索引
+
+    fileobj 不为 None 时从这个可随机访问的文件对象读取（嵌套的压缩包），
+    path 只用来判断格式，fileobj 由调用方负责关闭。
+    """
+    ext = archive_extension(path)
+    fmt = _EXTENSIONS[ext][0] if fileobj is not None and ext else archive_format(path)
+    if fmt == FORMAT_ZIP:
+        return ZipArchive(path, index, fileobj)
+    if fmt == FORMAT_TAR:
+        return TarArchive(path, _EXTENSIONS[ext][1], fileobj)
+    if fmt == FORMAT_7Z:
+        return SevenZipArchive(path, fileobj)
+    if fmt == FORMAT_RAR:
+        return RarArchive(path, fileobj)
+    raise UnsupportedArchive(f"不支持的压缩包格式: {os.path.basename(path)}")
+
+
+class ArchiveBackend:
+    """后端的公共部分"""
+
+    format = None
+    # 固实格式：只能顺序读，不能随机打开成员
+    solid = False
+    # entries() 只读文件头、不用解压数据（tar.gz 等要解压一遍才能列出成员）
+    cheap_listing = True
+
+    def __init__(self, path, fileobj=None):
+        self.path = path
+        self.fileobj = fileobj
+
+    def _open_raw(self):
+        """从头读取压缩包数据的文件对象"""
+        if self.fileobj is not None:
+            self.fileobj.seek(0)
+            return _Unclosable(self.fileobj)
+        return open_archive_file(self.path)
+
+    def entries(self):
+        raise NotImplementedError
+
+    def iter_members(self, wanted=None):
+        """按顺序逐个给出 (成员, 数据流)；wanted(成员) 为假的成员不给出
+
+        数据流只在取下一个成员之前有效。
+        """
+        raise NotImplementedError
+
+    def open_member(self, entry):
+        """单独打开一个成员（默认实现：顺序读到该成员，读出到临时文件）"""
+        for member, stream in self.iter_members(lambda e: e.position == entry.position):
+            spooled = tempfile.SpooledTemporaryFile(max_size=DEFAULT_CHUNK_SIZE * 16)
+            while True:
+                chunk = stream.read(DEFAULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                spooled.write(chunk)
+            spooled.seek(0)
+            return spooled
+        raise KeyError(entry.name)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ZipArchive(ArchiveBackend):
+    """ZIP：中央目录索引 + 按本地文件头偏移直接读取成员"""
+
+    format = FORMAT_ZIP
+
+    def __init__(self, path, index=None, fileobj=None):
+        super().__init__(path, fileobj)
+        self.index = index if index is not None else ArchiveIndex.build(path, fileobj)
+        self._reader = None
+
+    @property
+    def reader(self):
+        if self._reader is None:
+            self._reader = ZipMemberReader(self.path, self.fileobj)
+        return self._reader
+
+    def entry(self, i):
+        file_info = self.index.zipinfo(i)
+        return ArchiveEntry(file_info.filename, file_info.file_size, file_info.CRC,
+                            zipinfo_mtime(file_info), zipinfo_mode(file_info), i)
+
+    def entries(self):
+        for i in range(len(self.index)):
+            yield self.entry(i)
+
+    def iter_members(self, wanted=None):
+        # 按数据在文件中的位置读，磁盘上是顺序访问
+        index = self.index
+        for i in sorted(range(len(index)), key=index.header_offsets.__getitem__):
+            entry = self.entry(i)
+            if wanted is None or wanted(entry):
+                with self.reader.open(index.zipinfo(i)) as stream:
+                    yield entry, stream
+
+    def open_member(self, entry):
+        return self.reader.open(self.index.zipinfo(entry.position))
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+class TarArchive(ArchiveBackend):
+    """tar 及其压缩变体：以流模式打开，整个压缩包只顺序解压一遍"""
+
+    format = FORMAT_TAR
+    solid = True
+
+    def __init__(self, path, compression="", fileobj=None):
+        super().__init__(path, fileobj)
+        self.compression = compression
+        # 未压缩的 tar 列出成员时只需读文件头
+        self.cheap_listing = compression == ""
+        if compression == "zst" and zstandard is None:
+            raise UnsupportedArchive("处理 .tar.zst 需要安装 zstandard")
+
+    def _open(self):
+        """打开流模式的 tarfile，返回 (tarfile, 需要一并关闭的文件)"""
+        raw = self._open_raw()
+        try:
+            if self.compression == "zst":
+                fileobj = zstandard.ZstdDecompressor().stream_reader(raw)
+                return tarfile.open(fileobj=fileobj, mode="r|"), [fileobj, raw]
+            mode = f"r|{self.compression}" if self.compression else "r|"
+            return tarfile.open(fileobj=raw, mode=mode), [raw]
+        except BaseException:
+            raw.close()
+            raise
+
+    def _iter(self):
+        """逐个给出 (成员, TarInfo, tarfile)"""
+        tar, files = self._open()
+        try:
+            position = 0
+            for info in tar:
+                if not info.isfile():
+                    continue
+                yield ArchiveEntry(info.name, info.size, None, float(info.mtime),
+                                   info.mode & 0o7777 or None, position), info, tar
+                position += 1
+        finally:
+            tar.close()
+            for f in files:
+                f.close()
+
+    def entries(self):
+        for entry, _, _ in self._iter():
+            yield entry
+
+    def iter_members(self, wanted=None):
+        for entry, info, tar in self._iter():
+            if wanted is None or wanted(entry):
+                # 流模式下 tarfile 会在取下一个成员时跳过没读完的数据
+                yield entry, tar.extractfile(info)
+
+
+class _Unclosable:
+    """包装调用方的文件对象，with 结束时不关闭它"""
+
+    def __init__(self, fileobj):
+        self.fileobj = fileobj
+
+    def __getattr__(self, name):
+        return getattr(self.fileobj, name)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+class _QueueStream:
+    """从队列中读取另一个线程写入的数据块"""
+
+    def __init__(self, owner):
+        self.owner = owner
+        self.buffer = b""
+        self.finished = False
+
+    def read(self, size=-1):
+        while not self.finished and (size < 0 or len(self.buffer) < size):
+            chunk = self.owner.next_chunk()
+            if chunk is None:
+                self.finished = True
+            else:
+                self.buffer += chunk
+        if size < 0:
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def drain(self):
+        while not self.finished:
+            if self.owner.next_chunk() is None:
+                self.finished = True
+        self.buffer = b""
+
+
+class SevenZipArchive(ArchiveBackend):
+    """7z（需要 py7zr）：py7zr 在后台线程中一次解压完，数据经有界队列交给调用方"""
+
+    format = FORMAT_7Z
+    solid = True
+
+    # 后台线程最多领先多少个数据块
+    QUEUE_CHUNKS = 16
+
+    def __init__(self, path, fileobj=None):
+        if py7zr is None:
+            raise UnsupportedArchive("处理 7z 需要安装 py7zr")
+        super().__init__(path, fileobj)
+        self._queue = None
+        self._cancelled = False
+
+    def entries(self):
+        with self._open_raw() as f, py7zr.SevenZipFile(f, 'r') as archive:
+            position = 0
+            for info in archive.list():
+                if info.is_directory:
+                    continue
+                mtime = info.creationtime.timestamp() if info.creationtime else None
+                yield ArchiveEntry(info.filename, info.uncompressed, info.crc32, mtime, None,
+                                   position)
+                position += 1
+
+    def next_chunk(self):
+        """取下一个数据块；当前成员结束时返回 None"""
+        kind, value = self._queue.get()
+        if kind == "data":
+            return value
+        if kind == "error":
+            raise value
+        # 下一个成员开始或全部结束：放回去留给 iter_members
+        self._pending = (kind, value)
+        return None
+
+    def iter_members(self, wanted=None):
+        entries = list(self.entries())
+        selected = [entry for entry in entries if wanted is None or wanted(entry)]
+        if not selected:
+            return
+        targets = {entry.name for entry in selected}
+        # 同名成员中只要了一部分时，其余的也会被解压，读完丢弃。
+        # 成员按自己列出的顺序对应：传入文件对象时 py7zr 按成员顺序逐个解压，
+        # 第 k 个开始写入数据的写入器就是名字在 targets 中的第 k 个非空成员。
+        # 不依赖 py7zr 给同名成员起的输出名（各版本不同），同名成员也不会合并成一个
+        order = deque(entry for entry in entries if entry.name in targets and entry.size)
+        positions = {entry.position for entry in selected}
+
+        self._queue = queue.Queue(self.QUEUE_CHUNKS)
+        self._cancelled = False
+        self._pending = None
+        self._current = None
+        owner = self
+
+        class Writer(py7zr.io.Py7zIO):
+            # py7zr 可能先为所有目标创建 Writer 再解压，所以以第一次写入作为成员开始，
+            # 这时才按顺序对应成员
+            def __init__(self, filename):
+                self.filename = filename
+                self.entry = None
+                self.length = 0
+
+            def write(self, s):
+                owner._write(self, s, order)
+                self.length += len(s)
+                return len(s)
+
+            def read(self, size=None):
+                return b""
+
+            def seek(self, offset, whence=0):
+                return self.length
+
+            def flush(self):
+                pass
+
+            def size(self):
+                return self.length
+
+        class Factory(py7zr.io.WriterFactory):
+            def create(self, filename):
+                return Writer(filename)
+
+        def produce():
+            try:
+                # 传入文件对象时 py7zr 不会多线程并行解压各个块，写入顺序与成员顺序一致
+                with self._open_raw() as f, py7zr.SevenZipFile(f, 'r') as archive:
+                    archive.extract(targets=list(targets), factory=Factory())
+                self._put("end", None)
+            except BaseException as e:
+                if not self._cancelled:
+                    self._queue.put(("error", e))
+
+        thread = threading.Thread(target=produce, daemon=True)
+        thread.start()
+        seen = set()
+        try:
+            while True:
+                kind, value = self._pending or self._queue.get()
+                self._pending = None
+                if kind == "error":
+                    raise value
+                if kind == "end":
+                    break
+                if kind != "member":
+                    continue
+                # 没有要的同名成员、对应不上的输出名不交给调用方，读完丢弃（后者按没有读到处理）
+                entry = value
+                stream = _QueueStream(self)
+                if entry is not None and entry.position in positions:
+                    seen.add(entry.position)
+                    yield entry, stream
+                stream.drain()
+
+            # 空文件不会有写入
+            for entry in selected:
+                if entry.position not in seen and entry.size == 0:
+                    yield entry, _EmptyStream()
+        finally:
+            self._cancelled = True
+            # 让后台线程从阻塞的 put 中退出
+            while thread.is_alive():
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    time.sleep(0.01)
+            thread.join()
+
+    def _write(self, writer, data, order):
+        if self._current is not writer:
+            self._current = writer
+            if writer.entry is None:
+                writer.entry = order.popleft() if order else None
+                # 输出名与对应的成员名不一致说明顺序对不上，不能把数据交给错误的成员
+                if writer.entry is not None and not _output_key(writer.filename).startswith(
+                        _output_key(writer.entry.name)):
+                    raise OSError(f"7z 成员顺序对应不上: {writer.filename}")
+            self._put("member", writer.entry)
+        self._put("data", bytes(data))
+
+    def _put(self, kind, value):
+        if self._cancelled:
+            raise OSError("读取已取消")
+        self._queue.put((kind, value))
+
+
+def _output_key(name):
+    """比较 py7zr 输出名时的写法（去掉开头的 /、./ 和多余的分隔符）"""
+    return posixpath.normpath(name.lstrip("/")) if name else name
+
+
+class _EmptyStream:
+    def read(self, size=-1):
+        return b""
+
+
+class RarArchive(ArchiveBackend):
+    """RAR（需要 rarfile 和 unrar）：按压缩包中的顺序逐个打开成员"""
+
+    format = FORMAT_RAR
+
+    def __init__(self, path, fileobj=None):
+        if rarfile is None:
+            raise UnsupportedArchive("处理 RAR 需要安装 rarfile")
+        super().__init__(path, fileobj)
+        self._temp_path = None
+        if fileobj is not None:
+            # unrar 只能读磁盘上的文件
+            fd, self._temp_path = tempfile.mkstemp(suffix=".rar")
+            with os.fdopen(fd, 'wb') as f, self._open_raw() as src:
+                shutil.copyfileobj(src, f, DEFAULT_CHUNK_SIZE)
+            path = self._temp_path
+        self.archive = rarfile.RarFile(path)
+        self.solid = self.archive.is_solid()
+        self._infos = [info for info in self.archive.infolist() if not info.is_dir()]
+
+    def entry(self, position):
+        info = self._infos[position]
+        try:
+            mtime = time.mktime(tuple(info.date_time) + (0, 0, -1))
+        except (OverflowError, ValueError):
+            mtime = None
+        return ArchiveEntry(info.filename, info.file_size, info.CRC, mtime, None, position)
+
+    def entries(self):
+        for position in range(len(self._infos)):
+            yield self.entry(position)
+
+    def iter_members(self, wanted=None):
+        # 固实 RAR 中每个成员由 unrar 从固实块开头解压到它为止（rarfile 没有一次顺序读完的接口）。
+        # 不再先 extractall 到临时目录：rarfile 的 extractall 同样是逐个 open，数据还要多写一遍；
+        # 按序号打开，同名的成员也不会互相覆盖
+        for position, info in enumerate(self._infos):
+            entry = self.entry(position)
+            if wanted is not None and not wanted(entry):
+                continue
+            with self.archive.open(info) as stream:
+                yield entry, stream
+
+    def open_member(self, entry):
+        return self.archive.open(self._infos[entry.position])
+
+    def close(self):
+        self.archive.close()
+        if self._temp_path is not None:
+            os.remove(self._temp_path)
+            self._temp_path = None
@@ -0,0 +1,264 @@
+"""
+批量处理：多个压缩包的成员共用一个工作池
+
+压缩包按大小从大到小排队，同时打开的压缩包数量有上限；
+每个打开的压缩包的成员按批次派发到同一个线程池/进程池。
+tar、7z 等只能顺序读取的格式不进工作池，在 ZIP 全部完成后逐个顺序处理。
+操作模式、持久性、空间检查和运行日志按 ProcessOptions，与逐个处理时相同。
+"""
+
+import copy
+import os
+from collections import deque, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .archives import archive_stem, is_archive
+from .engine import (MANIFEST_NAME, UNMATCHED_EXTRACT, UNMATCHED_MANIFEST, ArchiveError,
+                     FileMoverEngine, ProcessOptions, data_dirs, is_zip, open_journal,
+                     plan_extract_tasks, prepare_output_dirs, write_unmatched_manifest)
+from .journal import journal_path
+from .linking import STORE_DIR_NAME, ContentStore
+from .naming import NameRegistry
+from .parallel import (POOL_KINDS, POOL_PROCESS, POOL_THREAD, ThreadReaders, default_workers,
+                       extract_batch, init_multi_archive_worker, make_batches, process_archive_batch)
+from .planner import ProcessPlan
+from .progress import ProgressTracker
+
+# 默认同时打开的压缩包数量
+DEFAULT_MAX_OPEN = 4
+
+BatchResult = namedtuple("BatchResult", ["archive_path", "matched_count", "total_count",
+                                         "failed_count", "error"])
+
+
+def collect_archives(paths):
+    """展开目录，返回按大小从大到小排列的压缩包列表"""
+    archives = []
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_file() and is_archive(entry.name):
+                        archives.append(entry.path)
+        else:
+            archives.append(path)
+
+    def size_of(path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
+    return sorted(dict.fromkeys(archives), key=size_of, reverse=True)
+
+
+def archive_output_dir(output_dir, archive_path):
+    """分开输出时每个压缩包的输出目录（以压缩包文件名命名）"""
+    return os.path.join(output_dir, archive_stem(archive_path))
+
+
+class _ArchiveJob:
+    """一个正在处理的压缩包"""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.tasks = []
+        self.total = 0
+        self.done = set()
+        self.pending = 0
+        self.readers = None
+        self.store = None
+        self.journal = None
+        # 上次中断前已经完成的匹配成员数
+        self.resumed = 0
+
+
+class BatchScheduler:
+    """把多个压缩包的成员调度到同一个工作池"""
+
+    def __init__(self, workers=None, pool_kind=POOL_THREAD, max_open=DEFAULT_MAX_OPEN,
+                 merge=False, engine=None, options=None):
+        """options 为每个压缩包的处理选项（默认复制）；工作者数量和工作池类型以这里的参数为准，
+        ZIP 不适用增量处理、去重、嵌套压缩包、直接打包和省内存模式"""
+        if pool_kind not in POOL_KINDS:
+            raise ValueError(f"未知的工作池类型: {pool_kind}")
+        self.workers = max(1, workers or default_workers())
+        self.pool_kind = pool_kind
+        self.max_open = max(1, max_open)
+        self.merge = merge
+        self.engine = engine if engine is not None else FileMoverEngine()
+        options = copy.copy(options) if options is not None else ProcessOptions("copy")
+        # 按内容匹配时每个压缩包先用同样数量的工作者扫描一遍
+        options.workers = self.workers
+        options.pool_kind = pool_kind
+        self.options = options
+
+    def run(self, archives, matcher, output_dir, progress=None):
+        """处理全部压缩包，返回按处理顺序排列的 BatchResult 列表"""
+        if progress is None:
+            progress = ProgressTracker()
+        progress.start(0, 0)
+        options = self.options
+
+        pending = deque(path for path in archives if is_zip(path))
+        sequential = [path for path in archives if not is_zip(path)]
+        results = []
+        # 同一个输出目录共用一组登记表（合并输出，或两个压缩包同名时）
+        registries = {}
+        # 所有压缩包共用的写入器，按选项的持久性级别 fsync
+        writer = options.output_writer()
+
+        extract_unmatched = options.unmatched_policy == UNMATCHED_EXTRACT
+
+        def target_dir(archive_path):
+            return output_dir if self.merge else archive_output_dir(output_dir, archive_path)
+
+        def manifest_name(archive_path):
+            if self.merge:
+                # 合并输出时每个压缩包一份清单
+                return f"{archive_stem(archive_path)}_{MANIFEST_NAME}"
+            return MANIFEST_NAME
+
+        def registries_for(archive_path):
+            target = target_dir(archive_path)
+            names = registries.get(target)
+            if names is None:
+                matched_dir, unmatched_dir = prepare_output_dirs(target, extract_unmatched)
+                names = registries[target] = (
+                    NameRegistry(matched_dir), NameRegistry(unmatched_dir) if unmatched_dir else None)
+            return names
+
+        # 续传：任何压缩包写出之前先删除所有上次没有完成的成员，登记表扫描目标文件夹时
+        # 这些名字已经空出；否则合并输出时后恢复的日志会删掉别的压缩包刚写出的同名文件
+        if options.resume:
+            for archive_path in archives:
+                target = target_dir(archive_path)
+                if os.path.exists(journal_path(target, archive_path)):
+                    open_journal(target, archive_path, matcher, options, writer).close()
+
+        if self.pool_kind == POOL_PROCESS:
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           initializer=init_multi_archive_worker,
+                                           initargs=(self.max_open,))
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+
+        active = {}
+        futures = {}
+
+        def submit(job, batch):
+            # 写出之前在运行日志中记下这一批的目标路径
+            if job.journal is not None:
+                job.journal.reserve([(job.tasks[i].position, target_path)
+                                     for i, _, target_path in batch])
+            if self.pool_kind == POOL_PROCESS:
+                return executor.submit(process_archive_batch, job.archive_path, batch, job.store,
+                                       writer)
+            return executor.submit(
+                lambda b: extract_batch(job.readers.get(), b, job.store, writer=writer), batch)
+
+        def complete(job, done):
+            # extract_batch 返回前已按持久性级别 fsync 这一批，可以记为完成
+            job.done.update(done)
+            if job.journal is not None:
+                for i in done:
+                    job.journal.record(job.tasks[i].position, job.tasks[i].file_info.CRC)
+
+        def finish(job, error=None):
+            if job.readers is not None:
+                job.readers.close()
+            if job.journal is not None:
+                job.journal.close(complete=error is None)
+            matched_count = job.resumed + sum(1 for i in job.done if job.tasks[i].matched)
+            failed_count = len(job.tasks) - len(job.done)
+            results.append(BatchResult(job.archive_path, matched_count, job.total,
+                                       failed_count, error))
+
+        def space_plan(job, target):
+            plan = ProcessPlan(job.archive_path, target, options.operation_mode)
+            dirs = data_dirs(target, options)
+            for task in job.tasks:
+                plan.reserve(dirs[task.matched], task.size)
+            return plan
+
+        def activate():
+            while pending and len(active) < self.max_open:
+                job = _ArchiveJob(pending.popleft())
+                target = target_dir(job.archive_path)
+                try:
+                    index = self.engine.load_index(job.archive_path)
+                    flags = self.engine.match_flags(job.archive_path, index, matcher, options)
+                    job.journal = open_journal(target, job.archive_path, matcher, options, writer)
+                    journal = job.journal
+
+                    def is_done(i):
+                        return journal is not None and journal.is_done(i, index.crcs[i])
+
+                    job.tasks = plan_extract_tasks(index, flags, *registries_for(job.archive_path),
+                                                   is_done)
+                    job.total = len(index)
+                    job.resumed = sum(1 for i in range(len(index)) if flags[i] and is_done(i))
+                    if options.check_space:
+                        self.engine.check_space(space_plan(job, target))
+                    # 链接模式：成员解压到输出目录下的内容库，目标文件夹中放链接
+                    if options.operation_mode == "link":
+                        job.store = ContentStore(os.path.join(target, STORE_DIR_NAME),
+                                                 job.archive_path)
+                    if options.unmatched_policy == UNMATCHED_MANIFEST:
+                        write_unmatched_manifest(
+                            os.path.join(target, manifest_name(job.archive_path)), index, flags)
+                except Exception as e:
+                    finish(job, str(e))
+                    continue
+
+                progress.extend(len(job.tasks), sum(task.size for task in job.tasks))
+                if not job.tasks:
+                    finish(job)
+                    continue
+
+                if self.pool_kind != POOL_PROCESS:
+                    job.readers = ThreadReaders(job.archive_path)
+                for batch in make_batches(job.tasks):
+                    items = [(i, job.tasks[i].file_info, job.tasks[i].target_path) for i in batch]
+                    futures[submit(job, items)] = (job, items)
+                    job.pending += 1
+                active[job.archive_path] = job
+
+        try:
+            activate()
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    job, items = futures.pop(future)
+                    complete(job, future.result())
+                    job.pending -= 1
+                    progress.advance(len(items), sum(item[1].file_size for item in items))
+                    if job.pending == 0:
+                        del active[job.archive_path]
+                        finish(job)
+                activate()
+        finally:
+            executor.shutdown(wait=True)
+            for job in active.values():
+                if job.readers is not None:
+                    job.readers.close()
+                if job.journal is not None:
+                    job.journal.close()
+
+        # 顺序格式：此时 ZIP 已经全部写完，引擎重新扫描目标文件夹即可避开已占用的文件名
+        for archive_path in sequential:
+            archive_progress = ProgressTracker()
+            try:
+                result = self.engine.process_stream(archive_path, matcher, target_dir(archive_path),
+                                                    options, archive_progress,
+                                                    manifest_name(archive_path))
+            except ArchiveError as e:
+                results.append(BatchResult(archive_path, 0, 0, 0, str(e)))
+                continue
+            finally:
+                progress.extend(archive_progress.total_files, archive_progress.total_bytes)
+                progress.advance(archive_progress.files, archive_progress.bytes)
+            results.append(BatchResult(archive_path, result.matched_count, result.total_count,
+                                       result.failed_count, None))
+
+        return results
@@ -0,0 +1,413 @@
+"""
+命令行入口（不加载 tkinter，可在无图形界面的服务器和定时任务中使用）
+
+用法示例:
+    python -m filemover process a.zip b.zip -k keywords.txt --mode copy -o /data/out
+    python -m filemover preview a.zip -k keywords.txt
+    python -m filemover preview https://store.example.com/a.zip -k keywords.txt
+    python -m filemover batch /data/inbound -k keywords.txt -j 8 -o /data/out
+    python -m filemover watch /data/dropbox -o /data/out -c 2
+
+退出码: 0 全部成功；1 有压缩包或成员处理失败；2 参数错误。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+from .batch import DEFAULT_MAX_OPEN, BatchScheduler, collect_archives
+from .config import SimpleConfigManager
+from .content import DEFAULT_SCAN_BYTES, MATCH_NAME, MATCH_TARGETS
+from .dedup import DEDUP_MODES, DEDUP_OFF
+from .engine import (OPERATION_MODES, UNMATCHED_EXTRACT, UNMATCHED_POLICIES, ArchiveError,
+                     FileMoverEngine, ProcessOptions, default_output_dir)
+from .extract import EXTRACT_MODES, EXTRACT_STREAM
+from .matcher import MATCH_REGEX, MATCH_SUBSTRING, KeywordMatcher, parse_keywords
+from .nested import DEFAULT_MAX_BYTES, DEFAULT_MAX_DEPTH
+from .output import DEFAULT_SYNC_EVERY, DURABILITY_LEVELS, DURABILITY_NONE
+from .parallel import POOL_KINDS, POOL_THREAD
+from .planner import RESERVE_BYTES
+from .profiling import DEFAULT_SLOWEST, RunProfile, run_with_cprofile
+from .remote import is_url, remote_stats
+from .repack import REPACK_FORMATS
+from .watch import (DEFAULT_CONCURRENCY, DEFAULT_INTERVAL, DEFAULT_SETTLE, FolderWatcher,
+                    matcher_from_config, options_from_config)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+def load_keywords(args):
+    """合并关键字文件和 --keyword 参数"""
+    keywords = []
+    for path in args.keyword_file or []:
+        with open(path, 'r', encoding='utf-8-sig') as f:
+            keywords.extend(parse_keywords(f.read()))
+    keywords.extend(k.strip() for k in args.keyword or [] if k.strip())
+    return keywords
+
+
+def add_common_arguments(parser):
+    parser.add_argument("archives", nargs="+", help="压缩包路径或 http(s) 地址（batch 命令也可以是目录）")
+    parser.add_argument("-k", "--keyword-file", action="append",
+                        help="关键字文件，每行一个（可重复）")
+    parser.add_argument("-K", "--keyword", action="append", help="单个关键字（可重复）")
+    parser.add_argument("--regex", action="store_true", help="关键字按正则表达式匹配")
+    parser.add_argument("--match", choices=MATCH_TARGETS, default=MATCH_NAME,
+                        help="匹配范围：name 文件名（默认）、content 文件内容、any 文件名或内容")
+    parser.add_argument("--content-max-mb", type=int, default=DEFAULT_SCAN_BYTES // 1024 // 1024,
+                        help="按内容匹配时每个文件最多扫描多少 MB"
+                             f"（默认 {DEFAULT_SCAN_BYTES // 1024 // 1024}）")
+
+
+def add_unmatched_argument(parser):
+    parser.add_argument("--unmatched", choices=UNMATCHED_POLICIES, default=UNMATCHED_EXTRACT,
+                        help="未匹配文件：extract 解压（默认）、skip 跳过、manifest 只写清单")
+
+
+def add_output_arguments(parser):
+    """process 和 batch 共用的写出选项：操作模式、运行日志、空间检查、持久性"""
+    parser.add_argument("-m", "--mode", choices=OPERATION_MODES, default="move",
+                        help="操作模式（默认 move）")
+    parser.add_argument("--no-resume", dest="resume", action="store_false",
+                        help="不记录运行日志，也不从上次中断处继续")
+    parser.add_argument("--no-space-check", dest="check_space", action="store_false",
+                        help="开始前不检查磁盘剩余空间")
+    parser.add_argument("--durability", choices=DURABILITY_LEVELS, default=DURABILITY_NONE,
+                        help="输出的持久性：none 交给系统回写（默认），batch 每写 --sync-every 个文件 "
+                             "fsync 一次，file 每个文件都 fsync；运行日志只记录已经落盘的成员")
+    parser.add_argument("--sync-every", type=int, default=DEFAULT_SYNC_EVERY,
+                        help=f"--durability batch 时每写多少个文件 fsync 一次（默认 {DEFAULT_SYNC_EVERY}）")
+
+
+def process_options(args, **kwargs):
+    """按 add_common_arguments、add_unmatched_argument、add_output_arguments 的参数生成处理选项，
+    kwargs 为子命令特有的选项"""
+    return ProcessOptions(args.mode, unmatched_policy=args.unmatched, resume=args.resume,
+                          match_target=args.match,
+                          content_max_bytes=args.content_max_mb * 1024 * 1024,
+                          check_space=args.check_space, durability=args.durability,
+                          sync_every=args.sync_every, **kwargs)
+
+
+def format_size(size_bytes):
+    """格式化文件大小"""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if size_bytes < 1024 or unit == "GB":
+            return f"{size_bytes:.1f} {unit}" if unit != "B" else f"{size_bytes} B"
+        size_bytes /= 1024.0
+
+
+def print_remote_stats(archive_path, before, file=None):
+    """远程压缩包：这一次取回的字节数与压缩包大小之比（before 为开始前的统计）"""
+    after = remote_stats(archive_path)
+    if after is None:
+        return
+    fetched = after.bytes_fetched - (before.bytes_fetched if before else 0)
+    requests = after.requests - (before.requests if before else 0)
+    percent = fetched / after.size * 100 if after.size else 0.0
+    print(f"  远程读取 {format_size(fetched)}，占压缩包 {format_size(after.size)} 的 "
+          f"{percent:.1f}%（{requests} 次请求）", file=file)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="filemover",
+                                     description="按关键字把压缩包中的文件分到匹配/未匹配文件夹")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    preview = subparsers.add_parser("preview", help="只统计匹配数量，不解压")
+    add_common_arguments(preview)
+    preview.add_argument("-j", "--workers", type=int, default=1,
+                         help="按内容匹配时并行扫描的工作者数量（计划按这个数量估算耗时）")
+    preview.add_argument("--pool", choices=POOL_KINDS, default=POOL_THREAD, help="工作池类型")
+    preview.add_argument("--plan", metavar="FILE", default=None,
+                         help="生成处理计划（每个文件的目标路径、各文件夹需要的空间、预计耗时），"
+                              "以 JSON 写到 FILE（- 为标准输出）")
+    preview.add_argument("-m", "--mode", choices=OPERATION_MODES, default="move",
+                         help="计划按哪种操作模式计算（默认 move）")
+    preview.add_argument("-o", "--output", default=None,
+                         help=f"计划的输出目录（默认 {default_output_dir()}）")
+    add_unmatched_argument(preview)
+    preview.add_argument("--low-memory", action="store_true",
+                         help="省内存模式：逐块读取中央目录统计，不建立整个压缩包的索引")
+
+    process = subparsers.add_parser("process", help="解压并分类")
+    add_common_arguments(process)
+    add_output_arguments(process)
+    process.add_argument("-o", "--output", default=None,
+                         help=f"输出目录（默认 {default_output_dir()}）")
+    process.add_argument("--extract", choices=EXTRACT_MODES, default=EXTRACT_STREAM,
+                         help="解压方式（默认 stream）")
+    process.add_argument("-j", "--workers", type=int, default=1, help="并行解压的工作者数量")
+    process.add_argument("--pool", choices=POOL_KINDS, default=POOL_THREAD, help="工作池类型")
+    add_unmatched_argument(process)
+    process.add_argument("--incremental", action="store_true",
+                         help="增量处理：输出目录中名称、大小、CRC32 都一致的文件不再解压")
+    process.add_argument("--dedup", choices=DEDUP_MODES, default=DEDUP_OFF,
+                         help="内容相同的文件只解压一次：link 其余做成硬链接，manifest 只写清单")
+    process.add_argument("--nested", action="store_true",
+                         help="成员中的压缩包继续解压，关键字匹配 外层/内层.zip/文件 这样的路径")
+    process.add_argument("--nested-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                         help=f"嵌套压缩包最多解压几层（默认 {DEFAULT_MAX_DEPTH}）")
+    process.add_argument("--nested-max-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 // 1024,
+                         help="嵌套压缩包合计最多解压出多少 MB，超过后停止解压"
+                              f"（默认 {DEFAULT_MAX_BYTES // 1024 // 1024}）")
+    process.add_argument("--repack", choices=REPACK_FORMATS, default=None,
+                         help="直接打包输出：匹配/未匹配的文件写进 <压缩包名>_匹配文件.zip 等两个新压缩包，"
+                              "不写出单个文件（ZIP 输出 ZIP 时原样复制压缩数据）")
+    process.add_argument("--low-memory", action="store_true",
+                         help="省内存模式：逐块读取中央目录、读一块处理一块，适合成员数以百万计的 ZIP；"
+                              "逐个解压，并行、增量处理、去重和嵌套压缩包不适用")
+    process.add_argument("--profile", metavar="FILE", default=None,
+                         help="记录各阶段耗时、最慢的成员和读写字节数，写到 JSON 文件（摘要输出到 stderr）")
+    process.add_argument("--profile-top", type=int, default=DEFAULT_SLOWEST,
+                         help=f"--profile 报告最慢的几个成员（默认 {DEFAULT_SLOWEST}）")
+    process.add_argument("--cprofile", metavar="FILE", default=None,
+                         help="在 cProfile 下运行，统计结果写到 FILE（python -m pstats FILE 查看；"
+                              "只统计主线程，并行时工作者中的调用不计入）")
+
+    batch = subparsers.add_parser("batch", help="多个压缩包共用一个工作池批量处理")
+    add_common_arguments(batch)
+    add_output_arguments(batch)
+    batch.add_argument("-o", "--output", default=None,
+                       help=f"输出目录（默认 {default_output_dir()}）")
+    batch.add_argument("-j", "--workers", type=int, default=None, help="工作者数量（默认 CPU 核数）")
+    batch.add_argument("--pool", choices=POOL_KINDS, default=POOL_THREAD, help="工作池类型")
+    batch.add_argument("--max-open", type=int, default=DEFAULT_MAX_OPEN,
+                       help=f"同时打开的压缩包数量上限（默认 {DEFAULT_MAX_OPEN}）")
+    batch.add_argument("--merge", action="store_true",
+                       help="所有压缩包输出到同一组匹配/未匹配文件夹（默认每个压缩包单独一个子目录）")
+    add_unmatched_argument(batch)
+
+    watch = subparsers.add_parser("watch", help="监视投放目录，新的压缩包写完后自动处理")
+    watch.add_argument("directory", help="监视的目录（不含子目录）")
+    watch.add_argument("-o", "--output", default=None,
+                       help=f"输出目录，每个压缩包一个子目录（默认 {default_output_dir()}）")
+    watch.add_argument("--config", default="config.json",
+                       help="读取关键字和处理方式的界面配置文件（默认 config.json）")
+    watch.add_argument("-k", "--keyword-file", action="append",
+                       help="关键字文件，代替配置中保存的关键字（可重复）")
+    watch.add_argument("-K", "--keyword", action="append", help="单个关键字（可重复）")
+    watch.add_argument("--regex", action="store_true", help="-k/-K 的关键字按正则表达式匹配")
+    watch.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                       help=f"同时处理的压缩包数量（默认 {DEFAULT_CONCURRENCY}）")
+    watch.add_argument("--interval", type=float, default=DEFAULT_INTERVAL,
+                       help=f"扫描间隔秒数（默认 {DEFAULT_INTERVAL:g}）")
+    watch.add_argument("--settle", type=float, default=DEFAULT_SETTLE,
+                       help=f"文件大小和修改时间保持多少秒不变才开始处理（默认 {DEFAULT_SETTLE:g}）")
+    watch.add_argument("--state", default=None,
+                       help="记录已处理压缩包的状态文件（默认在输出目录中）")
+    watch.add_argument("--once", action="store_true",
+                       help="目录中现有的压缩包都处理完就退出（用于定时任务）")
+    return parser
+
+
+def print_plan(plan, file=None):
+    """处理计划的摘要"""
+    for volume in plan.volumes():
+        state = "放得下" if volume.required + RESERVE_BYTES <= volume.free else "空间不足"
+        print(f"  {volume.path}: 需要 {format_size(volume.required)}，"
+              f"剩余 {format_size(volume.free)}（{state}）", file=file)
+    if plan.estimated_seconds is not None:
+        print(f"  预计耗时 {plan.estimated_seconds:.1f}s", file=file)
+
+
+def run_preview(engine, args, matcher):
+    options = ProcessOptions(args.mode, workers=args.workers, pool_kind=args.pool,
+                             unmatched_policy=args.unmatched, match_target=args.match,
+                             content_max_bytes=args.content_max_mb * 1024 * 1024,
+                             low_memory=args.low_memory)
+    output_dir = args.output or default_output_dir()
+    plans = []
+    status = EXIT_OK
+    for archive_path in args.archives:
+        remote_before = remote_stats(archive_path)
+        try:
+            result = engine.preview(archive_path, matcher, options)
+            if args.plan:
+                plan = engine.plan(archive_path, matcher, output_dir, options, measure=True)
+        except ArchiveError as e:
+            print(f"{archive_path}: {e}", file=sys.stderr)
+            status = EXIT_FAILED
+            continue
+        # 计划写到标准输出时，摘要改写到标准错误
+        out = sys.stderr if args.plan == "-" else sys.stdout
+        print(f"{archive_path}: 总文件数 {result.total_count}，匹配 {result.matched_count}，"
+              f"未匹配 {result.total_count - result.matched_count}", file=out)
+        print(f"  跳过未匹配文件可少解压 {format_size(result.unmatched_bytes)}"
+              f"（共 {format_size(result.total_bytes)}），"
+              f"少读取 {format_size(result.unmatched_compressed_bytes)}", file=out)
+        print_remote_stats(archive_path, remote_before, out)
+        if args.plan:
+            print_plan(plan, out)
+            plans.append(plan.to_dict())
+
+    if args.plan == "-":
+        json.dump(plans, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    elif args.plan:
+        with open(args.plan, 'w', encoding='utf-8') as f:
+            json.dump(plans, f, ensure_ascii=False, indent=1)
+    return status
+
+
+def run_process(engine, args, matcher):
+    options = process_options(args, extract_mode=args.extract, workers=args.workers,
+                              pool_kind=args.pool, incremental=args.incremental, dedup=args.dedup,
+                              nested=args.nested, nested_depth=args.nested_depth,
+                              nested_max_bytes=args.nested_max_mb * 1024 * 1024,
+                              repack=args.repack, low_memory=args.low_memory)
+    output_dir = args.output or default_output_dir()
+    profile = RunProfile(args.profile_top) if args.profile else None
+
+    status = EXIT_OK
+    for archive_path in args.archives:
+        start = time.perf_counter()
+        remote_before = remote_stats(archive_path)
+        try:
+            result = engine.process(archive_path, matcher, output_dir, options, profile=profile)
+        except ArchiveError as e:
+            print(f"{archive_path}: {e}", file=sys.stderr)
+            status = EXIT_FAILED
+            continue
+        elapsed = time.perf_counter() - start
+        print(f"{archive_path}: 匹配 {result.matched_count}/{result.total_count}，"
+              f"失败 {result.failed_count}，耗时 {elapsed:.2f}s")
+        if result.skipped_count:
+            print(f"  未变化跳过 {result.skipped_count} 个文件")
+        if result.dedup_count:
+            print(f"  去重 {result.dedup_count} 个文件，少写 {format_size(result.dedup_bytes)}，"
+                  f"约省 {result.dedup_seconds:.2f}s")
+        print_remote_stats(archive_path, remote_before)
+        if result.failed_count:
+            status = EXIT_FAILED
+    if profile is not None:
+        profile.finish()
+        print(profile.format(), file=sys.stderr)
+        try:
+            profile.write_json(args.profile)
+        except OSError as e:
+            print(f"无法写入耗时记录: {e}", file=sys.stderr)
+            status = EXIT_FAILED
+    return status
+
+
+def run_batch(engine, args, matcher):
+    archives = collect_archives(args.archives)
+    if not archives:
+        print("没有找到压缩包", file=sys.stderr)
+        return EXIT_USAGE
+
+    scheduler = BatchScheduler(args.workers, args.pool, args.max_open, args.merge, engine,
+                               process_options(args))
+    start = time.perf_counter()
+    results = scheduler.run(archives, matcher, args.output or default_output_dir())
+    elapsed = time.perf_counter() - start
+
+    status = EXIT_OK
+    for result in results:
+        if result.error:
+            print(f"{result.archive_path}: {result.error}", file=sys.stderr)
+            status = EXIT_FAILED
+            continue
+        print(f"{result.archive_path}: 匹配 {result.matched_count}/{result.total_count}，"
+              f"失败 {result.failed_count}")
+        if result.failed_count:
+            status = EXIT_FAILED
+    print(f"共 {len(results)} 个压缩包，耗时 {elapsed:.2f}s")
+    return status
+
+
+def run_watch(args):
+    config = SimpleConfigManager(args.config)
+    try:
+        keywords = load_keywords(args)
+    except OSError as e:
+        print(f"无法读取关键字文件: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    try:
+        if keywords:
+            matcher = KeywordMatcher(keywords, MATCH_REGEX if args.regex else MATCH_SUBSTRING)
+        else:
+            matcher = matcher_from_config(config)
+        options = options_from_config(config)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return EXIT_USAGE
+    if matcher is None:
+        print(f"请提供关键字（-k 关键字文件、-K 关键字，或在界面中处理一次以保存到 {args.config}）",
+              file=sys.stderr)
+        return EXIT_USAGE
+    if not os.path.isdir(args.directory):
+        print(f"目录不存在: {args.directory}", file=sys.stderr)
+        return EXIT_USAGE
+
+    status = {"code": EXIT_OK}
+
+    def report(result):
+        # 在处理线程中调用：每个压缩包的结果一次写出，并发时不会交错
+        if result.error:
+            outcome = f"出错: {result.error}"
+            status["code"] = EXIT_FAILED
+        else:
+            outcome = f"匹配 {result.matched_count}/{result.total_count}，失败 {result.failed_count}"
+            if result.failed_count:
+                status["code"] = EXIT_FAILED
+        print(f"{result.archive_path}: {outcome}\n"
+              f"  从发现到完成 {result.latency:.2f}s（等待写完 {result.waited:.2f}s，"
+              f"排队 {result.queued:.2f}s，处理 {result.processing:.2f}s）", flush=True)
+
+    output_dir = args.output or default_output_dir()
+    watcher = FolderWatcher(args.directory, output_dir, matcher, options, args.concurrency,
+                            args.interval, args.settle, args.state, on_result=report)
+    print(f"监视 {args.directory}，输出到 {output_dir}（Ctrl+C 停止）", file=sys.stderr)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        # 等正在处理的压缩包完成（线程池退出时等待）
+        print("已停止", file=sys.stderr)
+    count, median, p95, worst = watcher.latency_summary()
+    if count:
+        print(f"共处理 {count} 个压缩包，从发现到完成: 中位数 {median:.2f}s，"
+              f"p95 {p95:.2f}s，最长 {worst:.2f}s", file=sys.stderr)
+    return status["code"]
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "watch":
+        return run_watch(args)
+
+    try:
+        keywords = load_keywords(args)
+    except OSError as e:
+        print(f"无法读取关键字文件: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not keywords:
+        print("请提供关键字（-k 关键字文件 或 -K 关键字）", file=sys.stderr)
+        return EXIT_USAGE
+
+    try:
+        matcher = KeywordMatcher(keywords, MATCH_REGEX if args.regex else MATCH_SUBSTRING)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return EXIT_USAGE
+
+    missing = [p for p in args.archives if not is_url(p) and not os.path.exists(p)]
+    if missing:
+        for path in missing:
+            print(f"压缩包文件不存在: {path}", file=sys.stderr)
+        return EXIT_USAGE
+
+    engine = FileMoverEngine()
+    if args.command == "preview":
+        return run_preview(engine, args, matcher)
+    if args.command == "batch":
+        return run_batch(engine, args, matcher)
+    if args.cprofile:
+        return run_with_cprofile(args.cprofile, run_process, engine, args, matcher)
+    return run_process(engine, args, matcher)
@@ -0,0 +1,48 @@
+"""
+配置文件读写
+"""
+
+import json
+import os
+
+
+class SimpleConfigManager:
+    """简化的配置管理器"""
+    def __init__(self, config_file="config.json"):
+        self.config_file = config_file
+        self.config = {}
+        self.load()
+    
+    def load(self):
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r', encoding='utf-8') as f:
+                    self.config = json.load(f)
+        except:
+            self.config = {}
+    
+    def save(self):
+        try:
+            with open(self.config_file, 'w', encoding='utf-8') as f:
+                json.dump(self.config, f, indent=2, ensure_ascii=False)
+        except:
+            pass
+    
+    def get(self, key, default=None):
+        keys = key.split('.')
+        value = self.config
+        for k in keys:
+            if isinstance(value, dict) and k in value:
+                value = value[k]
+            else:
+                return default
+        return value
+    
+    def set(self, key, value):
+        keys = key.split('.')
+        config = self.config
+        for k in keys[:-1]:
+            if k not in config:
+                config[k] = {}
+            config = config[k]
+        config[keys[-1]] = value
@@ -0,0 +1,229 @@
+"""
+按内容匹配：把成员数据按固定大小的块流式送进编译好的关键字正则，不整个读入内存
+
+相邻两块之间保留一段重叠，跨块边界的关键字也能匹配到；
+命中后立即停止读取，每个成员最多扫描 max_bytes 字节。
+ZIP 的成员分批交给多个工作者并行扫描（正则搜索不释放 GIL，CPU 密集时用进程池）。
+"""
+
+import re
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from .index import ZipMemberReader
+from .matcher import MATCH_SUBSTRING, compile_substring_pattern
+from .parallel import POOL_PROCESS, POOL_THREAD, ThreadReaders, make_batches
+
+# 匹配范围：name 只看文件名；content 只看内容；any 文件名或内容命中其一
+MATCH_NAME = "name"
+MATCH_CONTENT = "content"
+MATCH_ANY = "any"
+MATCH_TARGETS = (MATCH_NAME, MATCH_CONTENT, MATCH_ANY)
+
+# 每次读取并搜索的块大小
+SCAN_CHUNK_SIZE = 256 * 1024
+# 每个成员默认最多扫描的字节数
+DEFAULT_SCAN_BYTES = 16 * 1024 * 1024
+# 子串关键字在这些编码下都搜索（GBK 用于中文 Windows 生成的日志和文本）
+DEFAULT_ENCODINGS = ("utf-8", "gbk")
+# 正则关键字的匹配长度无法预知，块之间保留这么多字节的重叠
+REGEX_OVERLAP = 1024
+
+# 按内容决定去向的成员暂存时，超过这个大小写到临时文件
+SPOOL_BYTES = 4 * 1024 * 1024
+
+# 一个待扫描的成员：ZipInfo（来自索引）、最多扫描的字节数、在索引中的序号
+ScanTask = namedtuple("ScanTask", ["file_info", "size", "position"])
+
+# 进程池中每个进程各自持有的压缩包句柄和内容匹配器
+_process_reader = None
+_process_content = None
+
+
+def compile_content_pattern(matcher, encodings=DEFAULT_ENCODINGS):
+    """把关键字编译成搜索字节的正则，返回 (正则, 最长匹配长度)；正则关键字返回的长度为 None
+
+    子串关键字的正则区分大小写，数据先用 bytes.lower() 转成小写再搜索
+    （比 re.IGNORECASE 快数倍，正则可以按字面前缀快速跳过）。
+    bytes.lower() 只转换 ASCII 字母，关键字编码后也用它转换，两边才一致：
+    GBK 双字节字符的第二个字节可能落在 A-Z 上，会被一起转换；
+    Ä 这样的非 ASCII 字母不转换，所以关键字的原样、小写和大写三种写法都搜索。
+    """
+    if matcher.mode != MATCH_SUBSTRING:
+        source = '|'.join(f'(?:{k})' for k in matcher.keywords) or r"(?!)"
+        return re.compile(source.encode('utf-8'), re.IGNORECASE), None
+
+    # 每个字节当作一个 latin-1 字符构建前缀树，再原样转回字节正则
+    words = set()
+    for keyword in matcher.keywords:
+        for variant in {keyword, keyword.lower(), keyword.upper()}:
+            for encoding in encodings:
+                try:
+                    words.add(variant.encode(encoding).lower().decode('latin-1'))
+                except UnicodeEncodeError:
+                    continue
+    pattern = compile_substring_pattern(words)
+    longest = max((len(w) for w in words), default=0)
+    return re.compile(pattern.pattern.encode('latin-1')), longest
+
+
+class ContentScanner:
+    """逐块扫描一个成员的状态"""
+
+    def __init__(self, search, overlap, max_bytes, fold_case=False):
+        self.search = search
+        self.fold_case = fold_case
+        self.overlap = overlap
+        self.remaining = max_bytes
+        self.tail = b""
+        self.found = False
+        self.scanned = 0
+
+    @property
+    def done(self):
+        """已经命中，或者已经扫描到字节上限"""
+        return self.found or self.remaining <= 0
+
+    def feed(self, chunk):
+        """扫描下一块数据，返回是否已经命中"""
+        if self.done:
+            return self.found
+        if len(chunk) > self.remaining:
+            chunk = chunk[:self.remaining]
+        self.remaining -= len(chunk)
+        self.scanned += len(chunk)
+
+        window = self.tail + chunk if self.tail else chunk
+        if self.search(window.lower() if self.fold_case else window) is not None:
+            self.found = True
+        elif self.overlap:
+            self.tail = window[-self.overlap:]
+        return self.found
+
+
+class ContentMatcher:
+    """按内容匹配的关键字集合（可以传给进程池）"""
+
+    def __init__(self, matcher, max_bytes=DEFAULT_SCAN_BYTES, chunk_size=SCAN_CHUNK_SIZE,
+                 encodings=DEFAULT_ENCODINGS):
+        self.pattern, longest = compile_content_pattern(matcher, encodings)
+        self.fold_case = longest is not None
+        # 关键字最长 n 字节时保留 n-1 字节，跨块的关键字一定完整出现在下一个窗口中
+        self.overlap = REGEX_OVERLAP if longest is None else max(0, longest - 1)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+
+    def scanner(self):
+        return ContentScanner(self.pattern.search, self.overlap, self.max_bytes, self.fold_case)
+
+    def scan(self, stream):
+        """扫描数据流，返回 (是否命中, 扫描的字节数)；命中或到达上限后不再读取"""
+        scanner = self.scanner()
+        while not scanner.done:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            scanner.feed(chunk)
+        return scanner.found, scanner.scanned
+
+    def scan_copy(self, stream, dst, keep_unmatched=True):
+        """边扫描边把数据写到 dst，返回是否命中
+
+        keep_unmatched 为 False 时扫描到上限仍未命中就停止读取（数据不再需要）。
+        """
+        scanner = self.scanner()
+        while True:
+            chunk = stream.read(self.chunk_size)
+            if not chunk:
+                break
+            dst.write(chunk)
+            if not scanner.done and not scanner.feed(chunk):
+                if scanner.done and not keep_unmatched:
+                    break
+        return scanner.found
+
+    def spool(self, stream, keep_unmatched=True, temp_dir=None):
+        """扫描并暂存成员数据，返回 (是否命中, 从头读取的文件对象)；不需要数据时文件对象为 None"""
+        spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES, dir=temp_dir)
+        try:
+            found = self.scan_copy(stream, spooled, keep_unmatched)
+        except BaseException:
+            spooled.close()
+            raise
+        if not found and not keep_unmatched:
+            spooled.close()
+            return False, None
+        spooled.seek(0)
+        return found, spooled
+
+
+def scan_batch(reader, content, batch):
+    """在一个压缩包句柄上扫描一批 (序号, ZipInfo)，返回 (命中的序号列表, 扫描的字节数)
+
+    读不出来的成员（加密、损坏）按未命中处理，解压时再报告失败。
+    """
+    hits = []
+    scanned = 0
+    for i, file_info in batch:
+        try:
+            with reader.open(file_info) as stream:
+                found, nbytes = content.scan(stream)
+        except Exception:
+            continue
+        scanned += nbytes
+        if found:
+            hits.append(i)
+    return hits, scanned
+
+
+def _init_process_scanner(archive_path, content):
+    """进程池初始化：每个进程打开一次压缩包"""
+    global _process_reader, _process_content
+    _process_reader = ZipMemberReader(archive_path)
+    _process_content = content
+
+
+def _process_scan(batch):
+    """进程池中执行的批次"""
+    return scan_batch(_process_reader, _process_content, batch)
+
+
+def scan_archive(archive_path, index, positions, content, workers=1, pool_kind=POOL_THREAD):
+    """扫描 ZIP 中 positions 这些成员的内容，返回 (命中的序号集合, 扫描的字节数)"""
+    tasks = [ScanTask(index.zipinfo(i), min(index.file_sizes[i], content.max_bytes), i)
+             for i in positions]
+    hits = set()
+    if not tasks:
+        return hits, 0
+
+    if workers <= 1:
+        with ZipMemberReader(archive_path) as reader:
+            found, scanned = scan_batch(reader, content,
+                                        [(task.position, task.file_info) for task in tasks])
+        return set(found), scanned
+
+    batches = [[(tasks[k].position, tasks[k].file_info) for k in batch]
+               for batch in make_batches(tasks)]
+    if pool_kind == POOL_PROCESS:
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_scanner,
+                                       initargs=(archive_path, content))
+        submit = lambda batch: executor.submit(_process_scan, batch)
+        handles = None
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        handles = ThreadReaders(archive_path)
+        submit = lambda batch: executor.submit(
+            lambda b: scan_batch(handles.get(), content, b), batch)
+
+    scanned = 0
+    try:
+        for future in as_completed([submit(batch) for batch in batches]):
+            found, nbytes = future.result()
+            hits.update(found)
+            scanned += nbytes
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        if handles is not None:
+            handles.close()
+    return hits, scanned
@@ -0,0 +1,121 @@
+"""
+去重：压缩包中内容相同的成员只解压一次，其余的做成硬链接或写进清单
+
+先按中央目录中的（大小, CRC32）分组，只有同组有多个成员时才计算流式哈希确认。
+压缩方式和压缩后大小都相同的成员直接对原始压缩数据计算哈希，不用解压；
+其余情况对解压后的数据计算哈希（只读不写）。
+"""
+
+import csv
+import hashlib
+import time
+
+from .extract import DEFAULT_CHUNK_SIZE
+
+# 重复成员的处理方式：off 不去重；link 硬链接到第一份；manifest 只写清单
+DEDUP_OFF = "off"
+DEDUP_LINK = "link"
+DEDUP_MANIFEST = "manifest"
+DEDUP_MODES = (DEDUP_OFF, DEDUP_LINK, DEDUP_MANIFEST)
+
+DEDUP_MANIFEST_NAME = "重复文件清单.tsv"
+
+
+def payload_digest(reader, file_info, raw, chunk_size=DEFAULT_CHUNK_SIZE):
+    """成员内容的哈希；raw 为 True 时对原始压缩数据计算"""
+    digest = hashlib.blake2b(digest_size=20)
+    if raw:
+        for chunk in reader.iter_raw(file_info, chunk_size):
+            digest.update(chunk)
+    else:
+        with reader.open(file_info) as src:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                digest.update(chunk)
+    return digest.digest()
+
+
+class DedupPlan:
+    """一个压缩包中的重复成员：duplicates 为 重复成员序号 -> 第一份的序号"""
+
+    def __init__(self):
+        self.duplicates = {}
+        # 被重复的第一份的序号
+        self.leaders = set()
+        # 为确认重复读取的压缩包字节数，以及所用时间
+        self.hashed_bytes = 0
+        self.hash_seconds = 0.0
+
+    @classmethod
+    def build(cls, reader, index, positions):
+        """在 positions（按顺序排列的成员序号）中找出内容相同的成员"""
+        plan = cls()
+        start = time.perf_counter()
+
+        groups = {}
+        for i in positions:
+            # 空文件没有可省的内容；加密成员不解压就无法比较
+            if index.file_sizes[i] == 0 or index.flag_bits[i] & 0x1:
+                continue
+            groups.setdefault((index.file_sizes[i], index.crcs[i]), []).append(i)
+
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+
+            # 压缩方式和压缩后大小都相同的成员，先比较原始数据，不用解压
+            by_encoding = {}
+            for i in members:
+                by_encoding.setdefault((index.compress_types[i], index.compress_sizes[i]),
+                                       []).append(i)
+
+            classes = []
+            for (compress_type, compress_size), same in by_encoding.items():
+                if len(same) == 1:
+                    classes.append(same)
+                    continue
+                by_raw = {}
+                for i in same:
+                    key = payload_digest(reader, index.zipinfo(i), raw=True)
+                    plan.hashed_bytes += compress_size
+                    by_raw.setdefault(key, []).append(i)
+                classes.extend(by_raw.values())
+
+            # 剩下不止一类时（压缩方式不同等），再按解压后的内容合并，每类只解压第一个
+            if len(classes) > 1:
+                by_data = {}
+                for same in classes:
+                    key = payload_digest(reader, index.zipinfo(same[0]), raw=False)
+                    plan.hashed_bytes += index.file_sizes[same[0]]
+                    by_data.setdefault(key, []).extend(same)
+                classes = list(by_data.values())
+
+            # 第一份取序号最小的成员，处理时一定先于重复成员
+            for same in classes:
+                leader = min(same)
+                for i in same:
+                    if i != leader:
+                        plan.duplicates[i] = leader
+
+        plan.leaders = set(plan.duplicates.values())
+        plan.hash_seconds = time.perf_counter() - start
+        return plan
+
+    def __len__(self):
+        return len(self.duplicates)
+
+    def __contains__(self, i):
+        return i in self.duplicates
+
+    def leader(self, i):
+        return self.duplicates[i]
+
+
+def write_dedup_manifest(path, rows):
+    """把没有写出的重复成员写成清单（制表符分隔）"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(["文件名", "大小", "CRC32", "相同内容的文件"])
+        writer.writerows(rows)
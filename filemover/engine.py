@@ -0,0 +1,1563 @@
+"""
+处理引擎：读取压缩包、匹配关键字并把成员分到匹配/未匹配文件夹
+
+界面和命令行共用这一实现，本模块及其依赖都不导入 tkinter。
+"""
+
+import csv
+import io
+import itertools
+import os
+import tempfile
+import time
+from collections import namedtuple
+
+from .archives import (FORMAT_ZIP, UnsupportedArchive, ZipArchive, archive_format, archive_stem,
+                       open_archive)
+from .content import (DEFAULT_SCAN_BYTES, MATCH_ANY, MATCH_CONTENT, MATCH_NAME, MATCH_TARGETS,
+                      ContentMatcher, scan_archive, scan_batch)
+from .dedup import (DEDUP_MANIFEST, DEDUP_MANIFEST_NAME, DEDUP_MODES, DEDUP_OFF, DedupPlan,
+                    write_dedup_manifest)
+from .extract import EXTRACT_STREAM, extract_member
+from .incremental import DestinationIndex
+from .index import (ArchiveIndexCache, ZipMemberReader, archive_size, iter_central_blocks,
+                    open_archive_file)
+from .journal import RESERVE_BLOCK, RunJournal, journal_path
+from .linking import STORE_DIR_NAME, ContentStore, link_or_copy
+from .naming import NameRegistry
+from .nested import (DEFAULT_MAX_BYTES, DEFAULT_MAX_DEPTH, BudgetReader, NestedLimitExceeded,
+                     NestedLimits, spool_member, virtual_path)
+from .output import DEFAULT_SYNC_EVERY, DURABILITY_LEVELS, DURABILITY_NONE, OutputWriter
+from .parallel import POOL_THREAD, ExtractTask, ParallelExtractor
+from .planner import RESERVE_BYTES, ProcessPlan
+from .profiling import NULL_PROFILE, ProfiledReader
+from .progress import ProgressTracker
+from .remote import is_url
+from .repack import REPACK_FORMATS, REPACK_TAR, REPACK_ZIP, open_repack_writer
+
+OUTPUT_DIR_NAME = "FileMover_Output"
+MATCHED_DIR_NAME = "匹配文件"
+UNMATCHED_DIR_NAME = "未匹配文件"
+
+MANIFEST_NAME = "未匹配文件清单.tsv"
+
+OPERATION_MODES = ("move", "copy", "link")
+
+# 记运行日志并顺序读取时，不超过这个大小的成员先暂存在内存中，暂存总量的上限
+STREAM_BUFFER_MEMBER = 256 * 1024
+STREAM_BUFFER_BYTES = 16 * 1024 * 1024
+
+# 按内容匹配时，文件名还不能决定去向、要读取数据后才知道的成员
+UNDECIDED = 2
+
+# 未匹配文件的处理方式：extract 照常解压；skip 完全跳过；manifest 只写清单不解压
+UNMATCHED_EXTRACT = "extract"
+UNMATCHED_SKIP = "skip"
+UNMATCHED_MANIFEST = "manifest"
+UNMATCHED_POLICIES = (UNMATCHED_EXTRACT, UNMATCHED_SKIP, UNMATCHED_MANIFEST)
+
+# unmatched_bytes / unmatched_compressed_bytes 即不解压未匹配文件时省下的写入量和读取量
+PreviewResult = namedtuple("PreviewResult", ["total_count", "matched_count", "total_bytes",
+                                             "unmatched_bytes", "unmatched_compressed_bytes"])
+# skipped_count：增量处理时内容未变化、没有重新解压的成员数
+# dedup_count / dedup_bytes / dedup_seconds：去重省下的文件数、字节数和（估算的）时间
+ProcessResult = namedtuple("ProcessResult",
+                           ["matched_count", "total_count", "failed_count", "skipped_count",
+                            "dedup_count", "dedup_bytes", "dedup_seconds"],
+                           defaults=(0, 0, 0, 0.0))
+
+
+class ArchiveError(Exception):
+    """压缩包无法处理"""
+
+
+class InsufficientSpace(ArchiveError):
+    """目标磁盘的剩余空间放不下，处理没有开始"""
+
+
+def is_zip(archive_path):
+    """ZIP 走中央目录索引和并行解压；不认识的格式也按 ZIP 尝试，由索引报告错误"""
+    try:
+        return archive_format(archive_path) in (FORMAT_ZIP, None)
+    except OSError:
+        return True
+
+
+def default_output_dir():
+    """默认输出目录：桌面上的 FileMover_Output"""
+    desktop = os.path.join(os.path.expanduser("~"), "Desktop")
+    return os.path.join(desktop, OUTPUT_DIR_NAME)
+
+
+def prepare_output_dirs(output_dir, with_unmatched=True):
+    """创建输出目录，返回 (匹配文件夹, 未匹配文件夹)
+
+    with_unmatched 为 False 时不创建未匹配文件夹，返回的第二项为 None。
+    """
+    matched_dir = os.path.join(output_dir, MATCHED_DIR_NAME)
+    unmatched_dir = os.path.join(output_dir, UNMATCHED_DIR_NAME) if with_unmatched else None
+    for d in [output_dir, matched_dir, unmatched_dir]:
+        if d:
+            os.makedirs(d, exist_ok=True)
+    return matched_dir, unmatched_dir
+
+
+def data_dirs(output_dir, options):
+    """(未匹配, 匹配) 的成员数据实际写到的文件夹；链接模式下都写到内容库，不写出时为 None"""
+    matched_dir = os.path.join(output_dir, MATCHED_DIR_NAME)
+    unmatched_dir = None
+    if options.unmatched_policy == UNMATCHED_EXTRACT:
+        unmatched_dir = os.path.join(output_dir, UNMATCHED_DIR_NAME)
+    if options.operation_mode == "link":
+        store_dir = os.path.join(output_dir, STORE_DIR_NAME)
+        return (store_dir if unmatched_dir else None), store_dir
+    return unmatched_dir, matched_dir
+
+
+def repack_paths(output_dir, archive_path, fmt):
+    """直接打包输出时 (未匹配, 匹配) 的压缩包路径，按来源压缩包命名，多个压缩包不会互相覆盖"""
+    stem = archive_stem(archive_path)
+    return tuple(os.path.join(output_dir, f"{stem}_{label}.{fmt}")
+                 for label in (UNMATCHED_DIR_NAME, MATCHED_DIR_NAME))
+
+
+def planned_match(matcher, name, options):
+    """不读取数据时计划中的去向：按内容匹配时文件名不能决定的成员按匹配计算（估计偏多）"""
+    if options.match_target == MATCH_NAME and not matcher.match(name):
+        return 0
+    return 1
+
+
+def format_bytes(nbytes):
+    """错误信息中的字节数"""
+    return f"{nbytes / 1024 / 1024:.1f} MB"
+
+
+def plan_extract_tasks(index, flags, matched_names, unmatched_names, skip=None, targets=None):
+    """按成员顺序确定所有目标路径，保证重名处理结果与逐个处理时一致
+
+    unmatched_names 为 None 时未匹配的成员不生成任务；skip(序号) 为真的成员也不生成任务；
+    targets（序号 -> 路径）中已经指定目标路径的成员直接使用该路径。
+    """
+    tasks = []
+    for i in range(len(index)):
+        is_matched = flags[i]
+        if not is_matched and unmatched_names is None:
+            continue
+        if skip is not None and skip(i):
+            continue
+        file_info = index.zipinfo(i)
+
+        target_path = targets.get(i) if targets else None
+        if target_path is None:
+            registry = matched_names if is_matched else unmatched_names
+            target_path = registry.reserve(os.path.basename(file_info.filename))
+
+        tasks.append(ExtractTask(file_info, target_path, file_info.file_size, is_matched, i))
+    return tasks
+
+
+def plan_targets(positions, target_of, journal):
+    """逐个处理时为接下来一块成员按顺序预先分配目标路径，在运行日志中只记一行
+
+    positions 为要写出的成员序号（最多取 RESERVE_BLOCK 个），target_of(序号) 分配目标路径。
+    返回 序号 -> 目标路径。
+    """
+    planned = {i: target_of(i) for i in itertools.islice(positions, RESERVE_BLOCK)}
+    if journal is not None and planned:
+        journal.reserve(planned.items())
+    return planned
+
+
+def extracted_bytes(index, flags, unmatched_policy):
+    """实际需要解压写出的字节数"""
+    if unmatched_policy == UNMATCHED_EXTRACT:
+        return sum(index.file_sizes)
+    return sum(size for size, flag in zip(index.file_sizes, flags) if flag)
+
+
+def write_unmatched_manifest(path, index, flags, skip=(), rows=()):
+    """把未匹配的成员写成清单（制表符分隔），返回条目数
+
+    skip 中的成员（嵌套的压缩包）不写；rows 为嵌套压缩包中未匹配的成员，接在后面。
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(["文件名", "大小", "压缩后大小", "CRC32"])
+        for i in range(len(index)):
+            if not flags[i] and i not in skip:
+                writer.writerow([index.name(i), index.file_sizes[i], index.compress_sizes[i],
+                                 f"{index.crcs[i]:08x}"])
+                count += 1
+        writer.writerows(rows)
+    return count + len(rows)
+
+
+def write_manifest_rows(path, rows):
+    """顺序读取的格式：把未匹配的成员 [文件名, 大小, 压缩后大小, CRC32] 写成清单"""
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, delimiter='\t')
+        writer.writerow(["文件名", "大小", "压缩后大小", "CRC32"])
+        writer.writerows(rows)
+
+
+def repack_bytes(fmt, name_length, size, compress_size=None):
+    """直接打包输出时一个成员大约占用的字节数；compress_size 为原样复制的压缩数据大小"""
+    if fmt == REPACK_TAR:
+        # 头部（长文件名、非 ASCII 文件名另有 PAX 头）加按 512 字节取整的数据
+        return 1024 + (size + 511) // 512 * 512
+    # 本地文件头和中央目录各有一份文件名，另加 ZIP64 等额外字段和数据描述符
+    return 30 + 46 + 2 * name_length + 64 + (size if compress_size is None else compress_size)
+
+
+class ProcessOptions:
+    """一次处理的选项"""
+
+    def __init__(self, operation_mode="move", extract_mode=EXTRACT_STREAM,
+                 workers=1, pool_kind=POOL_THREAD, unmatched_policy=UNMATCHED_EXTRACT,
+                 resume=True, incremental=False, dedup=DEDUP_OFF, nested=False,
+                 nested_depth=DEFAULT_MAX_DEPTH, nested_max_bytes=DEFAULT_MAX_BYTES,
+                 match_target=MATCH_NAME, content_max_bytes=DEFAULT_SCAN_BYTES, check_space=True,
+                 repack=None, low_memory=False, durability=DURABILITY_NONE,
+                 sync_every=DEFAULT_SYNC_EVERY):
+        if operation_mode not in OPERATION_MODES:
+            raise ValueError(f"未知的操作模式: {operation_mode}")
+        if unmatched_policy not in UNMATCHED_POLICIES:
+            raise ValueError(f"未知的未匹配文件处理方式: {unmatched_policy}")
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"未知的去重方式: {dedup}")
+        if match_target not in MATCH_TARGETS:
+            raise ValueError(f"未知的匹配范围: {match_target}")
+        if repack is not None and repack not in REPACK_FORMATS:
+            raise ValueError(f"未知的打包格式: {repack}")
+        if durability not in DURABILITY_LEVELS:
+            raise ValueError(f"未知的持久性级别: {durability}")
+        self.operation_mode = operation_mode
+        self.unmatched_policy = unmatched_policy
+        self.extract_mode = extract_mode
+        self.workers = max(1, workers)
+        self.pool_kind = pool_kind
+        # 记录运行日志，中断后重新运行时跳过已完成的成员
+        self.resume = resume
+        # 增量处理：目标文件夹中名称、大小、CRC 都一致的成员不再解压
+        self.incremental = incremental
+        # 内容相同的成员只解压一次，其余的硬链接到第一份或只写清单
+        self.dedup = dedup
+        # 成员中的压缩包继续解压，关键字匹配 外层/内层.zip/文件 这样的虚拟路径
+        self.nested = nested
+        self.nested_depth = nested_depth
+        self.nested_max_bytes = nested_max_bytes
+        # 匹配范围：文件名、文件内容或两者之一；按内容匹配时每个成员最多扫描的字节数
+        self.match_target = match_target
+        self.content_max_bytes = content_max_bytes
+        # 开始前按中央目录计算要写入的字节数，磁盘放不下时拒绝处理
+        self.check_space = check_space
+        # 直接打包输出（repack.REPACK_ZIP / REPACK_TAR）：匹配和未匹配的成员写进两个新压缩包，
+        # 不写出单个文件；操作模式、运行日志、增量处理、去重和嵌套压缩包都不适用
+        self.repack = repack
+        # 省内存模式：ZIP 逐块读取中央目录、读一块处理一块，不建立整个压缩包的索引；
+        # 逐个解压，并行、增量处理、去重和嵌套压缩包都不适用
+        self.low_memory = low_memory
+        # 输出的持久性：none 交给操作系统回写，batch 每写 sync_every 个文件 fsync 一次，
+        # file 每个文件都 fsync；运行日志只记录已经落盘的成员
+        self.durability = durability
+        self.sync_every = sync_every
+
+    def content_matcher(self, matcher):
+        """按内容匹配时的匹配器，只看文件名时为 None"""
+        if self.match_target == MATCH_NAME:
+            return None
+        return ContentMatcher(matcher, self.content_max_bytes)
+
+    def output_writer(self):
+        """一次处理共用的写入器"""
+        return OutputWriter(self.durability, self.sync_every)
+
+
+def journal_settings(matcher, options):
+    """运行日志中记录的处理设置：与上次不一致时日志作废，不会跳过按别的设置处理过的成员
+
+    新增会改变成员去向或写法的选项时加在这里，所有处理方式共用。
+    """
+    return {"matcher": [matcher.mode, list(matcher.keywords)],
+            "operation_mode": options.operation_mode,
+            "unmatched_policy": options.unmatched_policy,
+            "match_target": options.match_target,
+            # 是否展开内层压缩包决定了它们作为一个文件还是一组成员记为完成
+            "nested": [options.nested, options.nested_depth] if options.nested else False}
+
+
+def open_journal(output_dir, archive_path, matcher, options, writer):
+    """打开压缩包的运行日志；不续传时返回 None"""
+    if not options.resume:
+        return None
+    journal = RunJournal(journal_path(output_dir, archive_path),
+                         journal_settings(matcher, options), root=output_dir,
+                         before_sync=writer.sync)
+    # 要在文件名登记表扫描目标文件夹之前删除上次没有完成的成员
+    journal.recover()
+    return journal
+
+
+class _Run:
+    """一次处理过程中共用的状态"""
+
+    def __init__(self, archive_path, index, flags, options, progress):
+        self.archive_path = archive_path
+        self.index = index
+        self.flags = flags
+        self.options = options
+        self.progress = progress
+        self.matched_dir = None
+        self.unmatched_dir = None
+        self.store = None
+        self.journal = None
+        # 增量处理：每个目标文件夹的已有文件索引、未变化的成员（-> 已有文件）、覆盖旧版本的目标路径
+        self.destinations = None
+        self.unchanged = {}
+        self.stale_targets = {}
+        # 去重：重复成员的计划，以及已经写出的第一份（序号 -> 路径）
+        self.dedup = None
+        self.placed = {}
+        self.dedup_rows = []
+        self.dedup_count = 0
+        self.dedup_bytes = 0
+        # 实际解压写出的字节数和所用时间
+        self.written_bytes = 0
+        self.extract_seconds = 0.0
+        # 作为内层压缩包解压的成员，不参与匹配，主流程中跳过
+        self.containers = set()
+        # 分阶段计时（profiling.RunProfile），关闭时为 NULL_PROFILE
+        self.profile = NULL_PROFILE
+        # 所有成员共用的写入器，按选项的持久性级别 fsync
+        self.writer = options.output_writer()
+
+    def is_done(self, i):
+        """上次中断前已经完成，或者增量处理时内容未变化的成员"""
+        if i in self.unchanged:
+            return True
+        journal = self.journal
+        return journal is not None and journal.is_done(i, self.index.crcs[i])
+
+    def reserve(self, targets):
+        """写出成员之前在运行日志中记下一批 (序号, 目标路径)"""
+        if self.journal is not None:
+            self.journal.reserve(targets)
+
+    def record(self, i, target_path):
+        """记录一个已完成的成员；target_path 为 None 表示只写进了清单（不记日志，清单每次重写）"""
+        if target_path is None:
+            return
+        if self.journal is not None:
+            self.journal.record(i, self.index.crcs[i])
+        if self.destinations is not None:
+            self.destinations[self.flags[i]].remember(target_path, self.index.crcs[i])
+        if self.dedup is not None and i in self.dedup.leaders:
+            self.placed[i] = target_path
+
+    def plan_incremental(self):
+        """对照目标文件夹找出未变化的成员，变化了的成员覆盖同名的旧版本
+
+        先为所有成员找内容一致的文件，再分配旧版本，
+        这样同名成员中一个变化了也不会占用另一个未变化成员的文件。
+        旧版本在空间检查通过后由 remove_stale 删除。
+        """
+        index = self.index
+        self.destinations = {1: DestinationIndex(self.matched_dir)}
+        if self.unmatched_dir:
+            self.destinations[0] = DestinationIndex(self.unmatched_dir)
+
+        pending = []
+        for i in range(len(index)):
+            destination = self.destinations.get(self.flags[i])
+            if destination is None or i in self.containers or self.is_done(i):
+                continue
+            basename = os.path.basename(index.name(i))
+            existing = destination.claim_unchanged(basename, index.file_sizes[i], index.crcs[i])
+            if existing:
+                self.unchanged[i] = existing
+            else:
+                pending.append((i, basename))
+
+        for i, basename in pending:
+            target_path = self.destinations[self.flags[i]].claim_stale(basename)
+            if target_path is not None:
+                self.stale_targets[i] = target_path
+
+    def remove_stale(self):
+        """删除要被覆盖的旧版本"""
+        for target_path in self.stale_targets.values():
+            os.remove(target_path)
+
+    def space_plan(self, output_dir):
+        """还要写入的成员按目标文件夹计入空间（上次已完成和未变化的成员不计）"""
+        plan = ProcessPlan(self.archive_path, output_dir, self.options.operation_mode)
+        dirs = data_dirs(output_dir, self.options)
+        index = self.index
+        for i in range(len(index)):
+            directory = dirs[self.flags[i]]
+            if directory is not None and not self.is_done(i):
+                plan.reserve(directory, index.file_sizes[i])
+        return plan
+
+    def plan_dedup(self):
+        """找出内容重复的成员；增量处理时未变化的成员也可以作为第一份"""
+        index = self.index
+        positions = [i for i in range(len(index))
+                     if (self.flags[i] or self.unmatched_dir) and i not in self.containers and
+                     (i in self.unchanged or not self.is_done(i))]
+        with ZipMemberReader(self.archive_path) as reader:
+            self.dedup = DedupPlan.build(reader, index, positions)
+        for i in self.dedup.leaders:
+            if i in self.unchanged:
+                self.placed[i] = self.unchanged[i]
+
+    def is_duplicate(self, i):
+        """重复成员，并且第一份已经写出"""
+        return self.dedup is not None and i in self.dedup and self.dedup.leader(i) in self.placed
+
+    def place_duplicate(self, i, target_path):
+        """把重复成员硬链接到第一份（清单模式下 target_path 为 None，只写清单），返回是否成功
+
+        target_path 由调用方事先在运行日志中记下；失败时调用方照常解压这个成员。
+        """
+        leader_path = self.placed[self.dedup.leader(i)]
+        size = self.index.file_sizes[i]
+        if target_path is None:
+            self.dedup_rows.append([self.index.name(i), size, f"{self.index.crcs[i]:08x}",
+                                    leader_path])
+        else:
+            try:
+                link_or_copy(leader_path, target_path)
+            except OSError:
+                return False
+            self.writer.track(target_path)
+        self.record(i, target_path)
+        self.dedup_count += 1
+        self.dedup_bytes += size
+        return True
+
+    def dedup_seconds(self):
+        """去重省下的时间：按本次解压速度估算重复成员的解压时间，减去确认重复所用的时间"""
+        if self.dedup is None or not self.written_bytes:
+            return 0.0
+        return max(0.0, self.extract_seconds * self.dedup_bytes / self.written_bytes -
+                   self.dedup.hash_seconds)
+
+    def close(self, completed):
+        self.writer.sync()
+        if self.journal is not None:
+            self.journal.close(complete=completed)
+        if self.destinations is not None:
+            for destination in self.destinations.values():
+                destination.save()
+
+
+class _PrefixedStream:
+    """先读出已经读到的开头部分，再接着读原数据流"""
+
+    def __init__(self, head, stream):
+        self.head = head
+        self.stream = stream
+
+    def read(self, size=-1):
+        head = self.head
+        if not head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            self.head = b""
+            return head + self.stream.read()
+        self.head = head[size:]
+        return head[:size]
+
+
+class _StreamOutput:
+    """按顺序读取成员时共用的输出状态（非 ZIP 格式和嵌套的压缩包）"""
+
+    def __init__(self, matcher, matched_dir, unmatched_dir, options, progress, store, temp_dir,
+                 writer):
+        self.matcher = matcher
+        self.options = options
+        self.progress = progress
+        self.store = store
+        self.temp_dir = temp_dir
+        self.writer = writer
+        compact = options.low_memory
+        self.matched_names = NameRegistry(matched_dir, compact)
+        self.unmatched_names = NameRegistry(unmatched_dir, compact) if unmatched_dir else None
+        self.content = options.content_matcher(matcher)
+        self.limits = None
+        if options.nested:
+            self.limits = NestedLimits(options.nested_depth, options.nested_max_bytes)
+        self.manifest_rows = []
+        self.total_count = 0
+        self.matched_count = 0
+        self.failed_count = 0
+        self.profile = NULL_PROFILE
+        # 续传时写出之前在运行日志中记下目标路径，记在当前顶层成员的序号 position 下。
+        # 顺序读取时不能预先知道后面的成员名，较小的成员先读进内存，攒够一块再一起记下目标路径、
+        # 写出；pending 为 (序号, 登记表, 文件名, 目标路径, 成员, 数据)，
+        # deferred 为等这一块写出后才能记为完成的顶层成员 (序号, CRC)，
+        # failed_positions 为暂存的成员写出失败、不能记为完成的顶层成员
+        self.journal = None
+        self.position = None
+        self.pending = []
+        self.pending_bytes = 0
+        self.deferred = []
+        self.failed_positions = set()
+
+    def is_container(self, name, depth):
+        """depth 层中名为 name 的成员作为内层压缩包继续解压"""
+        return self.limits is not None and self.limits.can_descend(name, depth)
+
+    def classify(self, name):
+        """文件名能决定去向时返回 1/0，要读取内容才知道时返回 UNDECIDED"""
+        target = self.options.match_target
+        if target != MATCH_CONTENT and self.matcher.match(name):
+            return 1
+        return 0 if target == MATCH_NAME else UNDECIDED
+
+    def skip(self, name, entry):
+        """不解压的未匹配成员：清单模式下写进清单"""
+        if self.options.unmatched_policy == UNMATCHED_MANIFEST:
+            crc = "" if entry.crc is None else f"{entry.crc:08x}"
+            self.manifest_rows.append([name, entry.size, "", crc])
+
+    def write(self, entry, stream, is_matched):
+        """把一个成员写到匹配/未匹配文件夹，返回是否成功
+
+        记运行日志时较小的成员暂存在内存中，攒够一块才写出，写出失败在 flush 中计入。
+        """
+        registry = self.matched_names if is_matched else self.unmatched_names
+        basename = os.path.basename(entry.name)
+        target_path = registry.reserve(basename)
+        if self.journal is not None:
+            try:
+                data = stream.read(STREAM_BUFFER_MEMBER + 1)
+            except Exception:
+                registry.release(basename, target_path)
+                self.failed_count += 1
+                return False
+            if len(data) <= STREAM_BUFFER_MEMBER:
+                self.pending.append((self.position, registry, basename, target_path, entry, data))
+                self.pending_bytes += len(data)
+                self.matched_count += is_matched
+                if (len(self.pending) >= RESERVE_BLOCK or
+                        self.pending_bytes >= STREAM_BUFFER_BYTES):
+                    self.flush()
+                return True
+            # 较大的成员和暂存的成员一起记下目标路径，先写出暂存的，再边读边写
+            self.flush(((self.position, target_path),))
+            stream = _PrefixedStream(data, stream)
+        if self._write(registry, basename, target_path, entry, stream):
+            self.matched_count += is_matched
+            return True
+        return False
+
+    def _write(self, registry, basename, target_path, entry, stream):
+        profile = self.profile
+        if profile.enabled:
+            start = time.perf_counter()
+        try:
+            if self.store is not None:
+                self.store.place_stream(entry, stream, target_path, self.writer)
+            else:
+                self.writer.write(stream, target_path, entry.size, entry.mtime, entry.mode)
+        except Exception:
+            registry.release(basename, target_path)
+            self.failed_count += 1
+            return False
+        if profile.enabled:
+            # 顺序读取的格式没有单个成员的压缩后大小，读取量按整个压缩包计入
+            seconds = time.perf_counter() - start
+            profile.add("extract", seconds)
+            profile.entry(entry.name, seconds, 0, entry.size)
+        return True
+
+    def flush(self, extra=()):
+        """在运行日志中一次记下暂存成员（和 extra 中的成员）的目标路径，写出暂存的成员，
+        再记下等待这一块的顶层成员"""
+        pending, self.pending = self.pending, []
+        self.pending_bytes = 0
+        targets = [(position, target_path) for position, _, _, target_path, _, _ in pending]
+        targets.extend(extra)
+        if targets:
+            self.journal.reserve(targets)
+        failed = self.failed_positions
+        for position, registry, basename, target_path, entry, data in pending:
+            if not self._write(registry, basename, target_path, entry, io.BytesIO(data)):
+                self.matched_count -= registry is self.matched_names
+                failed.add(position)
+        deferred, self.deferred = self.deferred, []
+        for position, crc in deferred:
+            if position not in failed:
+                self.journal.record(position, crc)
+
+    def finish(self, position, crc, ok):
+        """一个顶层成员（内层压缩包时是其中所有成员）处理完毕：全部成功时记为完成
+
+        它的成员还暂存在内存中时等 flush 写出后再记。
+        """
+        if not ok or position in self.failed_positions:
+            return
+        if self.pending and self.pending[-1][0] == position:
+            self.deferred.append((position, crc))
+        else:
+            self.journal.record(position, crc)
+
+    def write_scanned(self, entry, stream):
+        """先扫描内容决定去向，再写到匹配/未匹配文件夹，返回是否成功
+
+        数据边扫描边暂存（较大时在临时文件中）；不解压未匹配文件时，
+        扫描到上限仍未命中就不再读取。
+        """
+        keep_unmatched = self.unmatched_names is not None
+        try:
+            found, spooled = self.content.spool(stream, keep_unmatched, self.temp_dir)
+        except Exception:
+            self.failed_count += 1
+            return False
+        if spooled is None:
+            self.skip(entry.name, entry)
+            return True
+        with spooled:
+            return self.write(entry, spooled, 1 if found else 0)
+
+
+class FileMoverEngine:
+    """压缩包预览与处理"""
+
+    def __init__(self, index_cache=None):
+        self.index_cache = index_cache if index_cache is not None else ArchiveIndexCache()
+
+    def load_index(self, archive_path):
+        """取得压缩包索引（带缓存）"""
+        try:
+            return self.index_cache.get(archive_path)
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+
+    def open_archive(self, archive_path):
+        """打开非 ZIP 格式的压缩包"""
+        try:
+            return open_archive(archive_path)
+        except UnsupportedArchive as e:
+            raise ArchiveError(str(e))
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+
+    def match_flags(self, archive_path, index, matcher, options, skip=()):
+        """每个成员是否匹配（bytearray）；按内容匹配时并行扫描文件名不能决定的成员
+
+        skip 中的成员（嵌套的压缩包）不扫描。
+        """
+        flags = index.match_flags(matcher)
+        content = options.content_matcher(matcher)
+        if content is None:
+            return flags
+        # 缓存中的结果不能修改
+        flags = bytearray(flags) if options.match_target == MATCH_ANY else bytearray(len(index))
+        positions = [i for i in range(len(index)) if not flags[i] and i not in skip]
+        try:
+            hits, _ = scan_archive(archive_path, index, positions, content, options.workers,
+                                   options.pool_kind)
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+        for i in hits:
+            flags[i] = 1
+        return flags
+
+    def check_space(self, plan):
+        """目标磁盘放不下计划要写入的数据时抛出 InsufficientSpace"""
+        shortfalls = plan.shortfalls()
+        if shortfalls:
+            volume = shortfalls[0]
+            raise InsufficientSpace(f"磁盘空间不足: {volume.path} 需要 {format_bytes(volume.required)}"
+                                    f"（另留 {format_bytes(RESERVE_BYTES)}），"
+                                    f"剩余 {format_bytes(volume.free)}")
+
+    def plan(self, archive_path, matcher, output_dir, options=None, measure=False):
+        """处理计划：每个成员的目标路径、每个目标文件夹要写入的字节数（不写出任何文件）
+
+        目标路径按全新处理计算（不考虑运行日志、增量处理和去重）。
+        measure 为真时抽样解压测速并估算耗时（只用于本地的 ZIP；远程地址不为测速取回成员数据，
+        预览只取结尾记录和中央目录）。
+        非 ZIP 格式按内容匹配时不读取数据，文件名不能决定去向的成员按匹配计算。
+        """
+        if options is None:
+            options = ProcessOptions()
+        plan = ProcessPlan(archive_path, output_dir, options.operation_mode)
+        dirs = data_dirs(output_dir, options)
+        matched_names = NameRegistry(os.path.join(output_dir, MATCHED_DIR_NAME))
+        unmatched_names = None
+        if options.unmatched_policy == UNMATCHED_EXTRACT:
+            unmatched_names = NameRegistry(os.path.join(output_dir, UNMATCHED_DIR_NAME))
+
+        if is_zip(archive_path):
+            index = self.load_index(archive_path)
+            flags = self.match_flags(archive_path, index, matcher, options)
+            for task in plan_extract_tasks(index, flags, matched_names, unmatched_names):
+                plan.add(task.file_info.filename, task.size, task.file_info.compress_size,
+                         task.target_path, task.matched, task.position, dirs[task.matched])
+            if measure and not is_url(archive_path):
+                try:
+                    plan.measure(index, options.workers)
+                except Exception as e:
+                    raise ArchiveError(f"无法处理压缩包: {e}")
+            return plan
+
+        with self.open_archive(archive_path) as archive:
+            try:
+                for entry in archive.entries():
+                    is_matched = planned_match(matcher, entry.name, options)
+                    if not is_matched and unmatched_names is None:
+                        continue
+                    registry = matched_names if is_matched else unmatched_names
+                    plan.add(entry.name, entry.size, 0,
+                             registry.reserve(os.path.basename(entry.name)), is_matched,
+                             entry.position, dirs[is_matched])
+            except Exception as e:
+                raise ArchiveError(f"无法处理压缩包: {e}")
+        return plan
+
+    def preview(self, archive_path, matcher, options=None):
+        """只根据中央目录统计匹配数量和字节数，不解压
+
+        非 ZIP 格式只读成员列表（tar.gz 等需要解压一遍但不写出），压缩后大小记为 0。
+        按内容匹配时（options.match_target）要读取成员数据，但仍然不写出。
+        """
+        if options is None:
+            options = ProcessOptions()
+        if not is_zip(archive_path):
+            return self.preview_stream(archive_path, matcher, options)
+        if options.low_memory and options.match_target == MATCH_NAME:
+            return self.preview_blocks(archive_path, matcher)
+        index = self.load_index(archive_path)
+        flags = self.match_flags(archive_path, index, matcher, options)
+        unmatched_bytes = 0
+        unmatched_compressed = 0
+        for flag, size, compressed in zip(flags, index.file_sizes, index.compress_sizes):
+            if not flag:
+                unmatched_bytes += size
+                unmatched_compressed += compressed
+        return PreviewResult(len(index), flags.count(1), sum(index.file_sizes),
+                             unmatched_bytes, unmatched_compressed)
+
+    def preview_blocks(self, archive_path, matcher):
+        """省内存模式的预览：逐块读取中央目录统计，不建立索引"""
+        total_count = matched_count = total_bytes = unmatched_bytes = unmatched_compressed = 0
+        try:
+            with open_archive_file(archive_path) as fp:
+                for _, block in iter_central_blocks(fp):
+                    flags = block.match_flags(matcher)
+                    total_count += len(block)
+                    matched_count += flags.count(1)
+                    total_bytes += sum(block.file_sizes)
+                    for flag, size, compressed in zip(flags, block.file_sizes,
+                                                      block.compress_sizes):
+                        if not flag:
+                            unmatched_bytes += size
+                            unmatched_compressed += compressed
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+        return PreviewResult(total_count, matched_count, total_bytes, unmatched_bytes,
+                             unmatched_compressed)
+
+    def preview_stream(self, archive_path, matcher, options):
+        total_count = matched_count = total_bytes = unmatched_bytes = 0
+        content = options.content_matcher(matcher)
+        by_name = options.match_target != MATCH_CONTENT
+        with self.open_archive(archive_path) as archive:
+            try:
+                if content is None:
+                    members = ((entry, None) for entry in archive.entries())
+                else:
+                    members = archive.iter_members()
+                for entry, stream in members:
+                    total_count += 1
+                    total_bytes += entry.size
+                    if ((by_name and matcher.match(entry.name)) or
+                            (content is not None and content.scan(stream)[0])):
+                        matched_count += 1
+                    else:
+                        unmatched_bytes += entry.size
+            except Exception as e:
+                raise ArchiveError(f"无法处理压缩包: {e}")
+        return PreviewResult(total_count, matched_count, total_bytes, unmatched_bytes, 0)
+
+    def process(self, archive_path, matcher, output_dir, options=None, progress=None,
+                profile=None):
+        """处理一个压缩包，结果写到 output_dir 下的匹配/未匹配文件夹
+
+        传入 profile（profiling.RunProfile）时记录各阶段和每个成员的耗时。
+        """
+        if options is None:
+            options = ProcessOptions()
+        if progress is None:
+            progress = ProgressTracker()
+        if profile is None:
+            profile = NULL_PROFILE
+        if options.repack is not None:
+            return self.process_repack(archive_path, matcher, output_dir, options, progress,
+                                       profile)
+        if not is_zip(archive_path):
+            return self.process_stream(archive_path, matcher, output_dir, options, progress,
+                                       profile=profile)
+        if options.low_memory:
+            return self.process_low_memory(archive_path, matcher, output_dir, options, progress,
+                                           profile)
+
+        with profile.stage("index"):
+            index = self.load_index(archive_path)
+        containers = set()
+        if options.nested:
+            limits = NestedLimits(options.nested_depth)
+            containers = {i for i in range(len(index)) if limits.can_descend(index.name(i), 0)}
+        if options.match_target != MATCH_NAME:
+            progress.status("正在扫描文件内容...", "按内容匹配关键字", "🔍")
+        with profile.stage("match"):
+            flags = self.match_flags(archive_path, index, matcher, options, containers)
+        run = _Run(archive_path, index, flags, options, progress)
+        run.containers = containers
+        run.profile = profile
+
+        extract_unmatched = options.unmatched_policy == UNMATCHED_EXTRACT
+        run.matched_dir, run.unmatched_dir = prepare_output_dirs(output_dir, extract_unmatched)
+
+        # 链接模式：成员解压到输出目录下的内容库，目标文件夹中放链接
+        if options.operation_mode == "link":
+            run.store = ContentStore(os.path.join(output_dir, STORE_DIR_NAME), archive_path)
+
+        run.journal = open_journal(output_dir, archive_path, matcher, options, run.writer)
+
+        completed = False
+        nested = None
+        try:
+            with profile.stage("prepare"):
+                if options.incremental:
+                    run.plan_incremental()
+                if options.check_space:
+                    self.check_space(run.space_plan(output_dir))
+                run.remove_stale()
+                if options.dedup != DEDUP_OFF:
+                    run.plan_dedup()
+            if options.workers > 1:
+                result = self.process_parallel(run)
+            else:
+                result = self.process_serial(run)
+            if run.containers:
+                with profile.stage("nested"):
+                    nested = self.process_containers(run, matcher)
+            completed = True
+        finally:
+            run.close(completed)
+        with profile.stage("manifest"):
+            if options.unmatched_policy == UNMATCHED_MANIFEST:
+                write_unmatched_manifest(os.path.join(output_dir, MANIFEST_NAME), index,
+                                         run.flags, run.containers,
+                                         nested.manifest_rows if nested else ())
+            if options.dedup == DEDUP_MANIFEST:
+                write_dedup_manifest(os.path.join(output_dir, DEDUP_MANIFEST_NAME),
+                                     run.dedup_rows)
+        if nested is not None:
+            result = result._replace(
+                matched_count=result.matched_count + nested.matched_count,
+                total_count=result.total_count - len(run.containers) + nested.total_count,
+                failed_count=result.failed_count + nested.failed_count)
+        return result._replace(skipped_count=len(run.unchanged), dedup_count=run.dedup_count,
+                               dedup_bytes=run.dedup_bytes,
+                               dedup_seconds=run.dedup_seconds())
+
+    def process_serial(self, run):
+        """逐个处理压缩包成员"""
+        index, flags, options, progress = run.index, run.flags, run.options, run.progress
+        profile = run.profile
+        profiling = profile.enabled
+        matched_count = 0
+        failed_count = 0
+        total_count = len(index)
+        progress.start(total_count, extracted_bytes(index, flags, options.unmatched_policy))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            try:
+                with ZipMemberReader(run.archive_path) as reader:
+                    # 计时时读取和解压的耗时单独计入 decompress 阶段
+                    zip_file = ProfiledReader(reader, profile) if profiling else reader
+                    matched_names = NameRegistry(run.matched_dir)
+                    unmatched_names = NameRegistry(run.unmatched_dir) if run.unmatched_dir else None
+                    # 清单模式下重复成员不占用文件名，第一份写出失败时才临时分配
+                    manifest_only = run.dedup is not None and options.dedup == DEDUP_MANIFEST
+
+                    def needs_target(i):
+                        return (i not in run.containers and
+                                (flags[i] or unmatched_names is not None) and
+                                not run.is_done(i) and not (manifest_only and i in run.dedup))
+
+                    def target_of(i):
+                        registry = matched_names if flags[i] else unmatched_names
+                        return run.stale_targets.get(i) or registry.reserve(
+                            os.path.basename(index.name(i)))
+
+                    planned = {}
+                    for i in range(total_count):
+                        if i in run.containers:
+                            # 内层压缩包在主流程之后单独处理
+                            continue
+                        is_matched = flags[i]
+                        if not is_matched and unmatched_names is None:
+                            # 只看中央目录就跳过，完全不解压
+                            progress.advance(1, 0)
+                            continue
+
+                        progress.advance(1, index.file_sizes[i])
+
+                        if run.is_done(i):
+                            if is_matched:
+                                matched_count += 1
+                            continue
+
+                        file_info = index.zipinfo(i)
+                        filename = file_info.filename
+
+                        registry = matched_names if is_matched else unmatched_names
+                        basename = os.path.basename(filename)
+
+                        if profiling:
+                            start = time.perf_counter()
+                        if i not in planned and needs_target(i):
+                            planned = plan_targets(
+                                filter(needs_target, range(i, total_count)), target_of,
+                                run.journal)
+                        target_path = planned.pop(i, None)
+                        if run.is_duplicate(i):
+                            if run.place_duplicate(i, target_path):
+                                if is_matched:
+                                    matched_count += 1
+                                continue
+
+                        if target_path is None:
+                            target_path = target_of(i)
+                            run.reserve(((i, target_path),))
+                        if profiling:
+                            profile.add("naming", time.perf_counter() - start)
+
+                        try:
+                            start = time.perf_counter()
+                            extract_member(zip_file, file_info, target_path, options.operation_mode,
+                                           options.extract_mode, temp_dir, run.store, run.writer)
+                            seconds = time.perf_counter() - start
+                            run.extract_seconds += seconds
+                            run.written_bytes += file_info.file_size
+                            if profiling:
+                                profile.add("extract", seconds)
+                                profile.entry(filename, seconds, file_info.compress_size,
+                                              file_info.file_size)
+                                start = time.perf_counter()
+                            run.record(i, target_path)
+                            if profiling:
+                                profile.add("journal", time.perf_counter() - start)
+
+                            if is_matched:
+                                matched_count += 1
+
+                        except Exception as e:
+                            registry.release(basename, target_path)
+                            failed_count += 1
+                            continue
+
+            except Exception as e:
+                raise ArchiveError(f"无法处理压缩包: {e}")
+
+        return ProcessResult(matched_count, total_count, failed_count)
+
+    def process_parallel(self, run):
+        """并行处理压缩包成员（始终流式解压）"""
+        index, flags, options, progress = run.index, run.flags, run.options, run.progress
+        profile = run.profile
+        total_count = len(index)
+        dedup = run.dedup
+
+        def is_duplicate(i):
+            return dedup is not None and i in dedup
+
+        try:
+            matched_names = NameRegistry(run.matched_dir)
+            unmatched_names = NameRegistry(run.unmatched_dir) if run.unmatched_dir else None
+            # 清单模式下重复成员不占用文件名
+            manifest_only = dedup is not None and options.dedup == DEDUP_MANIFEST
+            with profile.stage("naming"):
+                tasks = plan_extract_tasks(
+                    index, flags, matched_names, unmatched_names,
+                    lambda i: (i in run.containers or run.is_done(i) or
+                               (manifest_only and is_duplicate(i))), run.stale_targets)
+            primary = [task for task in tasks if not is_duplicate(task.position)]
+            duplicates = [task for task in tasks if is_duplicate(task.position)]
+            if manifest_only:
+                duplicates = [ExtractTask(index.zipinfo(i), None, index.file_sizes[i], flags[i], i)
+                              for i in sorted(dedup.duplicates) if not run.is_done(i)]
+            resumed_matched = sum(1 for i in range(total_count)
+                                  if flags[i] and i not in run.containers and run.is_done(i))
+
+            progress.start(total_count, extracted_bytes(index, flags, options.unmatched_policy))
+            # 跳过的成员直接计入进度（内层压缩包在主流程之后计入）
+            progress.advance(total_count - len(primary) - len(duplicates) - len(run.containers), 0)
+
+            extractor = ParallelExtractor(run.archive_path, options.workers, options.pool_kind,
+                                          run.store, timed=profile.enabled, writer=run.writer)
+
+            def extract(batch):
+                """并行解压一组任务，返回成功标记列表"""
+                def on_done(done):
+                    for k in done:
+                        run.record(batch[k].position, batch[k].target_path)
+                run.reserve([(task.position, task.target_path) for task in batch])
+                start = time.perf_counter()
+                results = extractor.run(batch, progress=progress.advance, on_done=on_done)
+                seconds = time.perf_counter() - start
+                run.extract_seconds += seconds
+                run.written_bytes += sum(task.size for task, ok in zip(batch, results) if ok)
+                if profile.enabled:
+                    # 阶段耗时按墙钟时间计；每个成员的耗时在工作者中测得
+                    profile.add("extract", seconds)
+                    for k, member_seconds in extractor.timings:
+                        task = batch[k]
+                        profile.entry(task.file_info.filename, member_seconds,
+                                      task.file_info.compress_size, task.size)
+                return results
+
+            results = extract(primary)
+            finished = [task for task, ok in zip(primary, results) if ok]
+            # 重复成员链接之前一次记下所有目标路径
+            run.reserve([(task.position, task.target_path) for task in duplicates
+                         if task.target_path is not None])
+
+            # 第一份写出后，重复成员硬链接过去或只写清单；第一份失败的重复成员照常解压
+            fallback = []
+            for task in duplicates:
+                if run.is_duplicate(task.position) and run.place_duplicate(task.position,
+                                                                           task.target_path):
+                    progress.advance(1, task.size)
+                    finished.append(task)
+                    continue
+                if task.target_path is None:
+                    registry = matched_names if task.matched else unmatched_names
+                    task = task._replace(target_path=registry.reserve(
+                        os.path.basename(task.file_info.filename)))
+                fallback.append(task)
+            if fallback:
+                fallback_results = extract(fallback)
+                finished.extend(task for task, ok in zip(fallback, fallback_results) if ok)
+
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+
+        matched_count = resumed_matched + sum(1 for task in finished if task.matched)
+        failed_count = len(primary) + len(duplicates) - len(finished)
+        return ProcessResult(matched_count, total_count, failed_count)
+
+    def process_containers(self, run, matcher):
+        """ZIP 主流程之后，逐个打开作为内层压缩包的成员并处理其中的成员
+
+        文件名登记表重新扫描目标文件夹，主流程写出的文件都已经在里面。
+        """
+        options, progress = run.options, run.progress
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out = _StreamOutput(matcher, run.matched_dir, run.unmatched_dir, options, progress,
+                                run.store, temp_dir, run.writer)
+            out.journal = run.journal
+            try:
+                with ZipArchive(run.archive_path, run.index) as archive:
+                    for i in sorted(run.containers):
+                        entry = archive.entry(i)
+                        counted = run.flags[i] or run.unmatched_dir is not None
+                        if not run.is_done(i):
+                            out.position = i
+                            with archive.open_member(entry) as stream:
+                                ok = self.process_nested(out, entry, stream, 0)
+                            if run.journal is not None:
+                                out.finish(i, entry.crc, ok)
+                        progress.advance(1, entry.size if counted else 0)
+                    out.flush()
+            except Exception as e:
+                raise ArchiveError(f"无法处理压缩包: {e}")
+        return out
+
+    def process_nested(self, out, entry, stream, depth):
+        """把 depth 层的成员 entry（名称为虚拟路径）当作压缩包打开，处理其中的成员
+
+        内层压缩包读进内存或临时文件，读入的字节数计入限额。
+        打不开时（格式损坏、缺少依赖）当作普通文件按虚拟路径匹配写出。
+        返回是否全部成功；超过限额时不再继续解压，这个压缩包计为失败。
+        """
+        limits = out.limits
+        if limits.exhausted:
+            out.failed_count += 1
+            return False
+        try:
+            spooled = spool_member(stream, limits, out.temp_dir)
+        except NestedLimitExceeded:
+            out.failed_count += 1
+            return False
+
+        with spooled:
+            try:
+                archive = open_archive(entry.name, fileobj=spooled)
+            except Exception:
+                archive = None
+            if archive is None:
+                is_matched = out.classify(entry.name)
+                out.total_count += 1
+                spooled.seek(0)
+                if is_matched == UNDECIDED:
+                    return out.write_scanned(entry, spooled)
+                if not is_matched and out.unmatched_names is None:
+                    out.skip(entry.name, entry)
+                    return True
+                return out.write(entry, spooled, is_matched)
+
+            failed = out.failed_count
+            try:
+                with archive:
+                    self.process_entries(archive, out, entry.name, depth + 1)
+            except Exception:
+                out.failed_count += 1
+            return out.failed_count == failed
+
+    def process_entries(self, archive, out, prefix="", depth=0, journal=None):
+        """按压缩包中的顺序读取成员，写到匹配/未匹配文件夹
+
+        prefix 为嵌套压缩包的虚拟路径（顶层为空）；只有顶层成员记运行日志。
+        嵌套压缩包中写出的数据也计入限额，超过后停止读取这一层。
+        """
+        options, progress, limits = out.options, out.progress, out.limits
+        flags = {}
+        counts = {"wanted": 0, "done": 0}
+
+        def wanted(entry):
+            """决定是否读取成员数据；其余成员只计数"""
+            name = virtual_path(prefix, entry.name)
+            if depth or not archive.cheap_listing:
+                progress.extend(1, entry.size)
+            # 内层压缩包不参与匹配，也不计入成员总数
+            is_matched = None
+            if not out.is_container(name, depth):
+                is_matched = out.classify(name)
+                out.total_count += 1
+            if journal is not None and journal.is_done(entry.position, entry.crc or 0):
+                # 按内容匹配的成员上次的结果没有记录，不计入匹配数
+                out.matched_count += is_matched == 1
+                progress.advance(1, entry.size)
+                return False
+            flags[entry.position] = is_matched
+            if is_matched == 0 and out.unmatched_names is None:
+                out.skip(name, entry)
+                progress.advance(1, 0)
+                return False
+            counts["wanted"] += 1
+            return True
+
+        for entry, stream in archive.iter_members(wanted):
+            is_matched = flags[entry.position]
+            if prefix:
+                entry = entry._replace(name=virtual_path(prefix, entry.name))
+            if journal is not None:
+                out.position = entry.position
+            if is_matched is None:
+                ok = self.process_nested(out, entry, stream, depth)
+            else:
+                # 内层压缩包中的成员写出时计入限额（内层压缩包本身读入时已经计入）
+                if prefix:
+                    stream = BudgetReader(stream, limits)
+                if is_matched == UNDECIDED:
+                    ok = out.write_scanned(entry, stream)
+                else:
+                    ok = out.write(entry, stream, is_matched)
+            if journal is not None:
+                out.finish(entry.position, entry.crc or 0, ok)
+            counts["done"] += 1
+            progress.advance(1, entry.size)
+            if prefix and limits.exhausted:
+                break
+        else:
+            # 要读取却没有读到的成员（后端没有给出数据）
+            out.failed_count += counts["wanted"] - counts["done"]
+
+    def process_low_memory(self, archive_path, matcher, output_dir, options, progress,
+                           profile=NULL_PROFILE):
+        """省内存模式：逐块读取中央目录，读一块处理一块，不建立整个压缩包的索引
+
+        中央目录读两遍：第一遍只统计成员数和要写入的字节数（进度和空间检查），
+        第二遍边读边解压。常驻内存只有一块中央目录的紧凑索引和目标文件名的散列表
+        （每个文件约 16 字节），未匹配文件清单边处理边写。
+        支持操作模式、未匹配文件的处理方式、按内容匹配和运行日志；逐个解压。
+        """
+        extract_unmatched = options.unmatched_policy == UNMATCHED_EXTRACT
+        matched_dir, unmatched_dir = prepare_output_dirs(output_dir, extract_unmatched)
+        store = None
+        if options.operation_mode == "link":
+            store = ContentStore(os.path.join(output_dir, STORE_DIR_NAME), archive_path)
+        writer = options.output_writer()
+        journal = open_journal(output_dir, archive_path, matcher, options, writer)
+        content = options.content_matcher(matcher)
+        by_name = options.match_target != MATCH_CONTENT
+        profiling = profile.enabled
+
+        completed = False
+        manifest = None
+        matched_count = failed_count = total_count = 0
+        try:
+            with profile.stage("prepare"), open_archive_file(archive_path) as fp:
+                plan = ProcessPlan(archive_path, output_dir, options.operation_mode)
+                dirs = data_dirs(output_dir, options)
+                total_bytes = 0
+                for base, block in iter_central_blocks(fp):
+                    total_count += len(block)
+                    # 按内容匹配时文件名不能决定的成员按匹配计算（估计偏多）
+                    flags = (block.match_flags(matcher) if options.match_target == MATCH_NAME
+                             else bytes([1]) * len(block))
+                    for j, (flag, size) in enumerate(zip(flags, block.file_sizes)):
+                        directory = dirs[flag]
+                        if directory is None:
+                            continue
+                        total_bytes += size
+                        if not (journal is not None and journal.is_done(base + j, block.crcs[j])):
+                            plan.reserve(directory, size)
+                if options.check_space:
+                    self.check_space(plan)
+                del plan
+            progress.start(total_count, total_bytes)
+
+            if options.unmatched_policy == UNMATCHED_MANIFEST:
+                manifest = open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8',
+                                newline='')
+                manifest_writer = csv.writer(manifest, delimiter='\t')
+                manifest_writer.writerow(["文件名", "大小", "压缩后大小", "CRC32"])
+            matched_names = NameRegistry(matched_dir, compact=True)
+            unmatched_names = NameRegistry(unmatched_dir, compact=True) if unmatched_dir else None
+
+            with tempfile.TemporaryDirectory() as temp_dir, \
+                    ZipMemberReader(archive_path) as reader, open_archive_file(archive_path) as fp:
+                zip_file = ProfiledReader(reader, profile) if profiling else reader
+                blocks = iter_central_blocks(fp)
+                while True:
+                    with profile.stage("index"):
+                        item = next(blocks, None)
+                    if item is None:
+                        break
+                    base, block = item
+
+                    with profile.stage("match"):
+                        if by_name:
+                            flags = bytearray(block.match_flags(matcher))
+                        else:
+                            flags = bytearray(len(block))
+                        if content is not None:
+                            hits, _ = scan_batch(reader, content,
+                                                 [(j, block.zipinfo(j))
+                                                  for j in range(len(block)) if not flags[j]])
+                            for j in hits:
+                                flags[j] = 1
+
+                    def needs_target(j):
+                        return ((flags[j] or unmatched_names is not None) and
+                                not (journal is not None and
+                                     journal.is_done(base + j, block.crcs[j])))
+
+                    def target_of(i):
+                        registry = matched_names if flags[i - base] else unmatched_names
+                        return registry.reserve(os.path.basename(block.name(i - base)))
+
+                    planned = {}
+                    for j in range(len(block)):
+                        is_matched = flags[j]
+                        if not is_matched and unmatched_names is None:
+                            if manifest is not None:
+                                manifest_writer.writerow([block.name(j), block.file_sizes[j],
+                                                          block.compress_sizes[j],
+                                                          f"{block.crcs[j]:08x}"])
+                            progress.advance(1, 0)
+                            continue
+
+                        progress.advance(1, block.file_sizes[j])
+                        i = base + j
+                        if journal is not None and journal.is_done(i, block.crcs[j]):
+                            matched_count += is_matched
+                            continue
+
+                        file_info = block.zipinfo(j)
+                        registry = matched_names if is_matched else unmatched_names
+                        basename = os.path.basename(file_info.filename)
+                        if i not in planned:
+                            planned = plan_targets(
+                                (base + k for k in range(j, len(block)) if needs_target(k)),
+                                target_of, journal)
+                        target_path = planned.pop(i)
+                        if profiling:
+                            start = time.perf_counter()
+                        try:
+                            extract_member(zip_file, file_info, target_path,
+                                           options.operation_mode, options.extract_mode,
+                                           temp_dir, store, writer)
+                            if profiling:
+                                seconds = time.perf_counter() - start
+                                profile.add("extract", seconds)
+                                profile.entry(file_info.filename, seconds,
+                                              file_info.compress_size, file_info.file_size)
+                            if journal is not None:
+                                journal.record(i, file_info.CRC)
+                            matched_count += is_matched
+                        except Exception:
+                            registry.release(basename, target_path)
+                            failed_count += 1
+            completed = True
+        except ArchiveError:
+            raise
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+        finally:
+            if manifest is not None:
+                manifest.close()
+            writer.sync()
+            if journal is not None:
+                journal.close(complete=completed)
+        return ProcessResult(matched_count, total_count, failed_count)
+
+    def process_stream(self, archive_path, matcher, output_dir, options, progress,
+                       manifest_name=MANIFEST_NAME, profile=NULL_PROFILE):
+        """非 ZIP 格式：按压缩包中的顺序一次顺序读完（固实格式不能随机访问成员）
+
+        支持未匹配文件的处理方式、链接模式、运行日志和嵌套的压缩包；
+        并行、增量处理和去重只用于 ZIP。能廉价列出成员时（tar、7z、RAR）开始前检查磁盘空间，
+        tar.gz 等要先解压一遍才能列出，不检查。
+        """
+        extract_unmatched = options.unmatched_policy == UNMATCHED_EXTRACT
+        matched_dir, unmatched_dir = prepare_output_dirs(output_dir, extract_unmatched)
+        store = None
+        if options.operation_mode == "link":
+            store = ContentStore(os.path.join(output_dir, STORE_DIR_NAME), archive_path)
+        writer = options.output_writer()
+        journal = open_journal(output_dir, archive_path, matcher, options, writer)
+
+        completed = False
+        archive = self.open_archive(archive_path)
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir, archive:
+                out = _StreamOutput(matcher, matched_dir, unmatched_dir, options, progress,
+                                    store, temp_dir, writer)
+                out.profile = profile
+                out.journal = journal
+                # 能廉价列出成员时先得到总量；否则边读边累加
+                if archive.cheap_listing:
+                    # 只遍历一遍成员列表，不保留（成员极多时列表本身就很大）
+                    total_count = total_bytes = 0
+                    plan = None
+                    if options.check_space:
+                        plan = ProcessPlan(archive_path, output_dir, options.operation_mode)
+                        dirs = data_dirs(output_dir, options)
+                    with profile.stage("index"):
+                        for entry in archive.entries():
+                            total_count += 1
+                            total_bytes += entry.size
+                            if plan is None:
+                                continue
+                            directory = dirs[planned_match(matcher, entry.name, options)]
+                            if directory is not None and not (
+                                    journal is not None and
+                                    journal.is_done(entry.position, entry.crc or 0)):
+                                plan.reserve(directory, entry.size)
+                    if plan is not None:
+                        with profile.stage("prepare"):
+                            self.check_space(plan)
+                    progress.start(total_count, total_bytes)
+                else:
+                    progress.start(0, 0)
+                self.process_entries(archive, out, journal=journal)
+                out.flush()
+            profile.count_read(archive_size(archive_path))
+            completed = True
+        except ArchiveError:
+            raise
+        except Exception as e:
+            raise ArchiveError(f"无法处理压缩包: {e}")
+        finally:
+            writer.sync()
+            if journal is not None:
+                journal.close(complete=completed)
+
+        if options.unmatched_policy == UNMATCHED_MANIFEST:
+            with profile.stage("manifest"):
+                write_manifest_rows(os.path.join(output_dir, manifest_name), out.manifest_rows)
+
+        return ProcessResult(out.matched_count, out.total_count, out.failed_count)
+
+    def process_repack(self, archive_path, matcher, output_dir, options, progress,
+                       profile=NULL_PROFILE):
+        """直接打包输出：按压缩包中的顺序把成员写进 (未匹配, 匹配) 两个新压缩包
+
+        ZIP 输出 ZIP 时原样复制压缩数据；其余情况解压后写入。
+        输出先写到 .part 文件，全部完成后改名，中断后重新运行会从头打包。
+        """
+        fmt = options.repack
+        extract_unmatched = options.unmatched_policy == UNMATCHED_EXTRACT
+        os.makedirs(output_dir, exist_ok=True)
+        paths = repack_paths(output_dir, archive_path, fmt)
+        if not extract_unmatched:
+            paths = (None, paths[1])
+
+        if is_zip(archive_path):
+            with profile.stage("index"):
+                index = self.load_index(archive_path)
+            with profile.stage("match"):
+                flags = self.match_flags(archive_path, index, matcher, options)
+            wanted = [i for i in range(len(index)) if paths[flags[i]] is not None]
+            raw = fmt == REPACK_ZIP
+            if options.check_space:
+                with profile.stage("prepare"):
+                    plan = ProcessPlan(archive_path, output_dir, options.operation_mode)
+                    plan.reserve(output_dir, sum(
+                        repack_bytes(fmt, index.name_offsets[i + 1] - index.name_offsets[i],
+                                     index.file_sizes[i],
+                                     index.compress_sizes[i] if raw else None)
+                        for i in wanted))
+                    self.check_space(plan)
+            progress.start(len(index), sum(index.file_sizes[i] for i in wanted))
+            progress.advance(len(index) - len(wanted), 0)
+            writers = self._open_repack_writers(paths, fmt)
+            matched_count = failed_count = 0
+            try:
+                with ZipMemberReader(archive_path) as reader:
+                    for i in wanted:
+                        start = time.perf_counter()
+                        try:
+                            written = writers[flags[i]].add_raw(reader, index, i)
+                        except Exception:
+                            failed_count += 1
+                        else:
+                            matched_count += flags[i]
+                            if profile.enabled:
+                                seconds = time.perf_counter() - start
+                                profile.add("extract", seconds)
+                                profile.entry(index.name(i), seconds,
+                                              index.compress_sizes[i] if raw else
+                                              index.file_sizes[i], written)
+                        progress.advance(1, index.file_sizes[i])
+                self._close_repack_writers(writers)
+            except BaseException as e:
+                self._abort_repack_writers(writers)
+                if isinstance(e, Exception):
+                    raise ArchiveError(f"无法处理压缩包: {e}")
+                raise
+            if options.unmatched_policy == UNMATCHED_MANIFEST:
+                with profile.stage("manifest"):
+                    write_unmatched_manifest(os.path.join(output_dir, MANIFEST_NAME), index, flags)
+            return ProcessResult(matched_count, len(index), failed_count)
+
+        content = options.content_matcher(matcher)
+        manifest_rows = []
+        counts = {"total": 0, "matched": 0, "failed": 0}
+        flags = {}
+        archive = self.open_archive(archive_path)
+        writers = None
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir, archive:
+                if archive.cheap_listing:
+                    with profile.stage("index"):
+                        total = list(archive.entries())
+                    if options.check_space:
+                        with profile.stage("prepare"):
+                            plan = ProcessPlan(archive_path, output_dir, options.operation_mode)
+                            plan.reserve(output_dir, sum(
+                                repack_bytes(fmt, len(entry.name.encode('utf-8', 'surrogateescape')),
+                                             entry.size)
+                                for entry in total
+                                if paths[planned_match(matcher, entry.name, options)] is not None))
+                            self.check_space(plan)
+                    progress.start(len(total), sum(entry.size for entry in total))
+                    del total
+                else:
+                    progress.start(0, 0)
+                writers = self._open_repack_writers(paths, fmt)
+
+                def skip(entry):
+                    if options.unmatched_policy == UNMATCHED_MANIFEST:
+                        crc = "" if entry.crc is None else f"{entry.crc:08x}"
+                        manifest_rows.append([entry.name, entry.size, "", crc])
+
+                def wanted(entry):
+                    """决定是否读取成员数据；不写出的未匹配成员只计数"""
+                    if not archive.cheap_listing:
+                        progress.extend(1, entry.size)
+                    counts["total"] += 1
+                    is_matched = (1 if options.match_target != MATCH_CONTENT and
+                                  matcher.match(entry.name) else
+                                  0 if options.match_target == MATCH_NAME else UNDECIDED)
+                    if is_matched == 0 and writers[0] is None:
+                        skip(entry)
+                        progress.advance(1, 0)
+                        return False
+                    flags[entry.position] = is_matched
+                    return True
+
+                for entry, stream in archive.iter_members(wanted):
+                    is_matched = flags.pop(entry.position)
+                    start = time.perf_counter()
+                    try:
+                        if is_matched == UNDECIDED:
+                            found, spooled = content.spool(stream, writers[0] is not None,
+                                                           temp_dir)
+                            if spooled is None:
+                                skip(entry)
+                                progress.advance(1, entry.size)
+                                continue
+                            is_matched = 1 if found else 0
+                            with spooled:
+                                written = writers[is_matched].add_stream(
+                                    entry.name, spooled, entry.size, entry.mtime, entry.mode)
+                        else:
+                            written = writers[is_matched].add_stream(
+                                entry.name, stream, entry.size, entry.mtime, entry.mode)
+                    except Exception:
+                        counts["failed"] += 1
+                    else:
+                        counts["matched"] += is_matched
+                        if profile.enabled:
+                            seconds = time.perf_counter() - start
+                            profile.add("extract", seconds)
+                            profile.entry(entry.name, seconds, 0, written)
+                    progress.advance(1, entry.size)
+                # 要读取却没有读到的成员（后端没有给出数据）
+                counts["failed"] += len(flags)
+                self._close_repack_writers(writers)
+            profile.count_read(archive_size(archive_path))
+        except BaseException as e:
+            if writers is not None:
+                self._abort_repack_writers(writers)
+            if isinstance(e, ArchiveError) or not isinstance(e, Exception):
+                raise
+            raise ArchiveError(f"无法处理压缩包: {e}")
+
+        if options.unmatched_policy == UNMATCHED_MANIFEST:
+            with profile.stage("manifest"):
+                write_manifest_rows(os.path.join(output_dir, MANIFEST_NAME), manifest_rows)
+        return ProcessResult(counts["matched"], counts["total"], counts["failed"])
+
+    def _open_repack_writers(self, paths, fmt):
+        writers = []
+        try:
+            for path in paths:
+                writers.append(open_repack_writer(path, fmt) if path else None)
+        except BaseException:
+            self._abort_repack_writers(writers)
+            raise
+        return tuple(writers)
+
+    def _close_repack_writers(self, writers):
+        for writer in writers:
+            if writer is not None:
+                writer.close()
+
+    def _abort_repack_writers(self, writers):
+        for writer in writers:
+            if writer is not None:
+                writer.abort()
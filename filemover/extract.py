@@ -0,0 +1,82 @@
+"""
+压缩包成员的解压与落盘
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+from .output import DEFAULT_WRITER
+
+# 流式拷贝的块大小（1 MiB）
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# 解压方式：stream 直接写入目标路径，temp 先解压到临时目录再移动/复制
+EXTRACT_STREAM = "stream"
+EXTRACT_TEMP = "temp"
+EXTRACT_MODES = (EXTRACT_STREAM, EXTRACT_TEMP)
+
+# ZipInfo.create_system 中 Unix 的取值
+_UNIX_SYSTEM = 3
+
+
+def zipinfo_mtime(file_info):
+    """ZipInfo 中记录的修改时间（本地时间戳），无效时返回 None"""
+    try:
+        return time.mktime(tuple(file_info.date_time) + (0, 0, -1))
+    except (OverflowError, ValueError):
+        return None
+
+
+def zipinfo_mode(file_info):
+    """ZipInfo 中记录的 Unix 权限位，没有记录时返回 None"""
+    if file_info.create_system != _UNIX_SYSTEM:
+        return None
+    mode = (file_info.external_attr >> 16) & 0o7777
+    return mode or None
+
+
+def stream_member(zip_file, file_info, target_path, writer=None):
+    """把成员按块直接写入目标路径，返回写入的字节数
+
+    zip_file 可以是 ZipFile，也可以是只凭索引读取成员的 ZipMemberReader。
+    writer 为 output.OutputWriter，不传时使用不要求持久性的默认写入器。
+    """
+    if writer is None:
+        writer = DEFAULT_WRITER
+    with zip_file.open(file_info) as src:
+        return writer.write(src, target_path, file_info.file_size, zipinfo_mtime(file_info),
+                            zipinfo_mode(file_info))
+
+
+def extract_via_temp(zip_file, file_info, target_path, temp_dir, operation_mode, writer=None):
+    """旧的处理方式：先解压到临时目录，再移动/复制/链接到目标路径"""
+    fd, source_path = tempfile.mkstemp(dir=temp_dir)
+    os.close(fd)
+    # 临时文件不需要持久
+    stream_member(zip_file, file_info, source_path)
+
+    if operation_mode == "move":
+        shutil.move(source_path, target_path)
+    else:
+        # 临时目录处理结束就会删除，链接指向它会失效；链接模式应使用内容库
+        shutil.copy2(source_path, target_path)
+    if writer is not None:
+        writer.track(target_path)
+
+
+def extract_member(zip_file, file_info, target_path, operation_mode,
+                   extract_mode=EXTRACT_STREAM, temp_dir=None, store=None, writer=None):
+    """按指定解压方式把一个成员放到目标路径
+
+    链接模式下传入 store（linking.ContentStore）：成员只解压一次到内容库，再链接到目标路径。
+    writer（output.OutputWriter）决定写入方式和持久性，不传时使用默认写入器。
+    """
+    if operation_mode == "link" and store is not None:
+        store.place(zip_file, file_info, target_path, writer)
+    elif extract_mode == EXTRACT_STREAM:
+        # 流式解压时没有中间文件，移动/复制/链接都直接写出最终文件
+        stream_member(zip_file, file_info, target_path, writer)
+    else:
+        extract_via_temp(zip_file, file_info, target_path, temp_dir, operation_mode, writer)
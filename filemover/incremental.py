@@ -0,0 +1,161 @@
+"""
+增量处理：重新处理同一压缩包的新版本时，只解压新增或内容有变化的成员
+
+目标文件夹建一次索引（名称 + 大小 + CRC32）。压缩包成员的 CRC 直接来自中央目录，
+目标文件的 CRC 只在名称和大小都对得上时才计算，结果缓存在输出目录旁边的
+<输出目录>.journal 文件夹中（与运行日志放在一起，不放进结果文件夹），下次运行不必再读文件内容。
+"""
+
+import os
+import re
+import threading
+import zlib
+
+from .extract import DEFAULT_CHUNK_SIZE
+from .journal import JOURNAL_DIR_SUFFIX
+
+# CRC 缓存文件名：<目标文件夹名>.crc.tsv
+CRC_CACHE_SUFFIX = ".crc.tsv"
+
+# NameRegistry 生成的重名文件：name_1.ext、name_2.ext ……
+_COUNTER_SUFFIX = re.compile(r"^(.*)_(\d+)$")
+
+
+def file_crc32(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """分块计算文件的 CRC32"""
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+def crc_cache_path(directory):
+    """目标文件夹（<输出目录>/匹配文件 等）的 CRC 缓存路径"""
+    output_dir, name = os.path.split(os.path.normpath(directory))
+    return os.path.join(output_dir + JOURNAL_DIR_SUFFIX, name + CRC_CACHE_SUFFIX)
+
+
+def original_name(name):
+    """去掉重名序号后的文件名，以及序号（没有序号时为 0）"""
+    stem, ext = os.path.splitext(name)
+    m = _COUNTER_SUFFIX.match(stem)
+    if m:
+        return m.group(1) + ext, int(m.group(2))
+    return name, 0
+
+
+class DestinationIndex:
+    """一个目标文件夹中已有文件的索引
+
+    同名成员按 NameRegistry 的规则落在 name.ext、name_1.ext …… 上，
+    所以一个成员的候选文件是与它同名的文件，以及去掉序号后与它同名的文件。
+    每个已有文件最多对应一个成员。
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.cache_path = crc_cache_path(directory)
+        # 文件名（normcase）-> 文件名
+        self.names = {}
+        # 去掉序号后的文件名（normcase）-> [(序号, 文件名)]，按序号排序
+        self.families = {}
+        # 已经对应到某个成员的文件名
+        self.claimed = set()
+        # 文件名 -> (大小, mtime_ns, CRC)
+        self.crc_cache = {}
+        self._dirty = False
+        self.lock = threading.Lock()
+
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    self.names[os.path.normcase(entry.name)] = entry.name
+                    base, counter = original_name(entry.name)
+                    if counter:
+                        self.families.setdefault(os.path.normcase(base), []).append(
+                            (counter, entry.name))
+        except FileNotFoundError:
+            pass
+        for family in self.families.values():
+            family.sort()
+
+        self._load_cache()
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        name, size, mtime_ns, crc = line.rstrip("\n").split("\t")
+                        self.crc_cache[name] = (int(size), int(mtime_ns), int(crc, 16))
+                    except ValueError:
+                        continue
+        except (OSError, UnicodeDecodeError):
+            pass
+
+    def _candidates(self, basename):
+        """basename 这个成员可能对应的已有文件（未被占用的）"""
+        key = os.path.normcase(basename)
+        candidates = [self.names[key]] if key in self.names else []
+        candidates.extend(name for _, name in self.families.get(key, ()))
+        return [name for name in candidates if name not in self.claimed]
+
+    def crc_of(self, name, st):
+        """已有文件的 CRC32，大小和修改时间不变时直接用缓存"""
+        cached = self.crc_cache.get(name)
+        if cached is not None and cached[:2] == (st.st_size, st.st_mtime_ns):
+            return cached[2]
+        crc = file_crc32(os.path.join(self.directory, name))
+        self.crc_cache[name] = (st.st_size, st.st_mtime_ns, crc)
+        self._dirty = True
+        return crc
+
+    def claim_unchanged(self, basename, size, crc):
+        """找到名称、大小、CRC 都一致的已有文件并占用，返回其路径；没有时返回 None"""
+        with self.lock:
+            for name in self._candidates(basename):
+                try:
+                    st = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                if st.st_size == size and self.crc_of(name, st) == crc:
+                    self.claimed.add(name)
+                    return os.path.join(self.directory, name)
+        return None
+
+    def claim_stale(self, basename):
+        """占用同名的旧版本文件（内容已变化），返回其路径；没有时返回 None"""
+        with self.lock:
+            candidates = self._candidates(basename)
+            if not candidates:
+                return None
+            self.claimed.add(candidates[0])
+            return os.path.join(self.directory, candidates[0])
+
+    def remember(self, target_path, crc):
+        """记录刚写出的文件的 CRC，下次运行不用再读"""
+        name = os.path.basename(target_path)
+        try:
+            st = os.stat(target_path)
+        except OSError:
+            return
+        with self.lock:
+            self.names[os.path.normcase(name)] = name
+            self.crc_cache[name] = (st.st_size, st.st_mtime_ns, crc)
+            self._dirty = True
+
+    def save(self):
+        """写回 CRC 缓存（只保留仍然存在的文件）"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        partial = self.cache_path + ".part"
+        with open(partial, 'w', encoding='utf-8') as f:
+            for name, (size, mtime_ns, crc) in self.crc_cache.items():
+                if os.path.normcase(name) in self.names:
+                    f.write(f"{name}\t{size}\t{mtime_ns}\t{crc:08x}\n")
+        os.replace(partial, self.cache_path)
+        self._dirty = False
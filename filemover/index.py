@@ -0,0 +1,455 @@
+"""
+压缩包中央目录索引：预览和处理共用，避免重复解析
+"""
+
+import os
+import struct
+import threading
+import zipfile
+from array import array
+from collections import OrderedDict
+
+from .remote import is_url, open_url, remote_file
+
+# 本地文件头
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_SIGNATURE = b"PK\003\004"
+
+# 中央目录文件头、中央目录结尾记录、ZIP64 结尾记录定位符和 ZIP64 结尾记录
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_CENTRAL_SIGNATURE = b"PK\001\002"
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_SIGNATURE = b"PK\005\006"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIGNATURE = b"PK\006\007"
+_ZIP64_END = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_SIGNATURE = b"PK\006\006"
+_EXTRA_HEADER = struct.Struct("<2H")
+_ZIP64_EXTRA = 0x0001
+_ZIP64_LIMIT = 0xFFFFFFFF
+
+# 逐块读取中央目录时每块的大小
+CENTRAL_BLOCK_SIZE = 1024 * 1024
+
+# 每个索引最多缓存几组关键字的匹配结果
+MATCH_CACHE_SIZE = 4
+
+# 索引缓存默认的内存上限
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def archive_key(path):
+    """压缩包的缓存键：绝对路径 + 大小 + 修改时间（远程压缩包为 地址 + 大小 + ETag）"""
+    if is_url(path):
+        return remote_file(path).key
+    st = os.stat(path)
+    return (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+
+
+def open_archive_file(path):
+    """以二进制只读方式打开压缩包；http(s) 地址按需通过 Range 请求读取"""
+    if is_url(path):
+        return open_url(path)
+    return open(path, 'rb')
+
+
+def archive_size(path):
+    """压缩包的字节数"""
+    if is_url(path):
+        return remote_file(path).size
+    return os.path.getsize(path)
+
+
+def _pack_date_time(date_time):
+    """把 (年, 月, 日, 时, 分, 秒) 压缩成 32 位整数"""
+    year, month, day, hour, minute, second = date_time
+    return ((year - 1980) << 25 | month << 21 | day << 16 |
+            hour << 11 | minute << 5 | second // 2)
+
+
+def _unpack_date_time(value):
+    return ((value >> 25) + 1980, (value >> 21) & 0xF, (value >> 16) & 0x1F,
+            (value >> 11) & 0x1F, (value >> 5) & 0x3F, (value & 0x1F) * 2)
+
+
+class ArchiveIndex:
+    """一个压缩包中所有文件成员（不含目录）的紧凑索引
+
+    每一列是一个 array，文件名按 UTF-8 拼接在同一个缓冲区里，
+    比保留整份 ZipInfo 列表小得多。
+    """
+
+    def __init__(self, path, key=None):
+        self.path = path
+        self.key = key
+        self.names = bytearray()
+        self.name_offsets = array('Q', [0])
+        self.file_sizes = array('Q')
+        self.compress_sizes = array('Q')
+        self.header_offsets = array('Q')
+        self.crcs = array('I')
+        self.date_times = array('I')
+        self.external_attrs = array('I')
+        self.flag_bits = array('H')
+        self.compress_types = array('B')
+        self.create_systems = array('B')
+        self._matches = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, path, fileobj=None):
+        """逐块解析一次中央目录并建立索引；fileobj 为嵌套压缩包等不在磁盘上的数据
+
+        不经过 zipfile，建立过程中不会同时存在整份 ZipInfo 列表和文件名字典。
+        """
+        index = cls(path, archive_key(path) if fileobj is None else None)
+        if fileobj is not None:
+            for _ in read_central_directory(fileobj, index):
+                pass
+            return index
+        with open_archive_file(path) as fp:
+            for _ in read_central_directory(fp, index):
+                pass
+        return index
+
+    def append(self, file_info):
+        """追加一个成员"""
+        self.append_fields(file_info.filename.encode('utf-8', 'surrogateescape'),
+                           file_info.file_size, file_info.compress_size, file_info.header_offset,
+                           file_info.CRC, _pack_date_time(file_info.date_time),
+                           file_info.external_attr, file_info.flag_bits, file_info.compress_type,
+                           file_info.create_system)
+
+    def append_fields(self, name, file_size, compress_size=0, header_offset=0, crc=0,
+                      date_time=0, external_attr=0, flag_bits=0, compress_type=0,
+                      create_system=0):
+        """按字段追加一个成员，name 为 UTF-8 编码的文件名"""
+        self.names += name
+        self.name_offsets.append(len(self.names))
+        self.file_sizes.append(file_size)
+        self.compress_sizes.append(compress_size)
+        self.header_offsets.append(header_offset)
+        self.crcs.append(crc)
+        self.date_times.append(date_time)
+        self.external_attrs.append(external_attr)
+        self.flag_bits.append(flag_bits)
+        self.compress_types.append(compress_type)
+        self.create_systems.append(create_system)
+
+    def clear(self):
+        """清空所有成员（逐块处理时重复使用同一个索引）"""
+        del self.names[:]
+        del self.name_offsets[1:]
+        for column in (self.file_sizes, self.compress_sizes, self.header_offsets, self.crcs,
+                       self.date_times, self.external_attrs, self.flag_bits,
+                       self.compress_types, self.create_systems):
+            del column[:]
+        with self._lock:
+            self._matches.clear()
+
+    def __len__(self):
+        return len(self.file_sizes)
+
+    def name(self, i):
+        """第 i 个成员的文件名"""
+        start, end = self.name_offsets[i], self.name_offsets[i + 1]
+        return self.names[start:end].decode('utf-8', 'surrogateescape')
+
+    def raw_name(self, i):
+        """第 i 个成员 UTF-8 编码的文件名"""
+        return bytes(self.names[self.name_offsets[i]:self.name_offsets[i + 1]])
+
+    def iter_names(self):
+        for i in range(len(self)):
+            yield self.name(i)
+
+    def zipinfo(self, i):
+        """按需构造第 i 个成员的 ZipInfo"""
+        file_info = zipfile.ZipInfo(self.name(i), _unpack_date_time(self.date_times[i]))
+        file_info.file_size = self.file_sizes[i]
+        file_info.compress_size = self.compress_sizes[i]
+        file_info.header_offset = self.header_offsets[i]
+        file_info.CRC = self.crcs[i]
+        file_info.external_attr = self.external_attrs[i]
+        file_info.flag_bits = self.flag_bits[i]
+        file_info.compress_type = self.compress_types[i]
+        file_info.create_system = self.create_systems[i]
+        return file_info
+
+    def match_flags(self, matcher):
+        """每个成员是否匹配（bytearray，1 为匹配），同一组关键字只计算一次"""
+        key = matcher.key
+        with self._lock:
+            flags = self._matches.get(key)
+            if flags is not None:
+                self._matches.move_to_end(key)
+                return flags
+
+        match = matcher.match
+        flags = bytearray(1 if match(name) else 0 for name in self.iter_names())
+
+        with self._lock:
+            self._matches[key] = flags
+            while len(self._matches) > MATCH_CACHE_SIZE:
+                self._matches.popitem(last=False)
+        return flags
+
+    @property
+    def nbytes(self):
+        """索引占用的大致字节数"""
+        columns = (self.name_offsets, self.file_sizes, self.compress_sizes, self.header_offsets,
+                   self.crcs, self.date_times, self.external_attrs, self.flag_bits,
+                   self.compress_types, self.create_systems)
+        total = len(self.names) + sum(len(c) * c.itemsize for c in columns)
+        return total + sum(len(flags) for flags in self._matches.values())
+
+
+def locate_central_directory(fp):
+    """找到中央目录，返回 (起始偏移, 字节数, 成员数, 压缩包前附加的字节数)
+
+    压缩包前面附加了数据（自解压程序等）时，成员的偏移要加上附加的字节数。
+    """
+    fp.seek(0, os.SEEK_END)
+    file_size = fp.tell()
+    tail_size = min(file_size, _END_RECORD.size + 0xFFFF)
+    fp.seek(file_size - tail_size)
+    tail = fp.read(tail_size)
+    # 注释中也可能出现结尾记录的签名，从后向前找注释长度正好到文件末尾的那一个
+    pos = len(tail)
+    while True:
+        pos = tail.rfind(_END_SIGNATURE, 0, pos)
+        if pos < 0:
+            raise zipfile.BadZipFile("File is not a zip file")
+        if pos + _END_RECORD.size <= len(tail):
+            fields = _END_RECORD.unpack_from(tail, pos)
+            if pos + _END_RECORD.size + fields[7] == len(tail):
+                break
+    count, size, offset = fields[4], fields[5], fields[6]
+    end_pos = file_size - tail_size + pos
+
+    locator_pos = end_pos - _ZIP64_LOCATOR.size
+    if locator_pos >= 0:
+        fp.seek(locator_pos)
+        locator = fp.read(_ZIP64_LOCATOR.size)
+        if locator[:4] == _ZIP64_LOCATOR_SIGNATURE:
+            record_pos = locator_pos - _ZIP64_END.size
+            fp.seek(record_pos)
+            record = fp.read(_ZIP64_END.size)
+            if record_pos < 0 or record[:4] != _ZIP64_END_SIGNATURE:
+                raise zipfile.BadZipFile("Corrupt zip64 end of central directory record")
+            fields = _ZIP64_END.unpack(record)
+            count, size, offset = fields[7], fields[8], fields[9]
+            end_pos = record_pos
+
+    concat = end_pos - size - offset
+    if concat < 0:
+        raise zipfile.BadZipFile("Bad offset for central directory")
+    return offset + concat, size, count, concat
+
+
+def _zip64_fields(extra, file_size, compress_size, header_offset):
+    """从 ZIP64 扩展字段中读出被标记为 0xFFFFFFFF 的大小和偏移"""
+    pos = 0
+    while pos + _EXTRA_HEADER.size <= len(extra):
+        tag, length = _EXTRA_HEADER.unpack_from(extra, pos)
+        pos += _EXTRA_HEADER.size
+        if tag == _ZIP64_EXTRA:
+            values = []
+            for value in (file_size, compress_size, header_offset):
+                if value == _ZIP64_LIMIT:
+                    if len(values) * 8 + 8 > length:
+                        raise zipfile.BadZipFile("Corrupt zip64 extra field")
+                    value = struct.unpack_from("<Q", extra, pos + len(values) * 8)[0]
+                    values.append(value)
+                yield value
+            return
+        pos += length
+    yield file_size
+    yield compress_size
+    yield header_offset
+
+
+def read_central_directory(fp, index, block_size=CENTRAL_BLOCK_SIZE):
+    """逐块读取中央目录，把文件成员（不含目录）追加到 index，每读完一块 yield 一次成员数
+
+    直接按固定格式解析文件头，不为每个成员构造 ZipInfo，
+    调用方可以在读取过程中使用已经加入索引的成员。
+    """
+    start, size, _, concat = locate_central_directory(fp)
+    fp.seek(start)
+    remaining = size
+    buf = b""
+    unpack = _CENTRAL_HEADER.unpack_from
+    header_size = _CENTRAL_HEADER.size
+    alt_sep = os.sep.encode() if os.sep != "/" else None
+    append = index.append_fields
+
+    while remaining > 0:
+        block = fp.read(min(block_size, remaining))
+        if not block:
+            raise zipfile.BadZipFile("Truncated central directory")
+        remaining -= len(block)
+        buf = buf + block if buf else block
+        pos = 0
+        while pos + header_size <= len(buf):
+            fields = unpack(buf, pos)
+            if fields[0] != _CENTRAL_SIGNATURE:
+                raise zipfile.BadZipFile("Bad magic number for central directory")
+            name_end = pos + header_size + fields[12]
+            extra_end = name_end + fields[13]
+            end = extra_end + fields[14]
+            if end > len(buf):
+                break
+            name = buf[pos + header_size:name_end]
+            pos = end
+
+            flag_bits = fields[5]
+            if not flag_bits & 0x800:
+                name = name.decode('cp437').encode('utf-8')
+            if b"\0" in name:
+                name = name[:name.index(b"\0")]
+            if alt_sep and alt_sep in name:
+                name = name.replace(alt_sep, b"/")
+            if name.endswith(b"/"):
+                continue
+
+            file_size, compress_size, header_offset = fields[11], fields[10], fields[18]
+            if _ZIP64_LIMIT in (file_size, compress_size, header_offset):
+                file_size, compress_size, header_offset = _zip64_fields(
+                    buf[name_end:extra_end], file_size, compress_size, header_offset)
+            append(name, file_size, compress_size, header_offset + concat, fields[9],
+                   fields[8] << 16 | fields[7], fields[17], flag_bits, fields[6], fields[2])
+        buf = buf[pos:]
+        yield len(index)
+
+    if buf:
+        raise zipfile.BadZipFile("Truncated central directory")
+
+
+def iter_central_blocks(fp, block_size=CENTRAL_BLOCK_SIZE):
+    """逐块读取中央目录，每块 yield (这一块第一个成员的序号, 只含这一块成员的索引)
+
+    所有块共用同一个索引对象，取下一块时清空，内存只有一块的大小，与成员总数无关。
+    """
+    index = ArchiveIndex(None)
+    base = 0
+    for _ in read_central_directory(fp, index, block_size):
+        if len(index):
+            yield base, index
+            base += len(index)
+            index.clear()
+
+
+class ArchiveIndexCache:
+    """按内存上限做 LRU 淘汰的索引缓存"""
+
+    def __init__(self, max_bytes=DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """取得压缩包的索引，压缩包未变化时直接复用"""
+        key = archive_key(path)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+                return index
+
+        index = ArchiveIndex.build(path)
+
+        with self._lock:
+            self._entries[key] = index
+            self._entries.move_to_end(key)
+            self._evict()
+        return index
+
+    def find(self, path):
+        """已经缓存的索引，没有时返回 None（不解析中央目录）"""
+        key = archive_key(path)
+        with self._lock:
+            index = self._entries.get(key)
+            if index is not None:
+                self._entries.move_to_end(key)
+            return index
+
+    def put(self, index):
+        """加入一个在别处建立的索引（预览列表在后台读取的中央目录等）"""
+        if index.key is None:
+            return
+        with self._lock:
+            self._entries[index.key] = index
+            self._entries.move_to_end(index.key)
+            self._evict()
+
+    def _evict(self):
+        # 最近使用的索引总是保留，即使它本身超过上限
+        total = sum(index.nbytes for index in self._entries.values())
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, index = self._entries.popitem(last=False)
+            total -= index.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ZipMemberReader:
+    """只凭索引中的信息读取成员数据，不再解析中央目录"""
+
+    def __init__(self, path, fileobj=None):
+        # 传入的 fileobj 由调用方负责关闭
+        self._owns_fp = fileobj is None
+        self.fp = open_archive_file(path) if fileobj is None else fileobj
+
+    def _seek_data(self, file_info):
+        """跳过本地文件头，定位到成员的压缩数据"""
+        self.seek_raw(file_info.header_offset)
+
+    def seek_raw(self, header_offset):
+        """读取 header_offset 处的本地文件头并定位到压缩数据，返回本地文件头中的额外字段"""
+        self.fp.seek(header_offset)
+        header = self.fp.read(_LOCAL_HEADER.size)
+        if len(header) != _LOCAL_HEADER.size:
+            raise zipfile.BadZipFile("Truncated file header")
+        fields = _LOCAL_HEADER.unpack(header)
+        if fields[0] != _LOCAL_SIGNATURE:
+            raise zipfile.BadZipFile("Bad magic number for file header")
+        self.fp.seek(fields[10], os.SEEK_CUR)
+        if not fields[11]:
+            return b""
+        extra = self.fp.read(fields[11])
+        if len(extra) != fields[11]:
+            raise zipfile.BadZipFile("Truncated file header")
+        return extra
+
+    def open(self, file_info):
+        """打开成员，返回解压后的只读流"""
+        if file_info.flag_bits & 0x1:
+            raise RuntimeError(f"File {file_info.filename!r} is encrypted, password "
+                               "required for extraction")
+
+        self._seek_data(file_info)
+        return zipfile.ZipExtFile(self.fp, 'r', file_info)
+
+    def iter_raw(self, file_info, chunk_size=1024 * 1024):
+        """按块读出成员的原始（未解压）数据"""
+        self._seek_data(file_info)
+        remaining = file_info.compress_size
+        while remaining > 0:
+            chunk = self.fp.read(min(chunk_size, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile("Truncated file data")
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        if self._owns_fp:
+            self.fp.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,194 @@
+"""
+运行日志：记录已完成的成员，中断后重新运行时从断点继续
+
+日志是只追加的文本文件：第一行是 JSON 格式的处理设置，之后每行是
+一个已完成成员的「序号 CRC」。放在输出目录旁边的 <输出目录>.journal 文件夹中，
+每个压缩包一个（增量处理的 CRC 缓存也在这里）。写入按批次 fsync（要求输出持久时先 fsync
+输出的文件），一次处理正常结束后删除日志，之后再运行就是一次全新的处理。
+
+写出成员之前先把分配到的目标路径写进日志（「+ [[序号, 目标路径], ...]」，立即交给操作系统，
+不留在缓冲区）。逐个处理时按块预先分配接下来 RESERVE_BLOCK 个成员的目标路径，一块只记一行、
+交给操作系统一次。重新运行时，分配了目标路径却没有记为完成的成员，其目标文件是中断时写到一半
+或还没来得及记录的，先删除；这些成员本次重新写出时分配到原来的名字，不会因为文件已存在而改用
+_1 等新名字。
+"""
+
+import hashlib
+import json
+import os
+import time
+
+from .index import archive_key
+
+JOURNAL_DIR_SUFFIX = ".journal"
+
+# 每写多少条或隔多少秒 fsync 一次
+DEFAULT_SYNC_EVERY = 1000
+DEFAULT_SYNC_INTERVAL = 2.0
+
+# 逐个处理时每块预先分配多少个成员的目标路径
+RESERVE_BLOCK = 256
+
+# 分配目标路径的行的前缀
+_INTENT = "+ "
+
+# 目标路径按 JSON 字符串写（文件名中可能有空格、换行）；直接用 json 的字符串编码函数，
+# 省去 json.dumps 逐层判断类型的开销
+_encode = json.encoder.encode_basestring
+
+
+def journal_path(output_dir, archive_path):
+    """压缩包对应的日志文件路径"""
+    archive_id = hashlib.sha1(repr(archive_key(archive_path)).encode('utf-8')).hexdigest()[:16]
+    journal_dir = os.path.normpath(output_dir) + JOURNAL_DIR_SUFFIX
+    return os.path.join(journal_dir, f"{archive_id}.log")
+
+
+class RunJournal:
+    """一个压缩包的处理日志
+
+    root 为输出目录，目标路径相对它记录。
+    """
+
+    def __init__(self, path, settings, root=None, sync_every=DEFAULT_SYNC_EVERY,
+                 sync_interval=DEFAULT_SYNC_INTERVAL, before_sync=None):
+        self.path = path
+        self.settings = settings
+        self.root = root
+        self._prefix = os.path.join(root, "") if root is not None else None
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        # 每次 fsync 日志之前调用（output.OutputWriter.sync），已记录的成员的数据先落盘
+        self.before_sync = before_sync
+        # 上次运行已完成的成员：序号 -> CRC
+        self.done = {}
+        # 上次运行分配了目标路径却没有完成的成员的目标路径（日志中的写法），由 recover 删除
+        self.unfinished = set()
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+        self._load()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # tar 等格式中无法解码的文件名含有代理字符，原样写回
+        self._file = open(path, 'a', encoding='utf-8', errors='surrogateescape')
+        if self._file.tell() == 0:
+            self._file.write(json.dumps({"settings": settings}, ensure_ascii=False) + "\n")
+            self._sync()
+
+    def _load(self):
+        """读取已有日志；设置不一致（换了关键字或模式）时作废"""
+        try:
+            with open(self.path, 'r', encoding='utf-8', errors='surrogateescape') as f:
+                lines = f.read().split("\n")
+        except FileNotFoundError:
+            return
+
+        # 最后一段没有换行符，说明写到一半就中断了，丢弃
+        lines = lines[:-1]
+        try:
+            header = json.loads(lines[0]) if lines else None
+        except ValueError:
+            header = None
+        if not header or header.get("settings") != self.settings:
+            os.remove(self.path)
+            return
+
+        # 序号 -> 分配到的目标路径；目标路径 -> 最后分配到它的序号（写入失败释放的名字
+        # 可能分给后面的成员，由后者是否完成决定）。成员完成后都去掉，只剩没有完成的
+        pending = {}
+        owner = {}
+        for line in lines[1:]:
+            try:
+                if line.startswith(_INTENT):
+                    for i, target in json.loads(line[len(_INTENT):]):
+                        pending.setdefault(i, []).append(target)
+                        owner[target] = i
+                    continue
+                fields = line.split(" ", 2)
+                i = int(fields[0])
+                self.done[i] = int(fields[1], 16)
+            except (IndexError, TypeError, ValueError):
+                continue
+            for target in pending.pop(i, ()):
+                if owner.get(target) == i:
+                    del owner[target]
+        self.unfinished = set(owner)
+
+
+    def recover(self):
+        """删除上次运行分配了目标路径却没有完成的成员写出的文件
+
+        删除后把日志改写成只有完成记录：批量处理先恢复所有压缩包的日志、轮到这个压缩包时
+        再打开，期间别的压缩包可能用上这些名字，再打开时不能再删一次。
+        """
+        if not self.unfinished:
+            return
+        for recorded in self.unfinished:
+            target_path = recorded if self.root is None else os.path.join(self.root, recorded)
+            try:
+                os.remove(target_path)
+            except OSError:
+                pass
+        self.unfinished = set()
+
+        # 先删除再改写：改写前中断，下次按原日志再删一次即可
+        self._file.close()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, 'w', encoding='utf-8', errors='surrogateescape') as f:
+            f.write(json.dumps({"settings": self.settings}, ensure_ascii=False) + "\n")
+            f.write("".join(f"{i} {crc:x}\n" for i, crc in self.done.items()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._file = open(self.path, 'a', encoding='utf-8', errors='surrogateescape')
+
+    def __len__(self):
+        return len(self.done)
+
+    def is_done(self, i, crc):
+        """第 i 个成员是否已经在上次运行中完成"""
+        return self.done.get(i) == crc
+
+    def reserve(self, targets):
+        """写出成员之前调用：记下一批 (序号, 目标路径)，作为一行立即交给操作系统（连同缓冲区中的完成记录）
+
+        序号是记完成时用的序号；嵌套的压缩包中写出的文件都记在顶层成员的序号下。
+        输出目录下的目标路径记相对路径。
+        """
+        prefix = self._prefix
+        n = len(prefix) if prefix else 0
+        self._file.write(_INTENT + "[" + ",".join([
+            f"[{i},{_encode(t[n:] if n and t.startswith(prefix) else t)}]"
+            for i, t in targets]) + "]\n")
+        self._file.flush()
+
+    def record(self, i, crc):
+        """记录一个已完成的成员"""
+        # 只写进文件，不放进 done：done 是上次运行完成的成员，本次每个成员只处理一次，
+        # 成员数以百万计时也不随处理进度占用内存
+        self._file.write(f"{i} {crc:x}\n")
+        self._unsynced += 1
+        if (self._unsynced >= self.sync_every or
+                time.monotonic() - self._last_sync >= self.sync_interval):
+            self._sync()
+
+    def _sync(self):
+        if self.before_sync is not None:
+            self.before_sync()
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def close(self, complete=False):
+        """关闭日志；complete 为 True 表示处理已全部完成，删除日志"""
+        if self._file.closed:
+            return
+        self._sync()
+        self._file.close()
+        if complete:
+            try:
+                os.remove(self.path)
+                os.rmdir(os.path.dirname(self.path))
+            except OSError:
+                pass
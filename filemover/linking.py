@@ -0,0 +1,138 @@
+"""
+链接模式：成员只解压一次到持久的内容库，再硬链接（或 reflink）到目标文件夹
+"""
+
+import hashlib
+import os
+import shutil
+
+from .extract import stream_member
+from .output import DEFAULT_WRITER
+from .index import archive_key
+
+STORE_DIR_NAME = ".filemover_store"
+
+# 实际使用的放置方式
+LINK_HARD = "hardlink"
+LINK_REFLINK = "reflink"
+LINK_COPY = "copy"
+
+# Linux 的 FICLONE ioctl（btrfs、XFS、bcachefs 等写时复制文件系统支持）
+FICLONE = 0x40049409
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def reflink(source_path, target_path):
+    """用 FICLONE 创建共享数据块的副本，不支持时抛出 OSError"""
+    if fcntl is None:
+        raise OSError("当前平台不支持 reflink")
+    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            os.remove(target_path)
+            raise
+    shutil.copystat(source_path, target_path)
+
+
+def link_or_copy(source_path, target_path):
+    """依次尝试硬链接、reflink、复制，返回实际使用的方式"""
+    try:
+        os.link(source_path, target_path)
+        return LINK_HARD
+    except OSError:
+        pass
+
+    try:
+        reflink(source_path, target_path)
+        return LINK_REFLINK
+    except OSError:
+        pass
+
+    shutil.copy2(source_path, target_path)
+    return LINK_COPY
+
+
+class ContentStore:
+    """一个压缩包在内容库中的解压结果
+
+    内容库位于输出目录下，处理结束后仍然保留，所以目标文件夹中的链接不会失效；
+    重新处理同一个压缩包时已经解压过的成员直接复用。
+    """
+
+    def __init__(self, store_root, archive_path):
+        archive_id = hashlib.sha1(repr(archive_key(archive_path)).encode('utf-8')).hexdigest()[:16]
+        self.root = os.path.join(store_root, archive_id)
+        self._dirs = set()
+
+    def path_for(self, file_info):
+        """ZIP 成员在内容库中的路径"""
+        return self.member_path(file_info.filename, file_info.CRC, file_info.file_size)
+
+    def member_path(self, name, crc, size):
+        """成员在内容库中的路径（按文件名散列分桶，CRC 和大小区分同名成员）"""
+        digest = hashlib.sha1(name.encode('utf-8', 'surrogateescape')).hexdigest()
+        ext = os.path.splitext(name)[1]
+        return os.path.join(self.root, digest[:2], f"{digest[2:18]}-{crc:08x}-{size}{ext}")
+
+    def _stored(self, path, size):
+        """内容库中已有完整的这个成员时返回 True，否则准备好所在目录"""
+        try:
+            if os.path.getsize(path) == size:
+                return True
+        except OSError:
+            pass
+
+        directory = os.path.dirname(path)
+        if directory not in self._dirs:
+            os.makedirs(directory, exist_ok=True)
+            self._dirs.add(directory)
+        return False
+
+    def materialize(self, zip_file, file_info, writer=None):
+        """确保成员已经解压到内容库，返回其路径"""
+        path = self.path_for(file_info)
+        if not self._stored(path, file_info.file_size):
+            # 先写临时文件再改名，中断时不会留下看似完整的半个文件
+            partial = f"{path}.{os.getpid()}.part"
+            stream_member(zip_file, file_info, partial, writer)
+            os.replace(partial, path)
+        return path
+
+    def place(self, zip_file, file_info, target_path, writer=None):
+        """把成员放到目标路径，返回使用的方式
+
+        writer（output.OutputWriter）写入内容库并按持久性级别记录目标路径上的链接。
+        """
+        return self._link(self.materialize(zip_file, file_info, writer), target_path, writer)
+
+    def place_stream(self, entry, stream, target_path, writer=None):
+        """顺序读取的格式（archives.ArchiveEntry + 数据流）：写入内容库再放到目标路径
+
+        格式不记录 CRC 时以 0 代替，同名同大小的成员由序号区分。
+        """
+        if writer is None:
+            writer = DEFAULT_WRITER
+        if entry.crc is None:
+            path = self.member_path(f"{entry.position}/{entry.name}", 0, entry.size)
+        else:
+            path = self.member_path(entry.name, entry.crc, entry.size)
+        if not self._stored(path, entry.size):
+            partial = f"{path}.{os.getpid()}.part"
+            writer.write(stream, partial, entry.size, entry.mtime, entry.mode)
+            os.replace(partial, path)
+        return self._link(path, target_path, writer)
+
+    @staticmethod
+    def _link(path, target_path, writer):
+        method = link_or_copy(path, target_path)
+        if writer is not None:
+            # 改名后的内容库文件和目标路径上的新目录项也要持久
+            writer.track(path)
+            writer.track(target_path)
+        return method
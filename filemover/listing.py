@@ -0,0 +1,293 @@
+"""
+预览列表的数据模型：后台线程边读中央目录边分类，界面每次只取可见的一页
+
+不为每个成员创建对象或控件：成员信息在 ArchiveIndex 的紧凑数组中，
+匹配结果是一个 bytearray，"匹配"/"未匹配"视图是成员序号的 array，
+目标路径只记录重名时追加的序号，显示时才拼出完整路径。
+修改关键字后从头重新分类；新关键字只是缩小或扩大原来的匹配范围时，
+沿用上一轮已经确定的结果，不再逐个匹配。
+"""
+
+import os
+import threading
+from array import array
+from collections import namedtuple
+
+from .archives import open_archive
+from .content import MATCH_ANY, MATCH_CONTENT, MATCH_NAME
+from .engine import MATCHED_DIR_NAME, UNDECIDED, UNMATCHED_DIR_NAME, UNMATCHED_EXTRACT, is_zip
+from .index import ArchiveIndex, archive_key, open_archive_file, read_central_directory
+from .matcher import MATCH_SUBSTRING
+from .naming import NameRegistry
+
+# 列表视图：全部成员、只看匹配的、只看未匹配的
+VIEW_ALL = "all"
+VIEW_MATCHED = "matched"
+VIEW_UNMATCHED = "unmatched"
+VIEWS = (VIEW_ALL, VIEW_MATCHED, VIEW_UNMATCHED)
+
+# 每次分类的成员数，分类和读取中央目录交替进行
+CLASSIFY_CHUNK = 16384
+
+# 目标路径的重名序号：0 为不改名，NOT_WRITTEN 为不会写出（未匹配文件不解压、待扫描内容）
+NOT_WRITTEN = 0xFFFFFFFF
+
+# 新关键字的匹配结果是旧结果的子集 / 超集
+NARROW = "narrow"
+WIDEN = "widen"
+
+# 列表中的一行：成员序号、压缩包内路径、解压后大小、是否匹配（1/0/UNDECIDED）、目标路径
+# 目标路径还没算出时为 None，不会写出时为空字符串
+ListingRow = namedtuple("ListingRow", ["position", "name", "size", "matched", "target"])
+# 进度：已读取的成员数、已分类的成员数、匹配数、是否全部完成、出错信息
+ListingStatus = namedtuple("ListingStatus",
+                           ["loaded", "classified", "matched_count", "done", "error"])
+
+
+def matcher_relation(old, new):
+    """两组子串关键字之间的包含关系：NARROW、WIDEN，无法判断时为 None"""
+    if old is None or old.mode != MATCH_SUBSTRING or new.mode != MATCH_SUBSTRING:
+        return None
+    old_words = [k.lower() for k in old.keywords]
+    new_words = [k.lower() for k in new.keywords]
+    # 每个新关键字都包含某个旧关键字：命中新关键字的文件名一定命中旧关键字
+    if all(any(o in n for o in old_words) for n in new_words):
+        return NARROW
+    if all(any(n in o for n in new_words) for o in old_words):
+        return WIDEN
+    return None
+
+
+class _Pass:
+    """一组关键字的一轮分类结果"""
+
+    def __init__(self, matcher, relation, previous):
+        self.matcher = matcher
+        self.relation = relation
+        # 上一轮的结果，只用于缩小或扩大范围时跳过匹配
+        self.previous = previous
+        self.flags = bytearray()
+        self.matched = array('I')
+        self.unmatched = array('I')
+        self.suffixes = array('I')
+        self.classified = 0
+        # (未匹配, 匹配) 文件夹的文件名登记表，全部分类完成后释放
+        self.registries = None
+
+
+class PreviewListing:
+    """一个压缩包的预览列表
+
+    start() 之后后台线程负责读取和分类，界面线程只调用 rows()、count() 和 status()。
+    """
+
+    def __init__(self, archive_path, output_dir, unmatched_policy=UNMATCHED_EXTRACT,
+                 match_target=MATCH_NAME, index_cache=None):
+        self.archive_path = archive_path
+        self.match_target = match_target
+        self.index_cache = index_cache
+        self.dirs = (os.path.join(output_dir, UNMATCHED_DIR_NAME)
+                     if unmatched_policy == UNMATCHED_EXTRACT else None,
+                     os.path.join(output_dir, MATCHED_DIR_NAME))
+        self.index = None
+        self.loaded = 0
+        self.load_done = False
+        self.error = None
+        self._pass = None
+        self._pending = None
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self, matcher):
+        self._pending = matcher
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def set_matcher(self, matcher):
+        """换一组关键字，后台从头重新分类"""
+        with self._cond:
+            self._pending = matcher
+            self._cond.notify()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+    def _run(self):
+        try:
+            loader = self._load()
+            while True:
+                with self._cond:
+                    while (not self._closed and self._pending is None and loader is None and
+                           self._pass.classified >= self.loaded):
+                        self._cond.wait()
+                    if self._closed:
+                        return
+                    # 先换上新的一轮再清除 _pending，status() 不会把上一轮的结果当成已完成
+                    if self._pending is not None:
+                        self._pass = self._new_pass(self._pending)
+                        self._pending = None
+
+                current = self._pass
+                if current.classified < self.loaded:
+                    self._classify(current, min(self.loaded, current.classified + CLASSIFY_CHUNK))
+                elif loader is not None:
+                    try:
+                        next(loader)
+                    except StopIteration:
+                        loader = None
+                        self.load_done = True
+                if self.load_done and current.classified >= self.loaded:
+                    current.registries = None
+                    current.previous = None
+        except Exception as e:
+            self.error = str(e)
+
+    def _load(self):
+        """读取成员列表的生成器，每读完一块 yield 一次"""
+        path = self.archive_path
+        if not is_zip(path):
+            index = ArchiveIndex(path)
+            self.index = index
+            with open_archive(path) as archive:
+                for entry in archive.entries():
+                    index.append_fields(entry.name.encode('utf-8', 'surrogateescape'),
+                                        entry.size, crc=entry.crc or 0)
+                    if len(index) % CLASSIFY_CHUNK == 0:
+                        self.loaded = len(index)
+                        yield
+            self.loaded = len(index)
+            return
+
+        index = self.index_cache.find(path) if self.index_cache is not None else None
+        if index is not None:
+            self.index = index
+            self.loaded = len(index)
+            return
+        index = ArchiveIndex(path, archive_key(path))
+        self.index = index
+        with open_archive_file(path) as fp:
+            for count in read_central_directory(fp, index):
+                self.loaded = count
+                yield
+        # 读完的索引交给缓存，随后的预览和处理不再解析中央目录
+        if self.index_cache is not None:
+            self.index_cache.put(index)
+
+    def _new_pass(self, matcher):
+        previous = self._pass
+        relation = None
+        if previous is not None and previous.classified:
+            relation = matcher_relation(previous.matcher, matcher)
+        current = _Pass(matcher, relation,
+                        previous.flags[:previous.classified] if relation else None)
+        current.registries = tuple(NameRegistry(d) if d else None for d in self.dirs)
+        return current
+
+    def _name_flag(self, current, i, name):
+        """第 i 个成员的文件名是否命中；能由上一轮结果推出时不再匹配"""
+        previous = current.previous
+        if previous is not None and i < len(previous):
+            # 上一轮按"文件名或内容"分类时，文件名没有命中的记为 UNDECIDED
+            hit = previous[i] == 1
+            if current.relation == NARROW and not hit:
+                return False
+            if current.relation == WIDEN and hit:
+                return True
+        return current.matcher.match(name)
+
+    def _classify(self, current, stop):
+        index = self.index
+        registries = current.registries
+        basename = os.path.basename
+        for i in range(current.classified, stop):
+            name = index.name(i)
+            if self.match_target == MATCH_CONTENT:
+                flag = UNDECIDED
+            elif self._name_flag(current, i, name):
+                flag = 1
+            else:
+                flag = UNDECIDED if self.match_target == MATCH_ANY else 0
+
+            suffix = NOT_WRITTEN
+            if flag != UNDECIDED:
+                (current.matched if flag else current.unmatched).append(i)
+                if registries[flag] is not None:
+                    suffix = registries[flag].reserve_name(basename(name))[1]
+            current.flags.append(flag)
+            current.suffixes.append(suffix)
+        current.classified = stop
+
+    def target_path(self, name, flag, suffix):
+        if suffix == NOT_WRITTEN:
+            return ""
+        basename = os.path.basename(name)
+        if suffix:
+            stem, ext = os.path.splitext(basename)
+            basename = f"{stem}_{suffix}{ext}"
+        return os.path.join(self.dirs[flag], basename)
+
+    def count(self, view=VIEW_ALL):
+        """视图中目前的行数（后台还在读取或分类时会继续增加）"""
+        current = self._pass
+        if view == VIEW_ALL:
+            return self.loaded
+        if current is None:
+            return 0
+        return len(current.matched if view == VIEW_MATCHED else current.unmatched)
+
+    def rows(self, view, start, count):
+        """视图中从 start 开始的 count 行
+
+        还没分类到的成员当场匹配文件名，目标路径为 None。
+        """
+        index = self.index
+        current = self._pass
+        if index is None:
+            return []
+        if view == VIEW_ALL:
+            positions = range(start, min(start + count, self.loaded))
+        elif current is None:
+            positions = ()
+        else:
+            positions = (current.matched if view == VIEW_MATCHED else
+                         current.unmatched)[start:start + count]
+
+        rows = []
+        for i in positions:
+            name = index.name(i)
+            flag = target = None
+            if current is not None and i < current.classified:
+                flag = current.flags[i]
+                target = self.target_path(name, flag, current.suffixes[i])
+            elif current is not None:
+                if self.match_target == MATCH_CONTENT:
+                    flag = UNDECIDED
+                elif current.matcher.match(name):
+                    flag = 1
+                else:
+                    flag = UNDECIDED if self.match_target == MATCH_ANY else 0
+            rows.append(ListingRow(i, name, index.file_sizes[i], flag, target))
+        return rows
+
+    @property
+    def nbytes(self):
+        """列表占用的大致字节数（索引加当前一轮的各列数组，不含分类中临时的文件名登记表）"""
+        total = self.index.nbytes if self.index is not None else 0
+        current = self._pass
+        if current is not None:
+            total += len(current.flags) + sum(len(c) * c.itemsize for c in
+                                              (current.matched, current.unmatched,
+                                               current.suffixes))
+        return total
+
+    def status(self):
+        pending = self._pending
+        current = self._pass
+        classified = current.classified if current is not None else 0
+        matched_count = len(current.matched) if current is not None else 0
+        done = (self.load_done and current is not None and pending is None and
+                classified >= self.loaded)
+        return ListingStatus(self.loaded, classified, matched_count, done, self.error)
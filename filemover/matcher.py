@@ -0,0 +1,108 @@
+"""
+关键字匹配：把整组关键字一次性编译成单个正则，每个文件名只扫描一遍
+"""
+
+import re
+
+# 匹配方式：substring 为不区分大小写的子串匹配，regex 为正则表达式
+MATCH_SUBSTRING = "substring"
+MATCH_REGEX = "regex"
+MATCH_MODES = (MATCH_SUBSTRING, MATCH_REGEX)
+
+# 永远不会匹配的模式（关键字为空时使用）
+_NEVER = r"(?!)"
+
+
+def parse_keywords(text):
+    """把文本框内容拆成关键字列表（每行一个，忽略空行）"""
+    return [k.strip() for k in text.split('\n') if k.strip()]
+
+
+def _build_trie(words):
+    """构建字符前缀树，'' 键表示有关键字在此结束"""
+    root = {}
+    for word in words:
+        node = root
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[''] = True
+    return root
+
+
+def _trie_pattern(node):
+    """把前缀树转换成等价的正则（公共前缀只出现一次，避免逐个关键字回溯）"""
+    if '' in node:
+        # 较短的关键字已经命中，更长的关键字对"是否匹配"没有影响
+        return ''
+
+    singles = []
+    branches = []
+    for ch in sorted(node):
+        child = _trie_pattern(node[ch])
+        if child:
+            branches.append(re.escape(ch) + child)
+        else:
+            singles.append(ch)
+
+    if len(singles) == 1:
+        branches.append(re.escape(singles[0]))
+    elif singles:
+        branches.append('[' + ''.join(re.escape(ch) for ch in singles) + ']')
+
+    if len(branches) == 1:
+        return branches[0]
+    return '(?:' + '|'.join(branches) + ')'
+
+
+def compile_substring_pattern(keywords):
+    """把子串关键字（已转小写）编译成一个正则"""
+    words = {k for k in keywords if k}
+    if not words:
+        return re.compile(_NEVER)
+    return re.compile(_trie_pattern(_build_trie(words)))
+
+
+def compile_regex_pattern(keywords):
+    """把多个正则关键字合并成一个不区分大小写的正则"""
+    if not keywords:
+        return re.compile(_NEVER, re.IGNORECASE)
+    for keyword in keywords:
+        try:
+            re.compile(keyword)
+        except re.error as e:
+            raise ValueError(f"无效的正则表达式 '{keyword}': {e}")
+    # 单个关键字有效，合并后仍可能出错：两个关键字定义了同名的组，
+    # 或者 (?i) 这样的全局标志不在整个正则的开头
+    try:
+        return re.compile('|'.join(f'(?:{k})' for k in keywords), re.IGNORECASE)
+    except re.error as e:
+        raise ValueError(f"无效的正则表达式（关键字合并后）: {e}")
+
+
+class KeywordMatcher:
+    """编译后的关键字集合"""
+
+    def __init__(self, keywords, mode=MATCH_SUBSTRING):
+        if mode not in MATCH_MODES:
+            raise ValueError(f"未知的匹配方式: {mode}")
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self.mode = mode
+        # 作为匹配结果缓存的键
+        self.key = (mode, tuple(self.keywords))
+
+        if mode == MATCH_SUBSTRING:
+            self.pattern = compile_substring_pattern([k.lower() for k in self.keywords])
+        else:
+            self.pattern = compile_regex_pattern(self.keywords)
+        self._search = self.pattern.search
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def match(self, name):
+        """文件名是否命中任一关键字"""
+        if self.mode == MATCH_SUBSTRING:
+            return self._search(name.lower()) is not None
+        return self._search(name) is not None
+
+    __call__ = match
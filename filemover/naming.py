@@ -0,0 +1,151 @@
+"""
+目标文件名登记表：在内存中解决重名，不再逐个探测文件系统
+"""
+
+import hashlib
+import os
+import threading
+from array import array
+
+# 紧凑散列表的初始容量（必须是 2 的幂）和空槽、已删除槽的标记
+_INITIAL_SLOTS = 1024
+_EMPTY = 0
+_DELETED = 1
+
+
+class CompactNameSet:
+    """只保存文件名 64 位散列值的开放寻址表，每个文件名约占 16 字节
+
+    用于成员数以百万计的省内存模式：Python 的 set 中每个文件名连同字符串对象要上百字节。
+    两个不同文件名散列值相同的概率约为 n²/2⁶⁵（五百万个文件名约百万分之一），
+    碰上时只会让后一个文件多一个 _N 后缀，不会覆盖文件。
+    """
+
+    def __init__(self):
+        self.slots = array('Q', bytes(8 * _INITIAL_SLOTS))
+        self.used = 0
+        self.count = 0
+
+    @staticmethod
+    def _hash(name):
+        value = int.from_bytes(hashlib.blake2b(name.encode('utf-8', 'surrogateescape'),
+                                               digest_size=8).digest(), 'little')
+        # 0 和 1 留作空槽和删除标记
+        return value if value > _DELETED else value + 2
+
+    def _find(self, value):
+        """value 所在的槽，不存在时返回可以放入的槽（优先复用删除过的槽）"""
+        slots = self.slots
+        mask = len(slots) - 1
+        pos = value & mask
+        free = None
+        while True:
+            current = slots[pos]
+            if current == value:
+                return pos
+            if current == _EMPTY:
+                return pos if free is None else free
+            if current == _DELETED and free is None:
+                free = pos
+            pos = (pos + 1) & mask
+
+    def __contains__(self, name):
+        value = self._hash(name)
+        return self.slots[self._find(value)] == value
+
+    def add(self, name):
+        value = self._hash(name)
+        pos = self._find(value)
+        current = self.slots[pos]
+        if current == value:
+            return
+        if current == _EMPTY:
+            self.used += 1
+        self.slots[pos] = value
+        self.count += 1
+        # 已用的槽（含删除过的）超过一半时重建，探测链保持很短；大多是删除标记时不必加倍
+        if self.used * 2 > len(self.slots):
+            grow = 2 if self.count * 4 > len(self.slots) else 1
+            self._resize(len(self.slots) * grow)
+
+    def discard(self, name):
+        value = self._hash(name)
+        pos = self._find(value)
+        if self.slots[pos] == value:
+            self.slots[pos] = _DELETED
+            self.count -= 1
+
+    def _resize(self, size):
+        old = self.slots
+        self.slots = array('Q', bytes(8 * size))
+        self.used = self.count
+        mask = size - 1
+        slots = self.slots
+        for value in old:
+            if value > _DELETED:
+                pos = value & mask
+                while slots[pos] != _EMPTY:
+                    pos = (pos + 1) & mask
+                slots[pos] = value
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return len(self.slots) * self.slots.itemsize
+
+
+class NameRegistry:
+    """一个目标文件夹内已占用的文件名
+
+    创建时用一次 os.scandir 读取已有文件，之后所有重名判断都在内存中完成。
+    命名规则与原来一致：name.ext 已存在时依次尝试 name_1.ext、name_2.ext ……
+    compact 为真时只记文件名的散列值（CompactNameSet），用于成员极多的压缩包。
+    """
+
+    def __init__(self, directory, compact=False):
+        self.directory = directory
+        self.taken = CompactNameSet() if compact else set()
+        # 每个原始文件名下一次从哪个序号开始尝试
+        self.next_counter = {}
+        self.lock = threading.Lock()
+
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    self.taken.add(os.path.normcase(entry.name))
+        except FileNotFoundError:
+            pass
+
+    def reserve(self, basename):
+        """为 basename 分配一个不重名的目标路径"""
+        return os.path.join(self.directory, self.reserve_name(basename)[0])
+
+    def reserve_name(self, basename):
+        """为 basename 分配一个不重名的文件名，返回 (文件名, 追加的序号)，不改名时序号为 0"""
+        key = os.path.normcase(basename)
+        with self.lock:
+            if key not in self.taken:
+                self.taken.add(key)
+                return basename, 0
+
+            name, ext = os.path.splitext(basename)
+            counter = self.next_counter.get(key, 1)
+            while True:
+                candidate = f"{name}_{counter}{ext}"
+                candidate_key = os.path.normcase(candidate)
+                if candidate_key not in self.taken:
+                    break
+                counter += 1
+
+            self.taken.add(candidate_key)
+            self.next_counter[key] = counter + 1
+            return candidate, counter
+
+    def release(self, basename, target_path):
+        """释放一个没有真正写出的目标路径（写入失败时调用）"""
+        with self.lock:
+            self.taken.discard(os.path.normcase(os.path.basename(target_path)))
+            # 被释放的序号可能小于记录的下一个序号，从头重新探测
+            self.next_counter.pop(os.path.normcase(basename), None)
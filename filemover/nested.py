@@ -0,0 +1,88 @@
+"""
+嵌套压缩包：直接从外层成员的数据流打开内层压缩包，逐层解压
+
+内层压缩包小于阈值时放在内存里，超过阈值溢出到临时文件。
+层数和（所有内层压缩包）解压出的总字节数都有上限，防止压缩炸弹耗尽内存或磁盘。
+"""
+
+import tempfile
+
+from .archives import is_archive
+from .extract import DEFAULT_CHUNK_SIZE
+
+# 默认最多向下几层（顶层压缩包中的压缩包为第 1 层）
+DEFAULT_MAX_DEPTH = 3
+# 所有内层压缩包合计最多解压出多少字节（含内层压缩包本身）
+DEFAULT_MAX_BYTES = 4 * 1024 * 1024 * 1024
+# 内层压缩包超过这个大小时溢出到临时文件
+DEFAULT_SPILL_BYTES = 64 * 1024 * 1024
+
+# 虚拟路径中各层之间的分隔符：outer.zip/inner.zip/file
+PATH_SEPARATOR = "/"
+
+
+class NestedLimitExceeded(Exception):
+    """嵌套压缩包解压出的数据超过了上限"""
+
+
+class NestedLimits:
+    """一次处理中所有内层压缩包共用的限额"""
+
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_bytes=DEFAULT_MAX_BYTES,
+                 spill_bytes=DEFAULT_SPILL_BYTES):
+        self.max_depth = max_depth
+        self.max_bytes = max_bytes
+        self.spill_bytes = spill_bytes
+        self.used_bytes = 0
+
+    def can_descend(self, name, depth):
+        """depth 层中名为 name 的成员是否作为压缩包继续向下解压"""
+        return depth < self.max_depth and is_archive(name)
+
+    @property
+    def exhausted(self):
+        return self.used_bytes > self.max_bytes
+
+    def charge(self, nbytes):
+        """计入解压出的字节数，超过上限时抛出 NestedLimitExceeded"""
+        self.used_bytes += nbytes
+        if self.exhausted:
+            raise NestedLimitExceeded(f"嵌套压缩包解压出的数据超过上限 {self.max_bytes} 字节")
+
+
+class BudgetReader:
+    """读取时把字节数计入限额的数据流包装
+
+    不信任成员声明的大小，按实际读出的数据计算。
+    """
+
+    def __init__(self, stream, limits):
+        self.stream = stream
+        self.limits = limits
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.limits.charge(len(data))
+        return data
+
+
+def spool_member(stream, limits, temp_dir=None):
+    """把内层压缩包读进内存（超过阈值时溢出到临时文件），返回可随机访问的文件对象"""
+    spooled = tempfile.SpooledTemporaryFile(max_size=limits.spill_bytes, dir=temp_dir)
+    try:
+        reader = BudgetReader(stream, limits)
+        while True:
+            chunk = reader.read(DEFAULT_CHUNK_SIZE)
+            if not chunk:
+                break
+            spooled.write(chunk)
+        spooled.seek(0)
+    except BaseException:
+        spooled.close()
+        raise
+    return spooled
+
+
+def virtual_path(prefix, name):
+    """内层成员的虚拟路径"""
+    return f"{prefix}{PATH_SEPARATOR}{name}" if prefix else name
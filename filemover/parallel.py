@@ -0,0 +1,228 @@
+"""
+并行解压引擎：把同一个压缩包的成员分给多个工作者同时解压
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from .extract import stream_member
+from .index import ZipMemberReader
+
+# 工作池类型：zlib 解压会释放 GIL，用线程池即可；bzip2/lzma 建议用进程池
+POOL_THREAD = "thread"
+POOL_PROCESS = "process"
+POOL_KINDS = (POOL_THREAD, POOL_PROCESS)
+
+# 小文件按批次派发，单批上限
+BATCH_BYTES = 32 * 1024 * 1024
+BATCH_ENTRIES = 256
+
+# 一个待解压的成员：ZipInfo（来自索引）、目标路径、解压后大小、是否匹配、在索引中的序号
+ExtractTask = namedtuple("ExtractTask", ["file_info", "target_path", "size", "matched", "position"])
+
+# 进程池中每个进程各自持有的压缩包句柄、链接模式的内容库和写入器
+_process_archive = None
+_process_store = None
+_process_writer = None
+
+# 批量调度时进程池中每个进程按压缩包缓存的句柄，以及缓存上限
+_process_readers = OrderedDict()
+_process_readers_max = 4
+
+
+def default_workers():
+    """默认工作者数量"""
+    return os.cpu_count() or 1
+
+
+def make_batches(tasks, batch_bytes=BATCH_BYTES, batch_entries=BATCH_ENTRIES):
+    """按大小从大到小把任务分批，返回 [[任务序号, ...], ...]
+
+    大文件单独成批并最先派发，小文件合并成批，避免最后剩下一个大文件拖尾。
+    """
+    order = sorted(range(len(tasks)), key=lambda i: tasks[i].size, reverse=True)
+
+    batches = []
+    current = []
+    current_bytes = 0
+    for i in order:
+        size = tasks[i].size
+        if size >= batch_bytes:
+            batches.append([i])
+            continue
+        if current and (current_bytes + size > batch_bytes or len(current) >= batch_entries):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(i)
+        current_bytes += size
+    if current:
+        batches.append(current)
+    return batches
+
+
+def extract_batch(reader, batch, store=None, timings=None, writer=None):
+    """在一个压缩包句柄上解压一批 (序号, ZipInfo, 目标路径)，返回成功的序号
+
+    传入 store 时成员先解压到内容库，再链接到目标路径。
+    传入 timings 列表时，每个成功的成员追加一个 (序号, 耗时)。
+    传入 writer（output.OutputWriter）时按它的持久性级别写入，返回前 fsync 这一批，
+    调用方拿到结果再记运行日志（进程池中的写入器与主进程的不是同一个）。
+    """
+    done = []
+    for i, file_info, target_path in batch:
+        if timings is not None:
+            start = time.perf_counter()
+        try:
+            if store is not None:
+                store.place(reader, file_info, target_path, writer)
+            else:
+                stream_member(reader, file_info, target_path, writer)
+            done.append(i)
+        except Exception:
+            continue
+        if timings is not None:
+            timings.append((i, time.perf_counter() - start))
+    if writer is not None:
+        writer.sync()
+    return done
+
+
+def _timed_batch(reader, batch, store, timed, writer=None):
+    """解压一批，返回 (成功的序号, 每个成员的耗时)；不计时时耗时为 None"""
+    timings = [] if timed else None
+    return extract_batch(reader, batch, store, timings, writer), timings
+
+
+def _init_process_worker(archive_path, store, writer=None):
+    """进程池初始化：每个进程打开一次压缩包（成员位置来自索引，不再解析中央目录）"""
+    global _process_archive, _process_store, _process_writer
+    _process_archive = ZipMemberReader(archive_path)
+    _process_store = store
+    _process_writer = writer
+
+
+def _process_batch(batch, timed):
+    """进程池中执行的批次"""
+    return _timed_batch(_process_archive, batch, _process_store, timed, _process_writer)
+
+
+def init_multi_archive_worker(max_open):
+    """批量调度的进程池初始化：限制每个进程同时打开的压缩包数量"""
+    global _process_readers_max
+    _process_readers_max = max(1, max_open)
+
+
+def process_archive_batch(archive_path, batch, store=None, writer=None):
+    """批量调度时进程池中执行的批次，句柄按压缩包 LRU 缓存；store、writer 同 extract_batch"""
+    reader = _process_readers.get(archive_path)
+    if reader is None:
+        reader = ZipMemberReader(archive_path)
+        _process_readers[archive_path] = reader
+        while len(_process_readers) > _process_readers_max:
+            _, old = _process_readers.popitem(last=False)
+            old.close()
+    else:
+        _process_readers.move_to_end(archive_path)
+    return extract_batch(reader, batch, store, writer=writer)
+
+
+class ParallelExtractor:
+    """并行解压一个压缩包中的多个成员"""
+
+    def __init__(self, archive_path, workers=None, pool_kind=POOL_THREAD, store=None,
+                 timed=False, writer=None):
+        if pool_kind not in POOL_KINDS:
+            raise ValueError(f"未知的工作池类型: {pool_kind}")
+        self.archive_path = archive_path
+        self.store = store
+        self.writer = writer
+        self.workers = max(1, workers or default_workers())
+        self.pool_kind = pool_kind
+        # 计时时每次 run 之后 timings 为成功的 (任务序号, 耗时)
+        self.timed = timed
+        self.timings = []
+
+    def run(self, tasks, progress=None, on_done=None):
+        """解压全部任务，返回与 tasks 等长的成功标记列表
+
+        progress(成员数, 字节数) 在每个批次完成后用该批次的增量调用；
+        on_done(成功的任务序号列表) 同样按批次调用，都在调用 run 的线程中执行。
+        """
+        results = [False] * len(tasks)
+        self.timings = []
+        if not tasks:
+            return results
+
+        batches = [[(i, tasks[i].file_info, tasks[i].target_path) for i in batch]
+                   for batch in make_batches(tasks)]
+
+        if self.pool_kind == POOL_PROCESS:
+            executor = ProcessPoolExecutor(max_workers=self.workers,
+                                           initializer=_init_process_worker,
+                                           initargs=(self.archive_path, self.store,
+                                                     self.writer))
+            submit = lambda batch: executor.submit(_process_batch, batch, self.timed)
+            handles = None
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.workers)
+            handles = ThreadReaders(self.archive_path)
+            submit = lambda batch: executor.submit(
+                lambda b: _timed_batch(handles.get(), b, self.store, self.timed, self.writer),
+                batch)
+
+        futures = {}
+        try:
+            futures = {submit(batch): batch for batch in batches}
+            for future in as_completed(futures):
+                batch = futures.pop(future)
+                done, timings = future.result()
+                if timings:
+                    self.timings.extend(timings)
+                for i in done:
+                    results[i] = True
+                if on_done:
+                    on_done(done)
+                if progress:
+                    progress(len(batch), sum(task[1].file_size for task in batch))
+        finally:
+            # 出错时取消还没开始的批次，已经写完的批次仍然通知 on_done（供运行日志记录）
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=True)
+            if handles is not None:
+                handles.close()
+            if on_done:
+                for future in futures:
+                    if future.done() and not future.cancelled() and future.exception() is None:
+                        on_done(future.result()[0])
+
+        return results
+
+
+class ThreadReaders:
+    """线程池中每个线程各自的压缩包句柄"""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self.local = threading.local()
+        self.opened = []
+        self.lock = threading.Lock()
+
+    def get(self):
+        reader = getattr(self.local, 'reader', None)
+        if reader is None:
+            reader = ZipMemberReader(self.archive_path)
+            self.local.reader = reader
+            with self.lock:
+                self.opened.append(reader)
+        return reader
+
+    def close(self):
+        with self.lock:
+            for reader in self.opened:
+                reader.close()
+            self.opened = []
@@ -0,0 +1,173 @@
+"""
+处理前的计划：只凭中央目录（解压后大小、压缩后大小）算出每个成员的目标路径、
+每个目标文件夹要写入的字节数，并与所在磁盘的剩余空间比较
+
+处理开始前放不下时直接拒绝，不会写到一半磁盘满、留下残缺的输出目录。
+预计耗时按抽样解压测得的速度估算。
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import namedtuple
+
+from .extract import DEFAULT_CHUNK_SIZE
+from .index import ZipMemberReader
+
+# 文件按块分配空间，每个文件按块大小向上取整
+BLOCK_SIZE = 4096
+# 写满前至少保留的剩余空间
+RESERVE_BYTES = 64 * 1024 * 1024
+
+# 测速时抽样解压的数据量合计不超过这么多字节：最多这么多个最小的成员（合计不超过四分之一），
+# 其余按最大的成员的开头部分计
+SAMPLE_BYTES = 16 * 1024 * 1024
+SAMPLE_FILES = 64
+
+# 计划中的一个成员：压缩包内路径、解压后大小、压缩后大小、目标路径、是否匹配、在压缩包中的序号
+PlanEntry = namedtuple("PlanEntry", ["name", "size", "compress_size", "target_path", "matched",
+                                     "position"])
+# 一块磁盘：代表路径（第一个写到这块磁盘的目录）、需要的字节数、剩余字节数
+VolumeUsage = namedtuple("VolumeUsage", ["path", "required", "free"])
+
+
+def allocated_bytes(size):
+    """文件实际占用的磁盘空间（按块取整）"""
+    return (size + BLOCK_SIZE - 1) // BLOCK_SIZE * BLOCK_SIZE
+
+
+def existing_parent(path):
+    """path 本身或最近的已存在的上级目录（输出目录可能还没有创建）"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    return path
+
+
+class ProcessPlan:
+    """一个压缩包的处理计划"""
+
+    def __init__(self, archive_path, output_dir, operation_mode):
+        self.archive_path = archive_path
+        self.output_dir = output_dir
+        self.operation_mode = operation_mode
+        self.entries = []
+        # 目标文件夹 -> 要写入的字节数（按块取整）
+        self.dir_bytes = {}
+        self.total_bytes = 0
+        # 按抽样测得的速度估算的耗时（秒）和写入速度（字节/秒），没有测速时为 None
+        self.estimated_seconds = None
+        self.throughput = None
+
+    def add(self, name, size, compress_size, target_path, matched, position, data_dir=None):
+        """加入一个成员；data_dir 为实际存放数据的文件夹（链接模式下是内容库）"""
+        self.entries.append(PlanEntry(name, size, compress_size, target_path, matched, position))
+        self.reserve(data_dir or os.path.dirname(target_path), size)
+
+    def reserve(self, directory, size):
+        """只计入空间、不记录成员（处理前的检查用，不必生成每个成员的目标路径）"""
+        self.dir_bytes[directory] = self.dir_bytes.get(directory, 0) + allocated_bytes(size)
+        self.total_bytes += size
+
+    def volumes(self):
+        """按磁盘汇总需要的空间和剩余空间"""
+        usage = {}
+        for directory, nbytes in self.dir_bytes.items():
+            existing = existing_parent(directory)
+            device = os.stat(existing).st_dev
+            if device not in usage:
+                usage[device] = VolumeUsage(directory, 0, shutil.disk_usage(existing).free)
+            usage[device] = usage[device]._replace(required=usage[device].required + nbytes)
+        return list(usage.values())
+
+    def shortfalls(self):
+        """放不下的磁盘（剩余空间还要留出 RESERVE_BYTES）"""
+        return [v for v in self.volumes() if v.required + RESERVE_BYTES > v.free]
+
+    @property
+    def fits(self):
+        return not self.shortfalls()
+
+    def measure(self, index, workers=1):
+        """抽样解压一部分成员，测得速度后估算整个计划的耗时（只用于 ZIP，index 为其索引）
+
+        最小的若干成员整个解压，测每个文件的固定开销；最大的几个成员只解压开头部分，
+        测每字节的耗时，不会为了测速把很大的成员整个解压出来。抽样合计不超过 SAMPLE_BYTES，
+        都写到输出目录所在磁盘上的临时目录，测完删除。
+        """
+        entries = self.entries
+        by_size = sorted(range(len(entries)), key=lambda k: entries[k].size)
+        # 抽样为 (成员, 解压的字节数)
+        small = []
+        small_bytes = 0
+        for k in by_size[:SAMPLE_FILES]:
+            if small_bytes + entries[k].size > SAMPLE_BYTES // 4:
+                break
+            small.append((k, entries[k].size))
+            small_bytes += entries[k].size
+        chosen = {k for k, _ in small}
+        large = []
+        large_bytes = 0
+        for k in reversed(by_size):
+            nbytes = min(entries[k].size, SAMPLE_BYTES - small_bytes - large_bytes)
+            if k in chosen or nbytes <= 0:
+                break
+            large.append((k, nbytes))
+            large_bytes += nbytes
+        if not large and not small:
+            self.estimated_seconds = 0.0
+            return self.estimated_seconds
+
+        with ZipMemberReader(self.archive_path) as reader, \
+                tempfile.TemporaryDirectory(dir=existing_parent(self.output_dir)) as temp_dir:
+            def extract(sample):
+                start = time.perf_counter()
+                for n, (k, nbytes) in enumerate(sample):
+                    with reader.open(index.zipinfo(entries[k].position)) as src, \
+                            open(os.path.join(temp_dir, str(n)), 'wb') as dst:
+                        while nbytes > 0:
+                            chunk = src.read(min(nbytes, DEFAULT_CHUNK_SIZE))
+                            if not chunk:
+                                break
+                            dst.write(chunk)
+                            nbytes -= len(chunk)
+                return time.perf_counter() - start
+
+            per_file = extract(small) / len(small) if small else 0.0
+            large_seconds = extract(large)
+
+        per_byte = 0.0
+        if large_bytes:
+            per_byte = max(0.0, large_seconds - per_file * len(large)) / large_bytes
+        self.throughput = 1 / per_byte if per_byte else None
+        seconds = per_file * len(entries) + per_byte * self.total_bytes
+        # 并行时按工作者数量（不超过 CPU 核数）折算，偏乐观
+        self.estimated_seconds = seconds / max(1, min(workers, os.cpu_count() or 1))
+        return self.estimated_seconds
+
+    def to_dict(self):
+        volumes = self.volumes()
+        return {
+            "archive": self.archive_path,
+            "output_dir": self.output_dir,
+            "operation_mode": self.operation_mode,
+            "total_files": len(self.entries),
+            "total_bytes": self.total_bytes,
+            "directories": self.dir_bytes,
+            "volumes": [{"path": v.path, "required": v.required, "free": v.free,
+                         "fits": v.required + RESERVE_BYTES <= v.free} for v in volumes],
+            "fits": all(v.required + RESERVE_BYTES <= v.free for v in volumes),
+            "estimated_seconds": self.estimated_seconds,
+            "entries": [{"name": e.name, "size": e.size, "compress_size": e.compress_size,
+                         "target": e.target_path, "matched": bool(e.matched)}
+                        for e in self.entries],
+        }
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
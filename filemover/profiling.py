@@ -0,0 +1,237 @@
+"""
+处理过程的分阶段计时：每个阶段的耗时、最慢的若干个成员、读取和写入的字节数
+
+默认关闭（NULL_PROFILE），关闭时各阶段只进出一个空的上下文，
+逐个成员的计时和计数都在 profile.enabled 为真时才执行，不读时钟。
+需要深入分析时用 run_with_cprofile 在 cProfile 下执行整个处理过程。
+"""
+
+import cProfile
+import heapq
+import itertools
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# 计时结果默认写到输出目录下的这个文件（界面中打开「记录各阶段耗时」时）
+PROFILE_NAME = "处理耗时.json"
+
+# 默认报告最慢的几个成员
+DEFAULT_SLOWEST = 10
+
+# 各阶段按处理顺序排列的名称和说明
+STAGES = (
+    ("index", "解析中央目录 / 列出成员"),
+    ("match", "匹配关键字"),
+    ("prepare", "准备（运行日志、增量对照、空间检查、去重计划）"),
+    ("naming", "分配目标文件名"),
+    ("extract", "解压并写出"),
+    ("decompress", "其中读取和解压"),
+    ("journal", "记录运行日志"),
+    ("nested", "嵌套压缩包"),
+    ("manifest", "写清单"),
+)
+STAGE_LABELS = dict(STAGES)
+
+# /proc/self/io 中记录的计数
+IO_FIELDS = ("rchar", "wchar", "syscr", "syscw", "read_bytes", "write_bytes")
+
+
+def read_proc_io():
+    """当前进程的读写计数（只有 Linux 支持，其他平台返回 None）"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            values = dict(line.split(":") for line in f if ":" in line)
+    except OSError:
+        return None
+    return {k: int(values[k]) for k in IO_FIELDS if k in values}
+
+
+class RunProfile:
+    """一次处理（可以包含多个压缩包）的计时结果"""
+
+    enabled = True
+
+    def __init__(self, slowest=DEFAULT_SLOWEST):
+        self.slowest = slowest
+        # 阶段 -> [耗时, 次数]
+        self.stages = {}
+        self.entry_count = 0
+        # 从压缩包读取的（压缩后）字节数、写到磁盘的字节数
+        self.bytes_read = 0
+        self.bytes_written = 0
+        # 最慢的成员：最小堆 (耗时, 序号, 名称, 读取字节数, 写入字节数)
+        self._slowest = []
+        self._order = itertools.count()
+        self._start = time.perf_counter()
+        self._io_start = read_proc_io()
+        self.wall_seconds = None
+        self.io = None
+
+    def add(self, stage, seconds, count=1):
+        totals = self.stages.get(stage)
+        if totals is None:
+            self.stages[stage] = [seconds, count]
+        else:
+            totals[0] += seconds
+            totals[1] += count
+
+    @contextmanager
+    def stage(self, name):
+        """计时一个阶段（可以多次进入，耗时累加）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def entry(self, name, seconds, read_bytes, written_bytes):
+        """记录一个成员的耗时和读写字节数（不计入阶段耗时）"""
+        self.entry_count += 1
+        self.bytes_read += read_bytes
+        self.bytes_written += written_bytes
+        item = (seconds, next(self._order), name, read_bytes, written_bytes)
+        if len(self._slowest) < self.slowest:
+            heapq.heappush(self._slowest, item)
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def count_read(self, nbytes):
+        """计入不能按成员区分的读取量（顺序读取的格式整个压缩包读一遍）"""
+        self.bytes_read += nbytes
+
+    def finish(self):
+        """结束计时，记录总耗时和进程的读写计数"""
+        self.wall_seconds = time.perf_counter() - self._start
+        io = read_proc_io()
+        if io is not None and self._io_start is not None:
+            self.io = {k: io[k] - self._io_start[k] for k in io if k in self._io_start}
+
+    def slowest_entries(self):
+        return sorted(self._slowest, reverse=True)
+
+    def to_dict(self):
+        wall = self.wall_seconds or 0.0
+        order = [name for name, _ in STAGES] + sorted(set(self.stages) - set(STAGE_LABELS))
+        return {
+            "wall_seconds": wall,
+            "stages": {name: {"label": STAGE_LABELS.get(name, name),
+                              "seconds": self.stages[name][0],
+                              "count": self.stages[name][1],
+                              "percent": self.stages[name][0] / wall * 100 if wall else None}
+                       for name in order if name in self.stages},
+            "entries": self.entry_count,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "slowest": [{"name": name, "seconds": seconds, "read_bytes": read_bytes,
+                         "written_bytes": written_bytes}
+                        for seconds, _, name, read_bytes, written_bytes in self.slowest_entries()],
+            "io": self.io,
+        }
+
+    def format(self):
+        """计时结果的文字摘要"""
+        summary = self.to_dict()
+        lines = [f"总耗时 {summary['wall_seconds']:.3f}s，成员 {summary['entries']} 个，"
+                 f"读取 {summary['bytes_read'] / 1024 / 1024:.1f} MB，"
+                 f"写入 {summary['bytes_written'] / 1024 / 1024:.1f} MB"]
+        for stage in summary["stages"].values():
+            percent = f"{stage['percent']:5.1f}%" if stage["percent"] is not None else ""
+            lines.append(f"  {stage['label']}: {stage['seconds']:.3f}s {percent}")
+        if summary["slowest"]:
+            lines.append(f"最慢的 {len(summary['slowest'])} 个成员:")
+            for entry in summary["slowest"]:
+                lines.append(f"  {entry['seconds'] * 1000:8.1f} ms  {entry['name']}")
+        io = summary["io"]
+        if io:
+            lines.append(f"进程读写: 读 {io.get('rchar', 0) / 1024 / 1024:.1f} MB"
+                         f"（{io.get('syscr', 0)} 次调用），"
+                         f"写 {io.get('wchar', 0) / 1024 / 1024:.1f} MB"
+                         f"（{io.get('syscw', 0)} 次调用）")
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=1)
+
+
+class _NullProfile:
+    """关闭计时时使用：所有方法都什么也不做"""
+
+    enabled = False
+    _stage = nullcontext()
+
+    def add(self, stage, seconds, count=1):
+        pass
+
+    def stage(self, name):
+        return self._stage
+
+    def entry(self, name, seconds, read_bytes, written_bytes):
+        pass
+
+    def count_read(self, nbytes):
+        pass
+
+    def finish(self):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
+
+
+class _TimedStream:
+    """每次 read() 的耗时计入 decompress 阶段的成员数据流"""
+
+    def __init__(self, stream, profile):
+        self.stream = stream
+        self.profile = profile
+
+    def read(self, size=-1):
+        start = time.perf_counter()
+        data = self.stream.read(size)
+        self.profile.add("decompress", time.perf_counter() - start, 0)
+        return data
+
+    def close(self):
+        self.stream.close()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def timed_stream(stream, profile):
+    """开启计时时给数据流加上读取计时"""
+    if not profile.enabled:
+        return stream
+    profile.add("decompress", 0.0)
+    return _TimedStream(stream, profile)
+
+
+class ProfiledReader:
+    """压缩包句柄的包装：open() 得到的流计入 decompress 阶段，其余属性照旧"""
+
+    def __init__(self, reader, profile):
+        self.reader = reader
+        self.profile = profile
+
+    def open(self, file_info):
+        return timed_stream(self.reader.open(file_info), self.profile)
+
+    def __getattr__(self, name):
+        return getattr(self.reader, name)
+
+
+def run_with_cprofile(path, func, *args, **kwargs):
+    """在 cProfile 下执行 func，统计结果写到 path（用 python -m pstats path 查看）"""
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args, **kwargs)
+    finally:
+        profiler.dump_stats(path)
@@ -0,0 +1,119 @@
+"""
+进度与状态通道：工作线程只累加计数，界面线程按固定帧率读取并刷新
+
+工作线程从不直接操作界面控件。每处理一个成员只做两次整数加法；
+状态文字等事件放进 deque（append/popleft 线程安全，无需加锁）。
+界面线程调用 cancel() 后，工作线程在下一次 advance() 时抛出 ProcessCancelled。
+"""
+
+import time
+from collections import deque, namedtuple
+
+# 界面刷新帧率
+DEFAULT_FPS = 10
+
+ProgressSnapshot = namedtuple("ProgressSnapshot", [
+    "files", "total_files", "bytes", "total_bytes", "elapsed",
+    "files_per_sec", "bytes_per_sec", "eta", "percent"])
+
+
+class ProcessCancelled(BaseException):
+    """处理被取消（关闭窗口）
+
+    与 KeyboardInterrupt 一样继承 BaseException：逐个成员处理时的 except Exception
+    不会把它当成单个成员失败而继续，外层的 finally 照常关闭运行日志。
+    """
+
+
+class ProgressTracker:
+    """一次处理的进度计数
+
+    计数只由一个线程写入（处理线程），界面线程只读取。
+    """
+
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.total_files = 0
+        self.total_bytes = 0
+        self.started = None
+        self.finished = False
+        self.cancelled = False
+        self.events = deque()
+
+    def start(self, total_files, total_bytes=0):
+        """开始计时并设置总量"""
+        self.total_files = total_files
+        self.total_bytes = total_bytes
+        self.files = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def extend(self, files, nbytes=0):
+        """总量增加（批量处理时逐个压缩包加入）"""
+        self.total_files += files
+        self.total_bytes += nbytes
+
+    def advance(self, files=1, nbytes=0):
+        """完成 files 个成员，共 nbytes 字节；已取消时抛出 ProcessCancelled"""
+        if self.cancelled:
+            raise ProcessCancelled()
+        self.files += files
+        self.bytes += nbytes
+
+    def post(self, kind, *args):
+        """投递一个事件，由界面线程在下一帧处理"""
+        self.events.append((kind, args))
+
+    def status(self, text, detail="", icon="⚪"):
+        self.post("status", text, detail, icon)
+
+    def finish(self):
+        self.finished = True
+
+    def cancel(self):
+        """请求工作线程停止（由界面线程调用）"""
+        self.cancelled = True
+
+    def drain(self):
+        """取出目前积压的全部事件"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.popleft())
+            except IndexError:
+                return events
+
+    def snapshot(self):
+        """当前进度、速度和预计剩余时间"""
+        files, nbytes = self.files, self.bytes
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+
+        files_per_sec = files / elapsed if elapsed > 0 else 0.0
+        bytes_per_sec = nbytes / elapsed if elapsed > 0 else 0.0
+
+        # 有字节总量时按字节估算，更能反映大文件的耗时
+        if self.total_bytes and bytes_per_sec > 0:
+            eta = (self.total_bytes - nbytes) / bytes_per_sec
+            percent = nbytes / self.total_bytes * 100
+        elif self.total_files and files_per_sec > 0:
+            eta = (self.total_files - files) / files_per_sec
+            percent = files / self.total_files * 100
+        else:
+            eta = None
+            percent = 0.0
+
+        return ProgressSnapshot(files, self.total_files, nbytes, self.total_bytes, elapsed,
+                                files_per_sec, bytes_per_sec, eta, min(percent, 100.0))
+
+
+def format_duration(seconds):
+    """把秒数格式化成 1:02:03 / 2:03"""
+    if seconds is None:
+        return "--:--"
+    seconds = int(max(0, seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes}:{secs:02d}"
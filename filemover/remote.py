@@ -0,0 +1,272 @@
+"""
+远程压缩包：通过 HTTP Range 请求按需读取 http(s) 地址上的压缩包，不必先整个下载
+
+RemoteFile 对应一个地址，所有句柄共用按块缓存的数据；RangeReader 是可随机访问的
+只读文件对象，可以交给 zipfile、ZipMemberReader、tarfile 使用。连续读取时逐步加大预读，
+随机跳转（读取成员的本地文件头）时只取需要的块。预览只取结尾记录和中央目录，
+解压匹配的成员只取这些成员的数据。每个地址记录取回的字节数和请求次数。
+
+打开时用一次 bytes=0-0 的请求确认服务器支持 Range 并得到文件大小（预签名地址常常不允许 HEAD）；
+之后的请求带上 If-Match / If-Unmodified-Since，远程文件中途被替换时报错，不会拼出错乱的数据。
+"""
+
+import io
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import OrderedDict, namedtuple
+
+# 缓存块大小、每个地址缓存的字节数、连续读取时最多预读的字节数
+DEFAULT_BLOCK_SIZE = 64 * 1024
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+MAX_READ_AHEAD = 4 * 1024 * 1024
+
+# 请求超时（秒）、网络错误时的重试次数
+DEFAULT_TIMEOUT = 30
+RETRIES = 3
+
+# 同时保留多少个地址的缓存
+MAX_REMOTE_FILES = 8
+
+# 一个地址的读取统计：取回的字节数、请求次数、文件大小
+RemoteStats = namedtuple("RemoteStats", ["bytes_fetched", "requests", "size"])
+
+
+class RemoteError(OSError):
+    """远程压缩包无法按需读取（服务器不支持 Range、文件被替换、网络错误）"""
+
+
+def is_url(path):
+    """是否为 http(s) 地址"""
+    return path.startswith(("http://", "https://"))
+
+
+def url_path(url):
+    """地址中的路径部分（去掉查询参数，用于判断扩展名和命名输出）"""
+    return urllib.parse.unquote(urllib.parse.urlsplit(url).path)
+
+
+class RemoteFile:
+    """一个远程文件：大小、版本标识和按块缓存的数据，多个句柄和线程共用"""
+
+    def __init__(self, url, block_size=DEFAULT_BLOCK_SIZE, cache_bytes=DEFAULT_CACHE_BYTES,
+                 timeout=DEFAULT_TIMEOUT):
+        self.url = url
+        self.block_size = block_size
+        self.cache_blocks = max(1, cache_bytes // block_size)
+        self.max_ahead = max(0, MAX_READ_AHEAD // block_size - 1)
+        self.timeout = timeout
+        self.bytes_fetched = 0
+        self.requests = 0
+        # 块号 -> 数据，按最近使用排序
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = None
+        self.etag = None
+        self.last_modified = None
+        self._probe()
+
+    def _request(self, start, end, conditional=True):
+        """取回 [start, end] 字节（含两端），返回数据和响应头"""
+        headers = {"Range": f"bytes={start}-{end}", "Accept-Encoding": "identity"}
+        if conditional:
+            if self.etag:
+                headers["If-Match"] = self.etag
+            elif self.last_modified:
+                headers["If-Unmodified-Since"] = self.last_modified
+        request = urllib.request.Request(self.url, headers=headers)
+        for attempt in range(RETRIES + 1):
+            try:
+                with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                    if response.status != 206:
+                        raise RemoteError(f"服务器不支持 Range 请求: {self.url}")
+                    data = response.read()
+                    response_headers = response.headers
+                break
+            except urllib.error.HTTPError as e:
+                if e.code == 412:
+                    forget(self.url)
+                    raise RemoteError(f"远程文件已被替换: {self.url}")
+                if e.code < 500 or attempt == RETRIES:
+                    raise RemoteError(f"无法读取远程文件: HTTP {e.code} {self.url}")
+            except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+                if attempt == RETRIES:
+                    raise RemoteError(f"无法读取远程文件: {e}")
+            time.sleep(0.5 * 2 ** attempt)
+        if len(data) != end - start + 1:
+            raise RemoteError(f"远程文件返回的数据长度不对: {self.url}")
+        with self._lock:
+            self.bytes_fetched += len(data)
+            self.requests += 1
+        return data, response_headers
+
+    def _probe(self):
+        """确认服务器支持 Range，取得文件大小和版本标识"""
+        _, headers = self._request(0, 0, conditional=False)
+        content_range = headers.get("Content-Range", "")
+        try:
+            self.size = int(content_range.rsplit("/", 1)[1])
+        except (IndexError, ValueError):
+            raise RemoteError(f"服务器没有返回文件大小: {self.url}")
+        self.etag = headers.get("ETag")
+        # 弱 ETag 不能用于 If-Match
+        if self.etag and self.etag.startswith("W/"):
+            self.etag = None
+        self.last_modified = headers.get("Last-Modified")
+
+    @property
+    def key(self):
+        """缓存键：地址 + 大小 + 版本标识（与本地文件的 路径 + 大小 + 修改时间 对应）"""
+        return (self.url, self.size, self.etag or self.last_modified)
+
+    def stats(self):
+        with self._lock:
+            return RemoteStats(self.bytes_fetched, self.requests, self.size)
+
+    def _store(self, block, data):
+        self._blocks[block] = data
+        self._blocks.move_to_end(block)
+        while len(self._blocks) > self.cache_blocks:
+            self._blocks.popitem(last=False)
+
+    def read(self, start, end, ahead=0):
+        """读取 [start, end) 字节；缺少的块一次请求取回，最后一段再多取 ahead 块"""
+        block_size = self.block_size
+        first, last = start // block_size, (end - 1) // block_size
+        last_block = (self.size - 1) // block_size
+        with self._lock:
+            blocks = {}
+            for block in range(first, last + 1):
+                data = self._blocks.get(block)
+                if data is not None:
+                    self._blocks.move_to_end(block)
+                    blocks[block] = data
+
+        # 缺少的块按连续的段请求；预读接在最后一段后面，遇到已缓存的块为止
+        runs = []
+        block = first
+        while block <= last:
+            if block in blocks:
+                block += 1
+                continue
+            run_start = block
+            while block <= last and block not in blocks:
+                block += 1
+            runs.append([run_start, block - 1])
+        if runs and runs[-1][1] == last and ahead:
+            with self._lock:
+                limit = min(last_block, last + ahead)
+                while runs[-1][1] < limit and runs[-1][1] + 1 not in self._blocks:
+                    runs[-1][1] += 1
+
+        for run_start, run_end in runs:
+            data, _ = self._request(run_start * block_size,
+                                    min(self.size, (run_end + 1) * block_size) - 1)
+            with self._lock:
+                for k, block in enumerate(range(run_start, run_end + 1)):
+                    piece = data[k * block_size:(k + 1) * block_size]
+                    self._store(block, piece)
+                    if block <= last:
+                        blocks[block] = piece
+
+        joined = b"".join(blocks[block] for block in range(first, last + 1))
+        offset = start - first * block_size
+        return joined[offset:offset + end - start]
+
+
+class RangeReader(io.RawIOBase):
+    """远程文件的一个只读句柄：自己的读取位置和预读状态，数据缓存与其他句柄共用"""
+
+    def __init__(self, remote):
+        self.remote = remote
+        self.name = remote.url
+        self._pos = 0
+        # 上一次读取结束的位置和当前预读的块数；从结束处接着读时预读加倍，跳到别处时归零
+        self._last_end = None
+        self._ahead = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = self.remote.size + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+        if pos < 0:
+            raise ValueError(f"negative seek position {pos}")
+        self._pos = pos
+        return pos
+
+    def read(self, size=-1):
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        remote = self.remote
+        end = remote.size if size is None or size < 0 else min(remote.size, self._pos + size)
+        if self._pos >= end:
+            return b""
+        if self._pos == self._last_end:
+            self._ahead = min(max(1, self._ahead * 2), remote.max_ahead)
+        elif self._last_end is None or not 0 < self._pos - self._last_end <= remote.block_size:
+            # 跳过本地文件头中的文件名这样的短距离前移不算随机访问，预读保持不变
+            self._ahead = 0
+        data = remote.read(self._pos, end, self._ahead)
+        self._pos = self._last_end = end
+        return data
+
+    def readall(self):
+        return self.read()
+
+    def readinto(self, buffer):
+        data = self.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+_remote_files = OrderedDict()
+_remote_lock = threading.Lock()
+
+
+def remote_file(url):
+    """地址对应的 RemoteFile（同一地址共用，最近使用的 MAX_REMOTE_FILES 个保留缓存）"""
+    with _remote_lock:
+        remote = _remote_files.get(url)
+        if remote is not None:
+            _remote_files.move_to_end(url)
+            return remote
+    remote = RemoteFile(url)
+    with _remote_lock:
+        _remote_files[url] = remote
+        while len(_remote_files) > MAX_REMOTE_FILES:
+            _remote_files.popitem(last=False)
+    return remote
+
+
+def forget(url):
+    """丢弃地址的缓存（远程文件被替换后，下次打开重新确认大小和版本）"""
+    with _remote_lock:
+        _remote_files.pop(url, None)
+
+
+def open_url(url):
+    """以可随机访问的只读文件对象打开远程压缩包"""
+    return RangeReader(remote_file(url))
+
+
+def remote_stats(url):
+    """地址到目前为止的读取统计，没有打开过时返回 None"""
+    with _remote_lock:
+        remote = _remote_files.get(url)
+    return remote.stats() if remote is not None else None
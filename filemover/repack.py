@@ -0,0 +1,360 @@
+"""
+直接打包输出：匹配和未匹配的成员顺序写进两个新的压缩包，不在磁盘上写出单个文件
+
+来源和输出都是 ZIP 时原样复制每个成员的压缩数据（不解压、不重新压缩），
+大成员用 copy_file_range 在内核中复制；其余情况解压后写入（ZIP 输出用 deflate 压缩）。
+ZIP 写入器自带 ZIP64 支持：成员或偏移超过 2 GB、成员数超过 65535 时写 ZIP64 记录。
+"""
+
+import os
+import shutil
+import struct
+import tarfile
+import tempfile
+import time
+import zipfile
+import zlib
+
+from .extract import DEFAULT_CHUNK_SIZE, zipinfo_mode, zipinfo_mtime
+
+# 输出格式
+REPACK_ZIP = "zip"
+REPACK_TAR = "tar"
+REPACK_FORMATS = (REPACK_ZIP, REPACK_TAR)
+
+# 超过这些值时写 ZIP64 记录（与 zipfile 相同，按有符号 32 位取界限）
+ZIP64_LIMIT = (1 << 31) - 1
+ZIP_FILECOUNT_LIMIT = (1 << 16) - 1
+
+# 输出文件的写缓冲
+WRITE_BUFFER_BYTES = 1024 * 1024
+# 中央目录先在内存中累积，超过后转存到临时文件
+CENTRAL_SPOOL_BYTES = 16 * 1024 * 1024
+# 不小于这个大小的成员用 copy_file_range 复制
+COPY_RANGE_BYTES = 1024 * 1024
+
+# 写出的各种记录（与 index 中读取时的布局相同）
+_LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+_LOCAL_SIGNATURE = b"PK\003\004"
+_CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+_CENTRAL_SIGNATURE = b"PK\001\002"
+_END_RECORD = struct.Struct("<4s4H2LH")
+_END_SIGNATURE = b"PK\005\006"
+_ZIP64_LOCATOR = struct.Struct("<4sLQL")
+_ZIP64_LOCATOR_SIGNATURE = b"PK\006\007"
+_ZIP64_END = struct.Struct("<4sQ2H2L4Q")
+_ZIP64_END_SIGNATURE = b"PK\006\006"
+_EXTRA_HEADER = struct.Struct("<2H")
+_ZIP64_EXTRA = 0x0001
+_DATA_DESCRIPTOR = struct.Struct("<4sL2L")
+_DATA_DESCRIPTOR64 = struct.Struct("<4sL2Q")
+_DATA_DESCRIPTOR_SIGNATURE = b"PK\007\010"
+
+# 标志位：加密、大小记在数据描述符中、文件名为 UTF-8
+_FLAG_ENCRYPTED = 0x1
+_FLAG_DESCRIPTOR = 0x8
+_FLAG_UTF8 = 0x800
+
+_UNIX_SYSTEM = 3
+_ZIP64_VERSION = 45
+# 压缩方式 -> 解压需要的版本
+_METHOD_VERSIONS = {zipfile.ZIP_STORED: 20, zipfile.ZIP_DEFLATED: 20,
+                    zipfile.ZIP_BZIP2: 46, zipfile.ZIP_LZMA: 63}
+
+
+def _dos_date_time(mtime):
+    """时间戳 -> (日期 << 16 | 时间)，超出 ZIP 能表示的范围时取边界"""
+    t = time.localtime(time.time() if mtime is None else mtime)
+    if t.tm_year < 1980:
+        return (1 << 5 | 1) << 16
+    if t.tm_year > 2107:
+        return ((2107 - 1980) << 9 | 12 << 5 | 31) << 16 | 23 << 11 | 59 << 5 | 29
+    return ((t.tm_year - 1980) << 25 | t.tm_mon << 21 | t.tm_mday << 16 |
+            t.tm_hour << 11 | t.tm_min << 5 | t.tm_sec // 2)
+
+
+def _zip64_extra(values):
+    return _EXTRA_HEADER.pack(_ZIP64_EXTRA, 8 * len(values)) + struct.pack(f"<{len(values)}Q",
+                                                                           *values)
+
+
+def _strip_zip64(extra):
+    """去掉额外字段中的 ZIP64 记录（写入时按新的偏移和大小重新生成），不完整的尾部丢弃"""
+    kept = bytearray()
+    pos = 0
+    while pos + _EXTRA_HEADER.size <= len(extra):
+        tag, size = _EXTRA_HEADER.unpack_from(extra, pos)
+        end = pos + _EXTRA_HEADER.size + size
+        if end > len(extra):
+            break
+        if tag != _ZIP64_EXTRA:
+            kept += extra[pos:end]
+        pos = end
+    return bytes(kept)
+
+
+class _RepackWriter:
+    """先写到同目录下的 .part 文件，close() 时改名；出错时 abort() 删除"""
+
+    def __init__(self, path):
+        self.path = path
+        self.partial = f"{path}.{os.getpid()}.part"
+        self.fp = open(self.partial, 'wb', buffering=WRITE_BUFFER_BYTES)
+        self.count = 0
+
+    def _rollback(self, start):
+        """写到一半失败的成员从输出中截掉"""
+        self.fp.seek(start)
+        self.fp.truncate()
+
+    def _copy(self, src, count):
+        """从 src 的当前位置复制 count 字节到输出"""
+        remaining = count
+        while remaining > 0:
+            chunk = src.read(min(DEFAULT_CHUNK_SIZE, remaining))
+            if not chunk:
+                raise zipfile.BadZipFile("Truncated file data")
+            self.fp.write(chunk)
+            remaining -= len(chunk)
+
+    def _finish(self):
+        pass
+
+    def close(self):
+        try:
+            self._finish()
+            self.fp.close()
+        except BaseException:
+            self.abort()
+            raise
+        os.replace(self.partial, self.path)
+
+    def abort(self):
+        self.fp.close()
+        try:
+            os.remove(self.partial)
+        except OSError:
+            pass
+
+
+class ZipRepackWriter(_RepackWriter):
+    """顺序写出的 ZIP：来源是 ZIP 时原样复制压缩数据"""
+
+    def __init__(self, path, level=zlib.Z_DEFAULT_COMPRESSION):
+        super().__init__(path)
+        self.level = level
+        self.central = tempfile.SpooledTemporaryFile(max_size=CENTRAL_SPOOL_BYTES)
+        self._copy_range = hasattr(os, "copy_file_range")
+
+    def _copy(self, src, count):
+        if count >= COPY_RANGE_BYTES and self._copy_range and self._copy_file_range(src, count):
+            return
+        super()._copy(src, count)
+
+    def _copy_file_range(self, src, count):
+        """在内核中复制（Linux），不支持时返回 False 并改用读写"""
+        try:
+            src_fd = src.fileno()
+        except (OSError, AttributeError):
+            return False
+        self.fp.flush()
+        src_pos = src.tell()
+        dst_pos = self.fp.tell()
+        copied = 0
+        try:
+            while copied < count:
+                n = os.copy_file_range(src_fd, self.fp.fileno(), count - copied,
+                                       src_pos + copied)
+                if n == 0:
+                    raise zipfile.BadZipFile("Truncated file data")
+                copied += n
+        except OSError:
+            # 跨文件系统或内核不支持：以后都用读写复制
+            self._copy_range = False
+            self.fp.seek(dst_pos)
+            src.seek(src_pos)
+            return False
+        # 缓冲文件对象不知道内核中写入的数据，重新定位
+        self.fp.seek(dst_pos + count)
+        src.seek(src_pos + count)
+        return True
+
+    def _write_member(self, name, extra, flags, method, date_time, crc, compress_size,
+                      file_size, zip64):
+        """写本地文件头；返回本地文件头的偏移"""
+        offset = self.fp.tell()
+        if zip64:
+            extra = extra + _zip64_extra([file_size, compress_size])
+            sizes = (0xFFFFFFFF, 0xFFFFFFFF)
+        else:
+            sizes = (compress_size, file_size)
+        version = max(_METHOD_VERSIONS.get(method, 20), _ZIP64_VERSION if zip64 else 0)
+        self.fp.write(_LOCAL_HEADER.pack(_LOCAL_SIGNATURE, version, 0, flags, method,
+                                         date_time & 0xFFFF, date_time >> 16, crc, *sizes,
+                                         len(name), len(extra)))
+        self.fp.write(name)
+        self.fp.write(extra)
+        return offset
+
+    def _add_central(self, name, extra, flags, method, date_time, crc, compress_size, file_size,
+                     offset, external_attr, create_system):
+        values = []
+        fields = [compress_size, file_size, offset]
+        # ZIP64 额外字段中的顺序固定为 解压后大小、压缩后大小、偏移
+        for k in (1, 0, 2):
+            if fields[k] > ZIP64_LIMIT:
+                values.append(fields[k])
+                fields[k] = 0xFFFFFFFF
+        if values:
+            extra = extra + _zip64_extra(values)
+        version = max(_METHOD_VERSIONS.get(method, 20), _ZIP64_VERSION if values else 0)
+        self.central.write(_CENTRAL_HEADER.pack(
+            _CENTRAL_SIGNATURE, version, create_system, version, 0, flags, method,
+            date_time & 0xFFFF, date_time >> 16, crc, fields[0], fields[1], len(name), len(extra),
+            0, 0, 0, external_attr, fields[2]))
+        self.central.write(name)
+        self.central.write(extra)
+        self.count += 1
+
+    def _descriptor(self, crc, compress_size, file_size, zip64):
+        layout = _DATA_DESCRIPTOR64 if zip64 else _DATA_DESCRIPTOR
+        self.fp.write(layout.pack(_DATA_DESCRIPTOR_SIGNATURE, crc, compress_size, file_size))
+
+    def add_raw(self, reader, index, i):
+        """原样复制 ZIP 成员 i 的压缩数据，返回写入的字节数
+
+        reader 为来源压缩包的 ZipMemberReader，index 为其索引。
+        数据不解压，CRC 沿用中央目录中的值。
+        """
+        start = self.fp.tell()
+        try:
+            name = index.raw_name(i)
+            extra = _strip_zip64(reader.seek_raw(index.header_offsets[i]))
+            flags = index.flag_bits[i] & ~_FLAG_UTF8
+            if not name.isascii():
+                flags |= _FLAG_UTF8
+            # 加密的成员保留数据描述符标志（校验字节与它有关），其余的大小都写在本地文件头中
+            if not flags & _FLAG_ENCRYPTED:
+                flags &= ~_FLAG_DESCRIPTOR
+            method, date_time, crc = (index.compress_types[i], index.date_times[i],
+                                      index.crcs[i])
+            compress_size, file_size = index.compress_sizes[i], index.file_sizes[i]
+            zip64 = file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT
+            offset = self._write_member(name, extra, flags, method, date_time, crc,
+                                        compress_size, file_size, zip64)
+            self._copy(reader.fp, compress_size)
+            if flags & _FLAG_DESCRIPTOR:
+                self._descriptor(crc, compress_size, file_size, zip64)
+        except BaseException:
+            self._rollback(start)
+            raise
+        self._add_central(name, extra, flags, method, date_time, crc, compress_size, file_size,
+                          offset, index.external_attrs[i], index.create_systems[i])
+        return self.fp.tell() - start
+
+    def add_stream(self, name, stream, size, mtime=None, mode=None):
+        """用 deflate 压缩写入一个数据流（来源不是 ZIP 时），返回写入的字节数
+
+        压缩后的大小事先不知道，写在数据描述符中；size 只用来决定是否写 ZIP64 记录。
+        """
+        start = self.fp.tell()
+        try:
+            name = name.encode('utf-8', 'surrogateescape')
+            flags = _FLAG_DESCRIPTOR | (0 if name.isascii() else _FLAG_UTF8)
+            zip64 = size * 1.05 > ZIP64_LIMIT
+            date_time = _dos_date_time(mtime)
+            external_attr = (0o100000 | (mode if mode is not None else 0o644)) << 16
+            offset = self._write_member(name, b"", flags, zipfile.ZIP_DEFLATED, date_time, 0, 0,
+                                        0, zip64)
+            compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+            crc = file_size = compress_size = 0
+            while True:
+                chunk = stream.read(DEFAULT_CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                file_size += len(chunk)
+                data = compressor.compress(chunk)
+                compress_size += len(data)
+                self.fp.write(data)
+            data = compressor.flush()
+            compress_size += len(data)
+            self.fp.write(data)
+            if not zip64 and (file_size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT):
+                raise RuntimeError(f"成员大小超出预期: {name!r}")
+            self._descriptor(crc, compress_size, file_size, zip64)
+        except BaseException:
+            self._rollback(start)
+            raise
+        self._add_central(name, b"", flags, zipfile.ZIP_DEFLATED, date_time, crc, compress_size,
+                          file_size, offset, external_attr, _UNIX_SYSTEM)
+        return self.fp.tell() - start
+
+    def _finish(self):
+        """写中央目录和结尾记录"""
+        start = self.fp.tell()
+        size = self.central.tell()
+        self.central.seek(0)
+        shutil.copyfileobj(self.central, self.fp, DEFAULT_CHUNK_SIZE)
+        self.central.close()
+        count = self.count
+        if count > ZIP_FILECOUNT_LIMIT or start > ZIP64_LIMIT or size > ZIP64_LIMIT:
+            end64 = self.fp.tell()
+            self.fp.write(_ZIP64_END.pack(_ZIP64_END_SIGNATURE, _ZIP64_END.size - 12,
+                                          _ZIP64_VERSION, _ZIP64_VERSION, 0, 0, count, count,
+                                          size, start))
+            self.fp.write(_ZIP64_LOCATOR.pack(_ZIP64_LOCATOR_SIGNATURE, 0, end64, 1))
+            count = min(count, 0xFFFF)
+            size = min(size, 0xFFFFFFFF)
+            start = min(start, 0xFFFFFFFF)
+        self.fp.write(_END_RECORD.pack(_END_SIGNATURE, 0, 0, count, count, size, start, 0))
+
+    def abort(self):
+        self.central.close()
+        super().abort()
+
+
+class TarRepackWriter(_RepackWriter):
+    """顺序写出的 tar（不压缩，PAX 格式）；成员总要解压后写入
+
+    不用 tarfile.TarFile 写出，它为每个成员保留一个 TarInfo，成员很多时占用大量内存。
+    """
+
+    def add_raw(self, reader, index, i):
+        """解压 ZIP 成员 i 并写入，返回写入的字节数"""
+        file_info = index.zipinfo(i)
+        with reader.open(file_info) as stream:
+            return self.add_stream(file_info.filename, stream, file_info.file_size,
+                                   zipinfo_mtime(file_info), zipinfo_mode(file_info))
+
+    def add_stream(self, name, stream, size, mtime=None, mode=None):
+        """写入一个数据流，长度必须正好是 size，返回写入的字节数"""
+        start = self.fp.tell()
+        try:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = int(time.time() if mtime is None else mtime)
+            info.mode = mode if mode is not None else 0o644
+            self.fp.write(info.tobuf(tarfile.PAX_FORMAT, "utf-8", "surrogateescape"))
+            self._copy(stream, size)
+            padding = -size % tarfile.BLOCKSIZE
+            if padding:
+                self.fp.write(b"\0" * padding)
+        except BaseException:
+            self._rollback(start)
+            raise
+        self.count += 1
+        return self.fp.tell() - start
+
+    def _finish(self):
+        """两个空块作为结尾，并补齐到记录大小"""
+        end = self.fp.tell() + 2 * tarfile.BLOCKSIZE
+        self.fp.write(b"\0" * (2 * tarfile.BLOCKSIZE + -end % tarfile.RECORDSIZE))
+
+
+def open_repack_writer(path, fmt):
+    if fmt == REPACK_ZIP:
+        return ZipRepackWriter(path)
+    if fmt == REPACK_TAR:
+        return TarRepackWriter(path)
+    raise ValueError(f"未知的打包格式: {fmt}")
@@ -0,0 +1,275 @@
+"""
+监视文件夹：定时扫描投放目录，文件大小和修改时间稳定后把新的压缩包排队处理
+
+同时处理的压缩包数量有上限，其余按到达顺序排队。关键字和处理方式取自界面保存的配置
+（SimpleConfigManager 中的 processing.*），每个压缩包输出到以其文件名命名的子目录。
+已处理的压缩包（按路径、大小、修改时间识别）记在状态文件中，重启后不再处理；
+文件被替换成新版本时重新处理。每个压缩包记录从发现到输出完成的各段耗时。
+"""
+
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from .archives import is_archive
+from .batch import archive_output_dir
+from .content import MATCH_NAME
+from .dedup import DEDUP_OFF
+from .engine import UNMATCHED_EXTRACT, FileMoverEngine, ProcessOptions
+from .extract import EXTRACT_STREAM, EXTRACT_TEMP
+from .matcher import MATCH_SUBSTRING, KeywordMatcher, parse_keywords
+from .output import DURABILITY_NONE
+from .parallel import POOL_THREAD
+from .repack import REPACK_ZIP
+
+# 状态文件名（放在输出目录中）
+STATE_NAME = ".filemover_watch.json"
+
+# 默认扫描间隔、文件保持不变多久才算写完（秒）、同时处理的压缩包数量
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE = 5.0
+DEFAULT_CONCURRENCY = 1
+
+# 一个压缩包的处理结果和耗时（秒）：
+# waited 发现到稳定，queued 稳定到开始处理，processing 处理耗时，latency 发现到输出完成
+WatchResult = namedtuple("WatchResult", ["archive_path", "matched_count", "total_count",
+                                         "failed_count", "error", "waited", "queued",
+                                         "processing", "latency"])
+
+
+def matcher_from_config(config):
+    """界面保存的关键字和匹配方式，没有关键字时返回 None"""
+    keywords = parse_keywords(config.get("processing.keywords", ""))
+    if not keywords:
+        return None
+    return KeywordMatcher(keywords, config.get("processing.keyword_mode", MATCH_SUBSTRING))
+
+
+def options_from_config(config):
+    """界面保存的处理设置"""
+    extract_mode = (EXTRACT_STREAM if config.get("processing.streaming_extract", True)
+                    else EXTRACT_TEMP)
+    return ProcessOptions(config.get("processing.operation_mode", "move"), extract_mode,
+                          config.get("processing.workers", 1),
+                          config.get("processing.pool", POOL_THREAD),
+                          config.get("processing.unmatched", UNMATCHED_EXTRACT),
+                          incremental=config.get("processing.incremental", False),
+                          dedup=config.get("processing.dedup", DEDUP_OFF),
+                          nested=config.get("processing.nested", False),
+                          match_target=config.get("processing.match_target", MATCH_NAME),
+                          repack=REPACK_ZIP if config.get("processing.repack", False) else None,
+                          low_memory=config.get("processing.low_memory", False),
+                          durability=config.get("processing.durability", DURABILITY_NONE))
+
+
+def percentile(values, fraction):
+    """已排序列表的分位数（最近秩）"""
+    if not values:
+        return None
+    return values[min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))]
+
+
+class WatchState:
+    """已处理的压缩包：路径 -> {大小, 修改时间, 结果, 耗时}
+
+    只保留目录中仍然存在的压缩包，文件被取走后条目随之删除，状态文件不会越来越大。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self.done = json.load(f).get("done", {})
+        except (OSError, ValueError, AttributeError):
+            self.done = {}
+
+    def is_done(self, archive_path, size, mtime_ns):
+        record = self.done.get(archive_path)
+        return (record is not None and record["size"] == size and
+                record["mtime_ns"] == mtime_ns)
+
+    def record(self, archive_path, size, mtime_ns, result):
+        self.done[archive_path] = {"size": size, "mtime_ns": mtime_ns,
+                                   "finished": time.time(),
+                                   "matched": result.matched_count, "total": result.total_count,
+                                   "failed": result.failed_count, "error": result.error,
+                                   "latency": result.latency, "processing": result.processing}
+
+    def prune(self, present):
+        """删除已经不在目录中的压缩包，返回是否有变化"""
+        gone = [path for path in self.done if path not in present]
+        for path in gone:
+            del self.done[path]
+        return bool(gone)
+
+    def save(self):
+        """先写临时文件再改名，中断时不会留下半个状态文件"""
+        partial = self.path + ".part"
+        with open(partial, 'w', encoding='utf-8') as f:
+            json.dump({"done": self.done}, f, ensure_ascii=False, indent=1)
+        os.replace(partial, self.path)
+
+
+class _Pending:
+    """目录中出现、还没处理完的压缩包"""
+
+    def __init__(self, size, mtime_ns, now):
+        self.size = size
+        self.mtime_ns = mtime_ns
+        # 发现时间、最近一次大小或修改时间变化的时间、开始排队的时间
+        self.seen = now
+        self.changed = now
+        self.queued = None
+
+
+class FolderWatcher:
+    """监视一个目录，把写完的新压缩包交给处理引擎
+
+    on_result(WatchResult) 在处理线程中调用。
+    """
+
+    def __init__(self, directory, output_dir, matcher, options, concurrency=DEFAULT_CONCURRENCY,
+                 interval=DEFAULT_INTERVAL, settle=DEFAULT_SETTLE, state_path=None, engine=None,
+                 on_result=None):
+        self.directory = directory
+        self.output_dir = output_dir
+        self.matcher = matcher
+        self.options = options
+        self.concurrency = max(1, concurrency)
+        self.interval = interval
+        self.settle = settle
+        self.engine = engine if engine is not None else FileMoverEngine()
+        self.on_result = on_result
+        os.makedirs(output_dir, exist_ok=True)
+        self.state = WatchState(state_path or os.path.join(output_dir, STATE_NAME))
+        self.pending = {}
+        # 已稳定、等待处理的压缩包（按稳定的先后），以及正在处理的
+        self.ready = []
+        self.running = set()
+        self.results = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+
+    def scan(self):
+        """扫描一次目录，更新待处理的压缩包，返回目录中的压缩包路径集合"""
+        now = time.monotonic()
+        present = set()
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not is_archive(entry.name) or entry.name.endswith(".part"):
+                    continue
+                try:
+                    if not entry.is_file():
+                        continue
+                    st = entry.stat()
+                except OSError:
+                    continue
+                path = entry.path
+                present.add(path)
+                with self._lock:
+                    if path in self.running or self.state.is_done(path, st.st_size,
+                                                                  st.st_mtime_ns):
+                        continue
+                    item = self.pending.get(path)
+                    if item is None:
+                        item = self.pending[path] = _Pending(st.st_size, st.st_mtime_ns, now)
+                        # 修改时间已经足够久（启动前就在目录中的文件）的不必再等
+                        if time.time() - st.st_mtime >= self.settle:
+                            item.queued = now
+                            self.ready.append(path)
+                    elif (item.size, item.mtime_ns) != (st.st_size, st.st_mtime_ns):
+                        # 还在写入：重新计时（已排队的撤回）
+                        item.size, item.mtime_ns, item.changed = st.st_size, st.st_mtime_ns, now
+                        if item.queued is not None:
+                            item.queued = None
+                            self.ready.remove(path)
+                    elif item.queued is None and now - item.changed >= self.settle:
+                        item.queued = now
+                        self.ready.append(path)
+
+        with self._lock:
+            for path in [p for p in self.pending if p not in present and p not in self.running]:
+                item = self.pending.pop(path)
+                if item.queued is not None:
+                    self.ready.remove(path)
+            if self.state.prune(present):
+                self.state.save()
+        return present
+
+    def _take(self):
+        """取出下一个可以开始处理的压缩包（正在处理的数量未满时）"""
+        with self._lock:
+            if not self.ready or len(self.running) >= self.concurrency:
+                return None
+            path = self.ready.pop(0)
+            self.running.add(path)
+            return path, self.pending[path]
+
+    def _process(self, path, item):
+        started = time.monotonic()
+        matched = total = failed = 0
+        error = None
+        try:
+            result = self.engine.process(path, self.matcher,
+                                         archive_output_dir(self.output_dir, path), self.options)
+            matched, total, failed = result.matched_count, result.total_count, result.failed_count
+        except Exception as e:
+            # 任何错误都只记在这个压缩包上，监视继续
+            error = str(e)
+        finished = time.monotonic()
+        result = WatchResult(path, matched, total, failed, error, item.queued - item.seen,
+                             started - item.queued, finished - started, finished - item.seen)
+        with self._lock:
+            self.running.discard(path)
+            self.pending.pop(path, None)
+            # 处理期间文件又变了就不记为完成，下次扫描时重新处理
+            try:
+                st = os.stat(path)
+                if (st.st_size, st.st_mtime_ns) == (item.size, item.mtime_ns):
+                    self.state.record(path, item.size, item.mtime_ns, result)
+                    self.state.save()
+            except OSError:
+                pass
+            self.results.append(result)
+        if self.on_result is not None:
+            self.on_result(result)
+        self._wake.set()
+
+    def idle(self):
+        """没有等待稳定、排队或正在处理的压缩包"""
+        with self._lock:
+            return not self.pending and not self.running
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def run(self, once=False):
+        """扫描并处理，直到 stop()；once 为真时目录中现有的压缩包都处理完就返回"""
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            while not self._stop.is_set():
+                self.scan()
+                while True:
+                    job = self._take()
+                    if job is None:
+                        break
+                    executor.submit(self._process, *job)
+                if once and self.idle():
+                    break
+                self._wake.wait(self.interval)
+                self._wake.clear()
+        return self.results
+
+    def latency_summary(self):
+        """已处理的压缩包从发现到输出完成的耗时：(数量, 中位数, p95, 最大值)"""
+        with self._lock:
+            latencies = sorted(r.latency for r in self.results)
+        if not latencies:
+            return 0, None, None, None
+        return (len(latencies), percentile(latencies, 0.5), percentile(latencies, 0.95),
+                latencies[-1])
@@ -6,55 +6,34 @@ FileMover
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import threading
+import multiprocessing
 import os
 import subprocess
 import platform
-import zipfile
-import shutil
-import tempfile
-import json
-
-
-class SimpleConfigManager:
-    """简化的配置管理器"""
-    def __init__(self):
-        self.config_file = "config.json"
-        self.config = {}
-        self.load()
-    
-    def load(self):
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    self.config = json.load(f)
-        except:
-            self.config = {}
-    
-    def save(self):
-        try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
-        except:
-            pass
-    
-    def get(self, key, default=None):
-        keys = key.split('.')
-        value = self.config
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return default
-        return value
-    
-    def set(self, key, value):
-        keys = key.split('.')
-        config = self.config
-        for k in keys[:-1]:
-            if k not in config:
-                config[k] = {}
-            config = config[k]
-        config[keys[-1]] = value
+
+from filemover.config import SimpleConfigManager
+from filemover.content import MATCH_ANY, MATCH_CONTENT, MATCH_NAME
+from filemover.dedup import DEDUP_LINK, DEDUP_MANIFEST, DEDUP_OFF
+from filemover.engine import (UNDECIDED, UNMATCHED_EXTRACT, UNMATCHED_MANIFEST, UNMATCHED_SKIP,
+                              FileMoverEngine, ProcessOptions, default_output_dir)
+from filemover.extract import EXTRACT_STREAM, EXTRACT_TEMP
+from filemover.index import DEFAULT_CACHE_BYTES, ArchiveIndexCache
+from filemover.listing import VIEW_ALL, VIEW_MATCHED, VIEW_UNMATCHED, PreviewListing
+from filemover.matcher import MATCH_REGEX, MATCH_SUBSTRING, KeywordMatcher, parse_keywords
+from filemover.output import DURABILITY_BATCH, DURABILITY_FILE, DURABILITY_NONE
+from filemover.parallel import POOL_PROCESS, POOL_THREAD
+from filemover.planner import RESERVE_BYTES
+from filemover.profiling import PROFILE_NAME, RunProfile
+from filemover.progress import DEFAULT_FPS, ProcessCancelled, ProgressTracker, format_duration
+from filemover.remote import is_url
+from filemover.repack import REPACK_ZIP
+
+# 预览列表可见的行数：Treeview 只有这么多行，滚动时替换各行的内容
+LISTING_ROWS = 12
+# 输入关键字后停顿这么久（毫秒）再重新筛选预览列表
+LISTING_DEBOUNCE_MS = 200
+# 关闭窗口时最多等处理线程停下这么久（秒）
+PROCESS_STOP_TIMEOUT = 10
 
 
 class ModernFileFilterApp:
@@ -69,6 +48,23 @@ class ModernFileFilterApp:
         
         # 初始化配置管理器
         self.config_manager = SimpleConfigManager()
+
+        # 压缩包索引缓存：预览和处理共用，压缩包不变时不再重复解析
+        cache_mb = self.config_manager.get("processing.index_cache_mb",
+                                           DEFAULT_CACHE_BYTES // (1024 * 1024))
+        self.index_cache = ArchiveIndexCache(cache_mb * 1024 * 1024)
+        self.engine = FileMoverEngine(self.index_cache)
+
+        # 预览列表：后台读取和分类，界面只显示可见的一页
+        self.listing = None
+        self.listing_top = 0
+        self.listing_polling = None
+        self.listing_after = None
+
+        # 正在进行的处理：关闭窗口时先让它停下并关闭运行日志
+        self.processing = None
+        # 正在进行的预览（后台线程），同一时间只预览一次
+        self.previewing = None
         
         # 创建现代化界面
         self.setup_ui()
@@ -277,6 +273,9 @@ class ModernFileFilterApp:
         keyword_content = self.create_modern_card(parent, "关键字设置", "🔍")
         self.setup_keyword_input(keyword_content)
 
+        listing_content = self.create_modern_card(parent, "预览列表", "📋")
+        self.setup_listing(listing_content)
+
     def setup_right_panel(self, parent):
         """设置右侧面板"""
         mode_content = self.create_modern_card(parent, "操作模式", "⚙️")
@@ -291,6 +290,8 @@ class ModernFileFilterApp:
         input_frame, self.archive_entry = self.create_modern_input(
             parent, "请选择压缩包文件...")
         input_frame.pack(fill='x', pady=(0, 15))
+        # 也可以直接输入路径或 http(s) 地址后回车
+        self.archive_entry.bind("<Return>", self.on_archive_entered)
 
         # 浏览按钮
         browse_frame, browse_btn = self.create_modern_button(
@@ -346,6 +347,11 @@ class ModernFileFilterApp:
 
         self.keyword_text.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
+        # 上次保存的关键字（监视文件夹也使用这份关键字）
+        saved_keywords = self.config_manager.get("processing.keywords", "")
+        if saved_keywords:
+            self.keyword_text.insert(1.0, saved_keywords)
+        self.keyword_text.bind("<KeyRelease>", self.on_keywords_changed)
 
         button_container = tk.Frame(parent, bg=self.colors['bg_card'])
         button_container.pack(fill='x')
@@ -354,14 +360,219 @@ class ModernFileFilterApp:
             button_container, "🗑️ 清空", self.clear_keywords, "warning", width=10)
         clear_frame.pack(side='left')
 
+        self.regex_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.keyword_mode", MATCH_SUBSTRING) == MATCH_REGEX)
+        regex_check = tk.Checkbutton(button_container,
+                                   text="使用正则表达式",
+                                   variable=self.regex_var,
+                                   command=self.on_regex_changed,
+                                   font=('Microsoft YaHei UI', 10),
+                                   fg=self.colors['text_primary'],
+                                   bg=self.colors['bg_card'],
+                                   selectcolor=self.colors['bg_secondary'],
+                                   activebackground=self.colors['bg_card'],
+                                   activeforeground=self.colors['text_primary'])
+        regex_check.pack(side='left', padx=(15, 0))
+
+    def on_regex_changed(self):
+        """保存关键字匹配方式"""
+        self.config_manager.set("processing.keyword_mode", self.keyword_mode())
+        self.config_manager.save()
+        self.on_keywords_changed()
+
+    def keyword_mode(self):
+        """当前的关键字匹配方式"""
+        return MATCH_REGEX if self.regex_var.get() else MATCH_SUBSTRING
+
+    def setup_listing(self, parent):
+        """设置预览列表：只创建可见的几行，滚动时替换内容，百万个成员也能流畅滚动"""
+        view_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        view_frame.pack(fill='x', pady=(0, 10))
+
+        self.listing_view_var = tk.StringVar(value=VIEW_ALL)
+        for value, text in [(VIEW_ALL, "全部"), (VIEW_MATCHED, "匹配"), (VIEW_UNMATCHED, "未匹配")]:
+            tk.Radiobutton(view_frame,
+                           text=text,
+                           variable=self.listing_view_var,
+                           value=value,
+                           command=self.on_listing_view_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+        self.listing_info = tk.Label(view_frame,
+                                   text="选择压缩包后显示成员列表",
+                                   font=('Microsoft YaHei UI', 9),
+                                   fg=self.colors['text_secondary'],
+                                   bg=self.colors['bg_card'])
+        self.listing_info.pack(side='right')
+
+        tree_container = tk.Frame(parent, bg=self.colors['bg_card'])
+        tree_container.pack(fill='both', expand=True)
+
+        style = ttk.Style()
+        style.configure("Listing.Treeview",
+                        background=self.colors['input_bg'],
+                        fieldbackground=self.colors['input_bg'],
+                        foreground=self.colors['text_primary'],
+                        font=('Microsoft YaHei UI', 9))
+        style.configure("Listing.Treeview.Heading",
+                        background=self.colors['bg_secondary'],
+                        foreground=self.colors['text_primary'],
+                        font=('Microsoft YaHei UI', 9, 'bold'))
+
+        columns = [("name", "压缩包内路径", 260), ("state", "状态", 70),
+                   ("size", "大小", 80), ("target", "目标路径", 260)]
+        self.listing_tree = ttk.Treeview(tree_container,
+                                         columns=[c[0] for c in columns],
+                                         show='headings',
+                                         height=LISTING_ROWS,
+                                         selectmode='browse',
+                                         style="Listing.Treeview")
+        for column, text, width in columns:
+            self.listing_tree.heading(column, text=text, anchor='w')
+            self.listing_tree.column(column, width=width, anchor='e' if column == "size" else 'w')
+        # 固定的几行，内容随滚动位置替换
+        for row in range(LISTING_ROWS):
+            self.listing_tree.insert('', 'end', iid=f"row{row}", values=("", "", "", ""))
+
+        self.listing_scrollbar = tk.Scrollbar(tree_container,
+                                            orient=tk.VERTICAL,
+                                            command=self.on_listing_scroll,
+                                            bg=self.colors['bg_card'],
+                                            troughcolor=self.colors['input_bg'],
+                                            activebackground=self.colors['accent'])
+        self.listing_tree.pack(side='left', fill='both', expand=True)
+        self.listing_scrollbar.pack(side='right', fill='y')
+
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.listing_tree.bind(sequence, self.on_listing_wheel)
+
+    def listing_matcher(self):
+        """预览列表用的关键字；正则表达式还没输入完整时返回 None"""
+        try:
+            return KeywordMatcher(parse_keywords(self.keyword_text.get(1.0, tk.END)),
+                                  self.keyword_mode())
+        except ValueError:
+            return None
+
+    def open_listing(self, archive_path):
+        """在后台读取压缩包的成员列表，已经读到的部分立即可以滚动查看"""
+        if self.listing is not None:
+            self.listing.close()
+        self.listing = PreviewListing(archive_path, default_output_dir(),
+                                      self.unmatched_var.get(), self.match_target_var.get(),
+                                      self.index_cache)
+        self.listing_top = 0
+        self.listing.start(self.listing_matcher() or KeywordMatcher([]))
+        self.watch_listing()
+
+    def reopen_listing(self):
+        """去向的规则变化后重新建立预览列表（索引已经在缓存中时不再读取）"""
+        if self.listing is not None:
+            self.open_listing(self.listing.archive_path)
+
+    def on_keywords_changed(self, event=None):
+        """关键字变化后稍等片刻再筛选，连续输入时只筛选一次"""
+        if self.listing_after is not None:
+            self.root.after_cancel(self.listing_after)
+        self.listing_after = self.root.after(LISTING_DEBOUNCE_MS, self.refilter_listing)
+
+    def refilter_listing(self):
+        self.listing_after = None
+        matcher = self.listing_matcher()
+        if self.listing is not None and matcher is not None:
+            self.listing.set_matcher(matcher)
+            self.watch_listing()
+
+    def watch_listing(self):
+        """后台还在读取或分类时按固定帧率刷新预览列表"""
+        if self.listing_polling is not self.listing:
+            self.listing_polling = self.listing
+            self.poll_listing(self.listing)
+
+    def poll_listing(self, listing):
+        if listing is not self.listing:
+            return
+        status = listing.status()
+        self.render_listing()
+        if status.error:
+            self.listing_info.config(text=f"读取失败: {status.error}")
+        else:
+            info = f"{status.loaded} 个成员 · 匹配 {status.matched_count}"
+            if not status.done:
+                info += f" · 已分类 {status.classified}…"
+            self.listing_info.config(text=info)
+        if status.done or status.error:
+            self.listing_polling = None
+            return
+        self.root.after(1000 // DEFAULT_FPS, lambda: self.poll_listing(listing))
+
+    def listing_state(self, flag):
+        if flag == 1:
+            return "✅ 匹配"
+        if flag == 0:
+            return "未匹配"
+        if flag == UNDECIDED:
+            return "按内容"
+        return ""
+
+    def render_listing(self):
+        """只取可见的一页填进固定的几行"""
+        view = self.listing_view_var.get()
+        count = self.listing.count(view) if self.listing is not None else 0
+        self.listing_top = max(0, min(self.listing_top, count - LISTING_ROWS))
+        rows = self.listing.rows(view, self.listing_top, LISTING_ROWS) if count else []
+        for k in range(LISTING_ROWS):
+            values = ("", "", "", "")
+            if k < len(rows):
+                row = rows[k]
+                values = (row.name, self.listing_state(row.matched),
+                          self.format_file_size(row.size),
+                          "…" if row.target is None else row.target)
+            self.listing_tree.item(f"row{k}", values=values)
+        if count:
+            self.listing_scrollbar.set(self.listing_top / count,
+                                       min(1.0, (self.listing_top + LISTING_ROWS) / count))
+        else:
+            self.listing_scrollbar.set(0.0, 1.0)
+
+    def scroll_listing(self, top):
+        self.listing_top = top
+        self.render_listing()
+
+    def on_listing_scroll(self, *args):
+        """滚动条：拖动时按比例定位，点击箭头或空白处按行或按页移动"""
+        if self.listing is None:
+            return
+        if args[0] == "moveto":
+            self.scroll_listing(int(float(args[1]) * self.listing.count(self.listing_view_var.get())))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (LISTING_ROWS if args[2] == "pages" else 1)
+            self.scroll_listing(self.listing_top + step)
+
+    def on_listing_wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self.scroll_listing(self.listing_top - 3)
+        else:
+            self.scroll_listing(self.listing_top + 3)
+        return "break"
+
+    def on_listing_view_changed(self):
+        self.scroll_listing(0)
+
     def setup_operation_mode(self, parent):
         """设置操作模式区域"""
-        self.operation_var = tk.StringVar(value="move")
+        self.operation_var = tk.StringVar(
+            value=self.config_manager.get("processing.operation_mode", "move"))
 
         modes = [
             ("move", "📁 移动文件", "将匹配的文件移动到目标文件夹"),
             ("copy", "📋 复制文件", "将匹配的文件复制到目标文件夹"),
-            ("link", "🔗 创建链接", "为匹配的文件创建快捷方式")
+            ("link", "🔗 创建链接", "解压一次到内容库，再用硬链接放到目标文件夹，不占额外空间")
         ]
 
         for value, text, desc in modes:
@@ -381,6 +592,7 @@ class ModernFileFilterApp:
                                  fg=self.colors['accent'],
                                  selectcolor=self.colors['accent'],
                                  activebackground=self.colors['bg_secondary'],
+                                 command=self.on_operation_changed,
                                  font=('Microsoft YaHei UI', 12))
             radio.pack(side='left')
 
@@ -402,11 +614,323 @@ class ModernFileFilterApp:
             desc_label.pack(anchor='w')
 
             def make_click_handler(v):
-                return lambda e: self.operation_var.set(v)
+                def handler(e):
+                    self.operation_var.set(v)
+                    self.on_operation_changed()
+                return handler
 
             for widget in [mode_container, content_frame, title_label, desc_label]:
                 widget.bind("<Button-1>", make_click_handler(value))
 
+        # 解压方式：流式解压直接写入目标文件夹，不经过临时目录
+        self.streaming_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.streaming_extract", True))
+
+        streaming_check = tk.Checkbutton(parent,
+                                       text="⚡ 流式解压（直接写入目标文件夹，不经过临时目录）",
+                                       variable=self.streaming_var,
+                                       command=self.on_streaming_changed,
+                                       font=('Microsoft YaHei UI', 10),
+                                       fg=self.colors['text_primary'],
+                                       bg=self.colors['bg_card'],
+                                       selectcolor=self.colors['bg_secondary'],
+                                       activebackground=self.colors['bg_card'],
+                                       activeforeground=self.colors['text_primary'])
+        streaming_check.pack(anchor='w', pady=(5, 0))
+
+        # 增量处理：重新处理同一压缩包的新版本时，只解压新增或有变化的文件
+        self.incremental_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.incremental", False))
+
+        incremental_check = tk.Checkbutton(parent,
+                                         text="♻️ 增量处理（输出文件夹中未变化的文件不再解压）",
+                                         variable=self.incremental_var,
+                                         command=self.on_incremental_changed,
+                                         font=('Microsoft YaHei UI', 10),
+                                         fg=self.colors['text_primary'],
+                                         bg=self.colors['bg_card'],
+                                         selectcolor=self.colors['bg_secondary'],
+                                         activebackground=self.colors['bg_card'],
+                                         activeforeground=self.colors['text_primary'])
+        incremental_check.pack(anchor='w', pady=(5, 0))
+
+        # 嵌套压缩包：成员中的 .zip 等压缩包继续解压，不用再手动解压第二遍
+        self.nested_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.nested", False))
+
+        nested_check = tk.Checkbutton(parent,
+                                    text="📦 解压嵌套的压缩包（按 外层/内层.zip/文件 路径匹配）",
+                                    variable=self.nested_var,
+                                    command=self.on_nested_changed,
+                                    font=('Microsoft YaHei UI', 10),
+                                    fg=self.colors['text_primary'],
+                                    bg=self.colors['bg_card'],
+                                    selectcolor=self.colors['bg_secondary'],
+                                    activebackground=self.colors['bg_card'],
+                                    activeforeground=self.colors['text_primary'])
+        nested_check.pack(anchor='w', pady=(5, 0))
+
+        # 直接打包输出：匹配/未匹配的文件直接写成两个 ZIP，省去解压后再压缩的一遍
+        self.repack_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.repack", False))
+
+        repack_check = tk.Checkbutton(parent,
+                                    text="🗜️ 直接打包输出（写成 匹配文件.zip / 未匹配文件.zip，不写出单个文件）",
+                                    variable=self.repack_var,
+                                    command=self.on_repack_changed,
+                                    font=('Microsoft YaHei UI', 10),
+                                    fg=self.colors['text_primary'],
+                                    bg=self.colors['bg_card'],
+                                    selectcolor=self.colors['bg_secondary'],
+                                    activebackground=self.colors['bg_card'],
+                                    activeforeground=self.colors['text_primary'])
+        repack_check.pack(anchor='w', pady=(5, 0))
+
+        # 省内存模式：成员数以百万计的 ZIP 逐块读取中央目录，读一块处理一块
+        self.low_memory_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.low_memory", False))
+
+        low_memory_check = tk.Checkbutton(parent,
+                                        text="🪶 省内存模式（适合上百万个文件的压缩包，逐个解压）",
+                                        variable=self.low_memory_var,
+                                        command=self.on_low_memory_changed,
+                                        font=('Microsoft YaHei UI', 10),
+                                        fg=self.colors['text_primary'],
+                                        bg=self.colors['bg_card'],
+                                        selectcolor=self.colors['bg_secondary'],
+                                        activebackground=self.colors['bg_card'],
+                                        activeforeground=self.colors['text_primary'])
+        low_memory_check.pack(anchor='w', pady=(5, 0))
+
+        # 分阶段计时：处理完成后在输出文件夹中写一份各阶段耗时和最慢的文件
+        self.profile_var = tk.BooleanVar(
+            value=self.config_manager.get("processing.profile", False))
+
+        profile_check = tk.Checkbutton(parent,
+                                     text=f"📈 记录各阶段耗时（写到输出文件夹的 {PROFILE_NAME}）",
+                                     variable=self.profile_var,
+                                     command=self.on_profile_changed,
+                                     font=('Microsoft YaHei UI', 10),
+                                     fg=self.colors['text_primary'],
+                                     bg=self.colors['bg_card'],
+                                     selectcolor=self.colors['bg_secondary'],
+                                     activebackground=self.colors['bg_card'],
+                                     activeforeground=self.colors['text_primary'])
+        profile_check.pack(anchor='w', pady=(5, 0))
+
+        # 并行解压：工作者数量为 1 时按原来的方式逐个处理
+        parallel_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        parallel_frame.pack(fill='x', pady=(10, 0))
+
+        tk.Label(parallel_frame,
+                 text="🧵 并行解压工作者数：",
+                 font=('Microsoft YaHei UI', 10),
+                 fg=self.colors['text_primary'],
+                 bg=self.colors['bg_card']).pack(side='left')
+
+        self.workers_var = tk.IntVar(value=self.config_manager.get("processing.workers", 1))
+        workers_spin = tk.Spinbox(parallel_frame,
+                                  from_=1,
+                                  to=64,
+                                  width=4,
+                                  textvariable=self.workers_var,
+                                  command=self.on_parallel_changed,
+                                  font=('Microsoft YaHei UI', 10),
+                                  bg=self.colors['input_bg'],
+                                  fg=self.colors['text_primary'],
+                                  buttonbackground=self.colors['bg_secondary'],
+                                  relief='flat')
+        workers_spin.pack(side='left', padx=(5, 15))
+
+        self.pool_var = tk.StringVar(value=self.config_manager.get("processing.pool", POOL_THREAD))
+        for value, text in [(POOL_THREAD, "线程池"), (POOL_PROCESS, "进程池")]:
+            tk.Radiobutton(parallel_frame,
+                           text=text,
+                           variable=self.pool_var,
+                           value=value,
+                           command=self.on_parallel_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+        # 未匹配文件：照常解压、跳过，或只写清单（跳过时只看中央目录，不解压）
+        unmatched_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        unmatched_frame.pack(fill='x', pady=(10, 0))
+
+        tk.Label(unmatched_frame,
+                 text="📄 未匹配文件：",
+                 font=('Microsoft YaHei UI', 10),
+                 fg=self.colors['text_primary'],
+                 bg=self.colors['bg_card']).pack(side='left')
+
+        self.unmatched_var = tk.StringVar(
+            value=self.config_manager.get("processing.unmatched", UNMATCHED_EXTRACT))
+        for value, text in [(UNMATCHED_EXTRACT, "解压"), (UNMATCHED_SKIP, "跳过"),
+                            (UNMATCHED_MANIFEST, "只写清单")]:
+            tk.Radiobutton(unmatched_frame,
+                           text=text,
+                           variable=self.unmatched_var,
+                           value=value,
+                           command=self.on_unmatched_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+        # 重复文件：内容相同的文件只解压一次，其余做成硬链接或只写清单
+        dedup_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        dedup_frame.pack(fill='x', pady=(10, 0))
+
+        tk.Label(dedup_frame,
+                 text="🧬 重复文件：",
+                 font=('Microsoft YaHei UI', 10),
+                 fg=self.colors['text_primary'],
+                 bg=self.colors['bg_card']).pack(side='left')
+
+        self.dedup_var = tk.StringVar(value=self.config_manager.get("processing.dedup", DEDUP_OFF))
+        for value, text in [(DEDUP_OFF, "照常解压"), (DEDUP_LINK, "硬链接"),
+                            (DEDUP_MANIFEST, "只写清单")]:
+            tk.Radiobutton(dedup_frame,
+                           text=text,
+                           variable=self.dedup_var,
+                           value=value,
+                           command=self.on_dedup_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+        # 写入持久性：断电后已完成的文件是否一定在磁盘上（fsync 越频繁越慢）
+        durability_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        durability_frame.pack(fill='x', pady=(10, 0))
+
+        tk.Label(durability_frame,
+                 text="💾 写入持久性：",
+                 font=('Microsoft YaHei UI', 10),
+                 fg=self.colors['text_primary'],
+                 bg=self.colors['bg_card']).pack(side='left')
+
+        self.durability_var = tk.StringVar(
+            value=self.config_manager.get("processing.durability", DURABILITY_NONE))
+        for value, text in [(DURABILITY_NONE, "交给系统"), (DURABILITY_BATCH, "分批同步"),
+                            (DURABILITY_FILE, "逐个同步")]:
+            tk.Radiobutton(durability_frame,
+                           text=text,
+                           variable=self.durability_var,
+                           value=value,
+                           command=self.on_durability_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+        # 匹配范围：除文件名外，也可以按文件内容（如日志中的订单号）决定去向
+        match_frame = tk.Frame(parent, bg=self.colors['bg_card'])
+        match_frame.pack(fill='x', pady=(10, 0))
+
+        tk.Label(match_frame,
+                 text="🔍 匹配范围：",
+                 font=('Microsoft YaHei UI', 10),
+                 fg=self.colors['text_primary'],
+                 bg=self.colors['bg_card']).pack(side='left')
+
+        self.match_target_var = tk.StringVar(
+            value=self.config_manager.get("processing.match_target", MATCH_NAME))
+        for value, text in [(MATCH_NAME, "文件名"), (MATCH_CONTENT, "文件内容"),
+                            (MATCH_ANY, "文件名或内容")]:
+            tk.Radiobutton(match_frame,
+                           text=text,
+                           variable=self.match_target_var,
+                           value=value,
+                           command=self.on_match_target_changed,
+                           font=('Microsoft YaHei UI', 10),
+                           fg=self.colors['text_primary'],
+                           bg=self.colors['bg_card'],
+                           selectcolor=self.colors['bg_secondary'],
+                           activebackground=self.colors['bg_card'],
+                           activeforeground=self.colors['text_primary']).pack(side='left')
+
+    def on_operation_changed(self):
+        """保存操作模式"""
+        self.config_manager.set("processing.operation_mode", self.operation_var.get())
+        self.config_manager.save()
+
+    def save_keywords(self):
+        """保存关键字，下次启动和监视文件夹使用"""
+        self.config_manager.set("processing.keywords",
+                                self.keyword_text.get(1.0, tk.END).strip())
+        self.config_manager.save()
+
+    def on_match_target_changed(self):
+        """保存匹配范围"""
+        self.config_manager.set("processing.match_target", self.match_target_var.get())
+        self.config_manager.save()
+        self.reopen_listing()
+
+    def on_dedup_changed(self):
+        """保存重复文件的处理方式"""
+        self.config_manager.set("processing.dedup", self.dedup_var.get())
+        self.config_manager.save()
+
+    def on_durability_changed(self):
+        """保存写入持久性"""
+        self.config_manager.set("processing.durability", self.durability_var.get())
+        self.config_manager.save()
+
+    def on_unmatched_changed(self):
+        """保存未匹配文件的处理方式"""
+        self.config_manager.set("processing.unmatched", self.unmatched_var.get())
+        self.config_manager.save()
+        self.reopen_listing()
+
+    def on_parallel_changed(self):
+        """保存并行解压设置"""
+        try:
+            self.config_manager.set("processing.workers", self.workers_var.get())
+        except tk.TclError:
+            return
+        self.config_manager.set("processing.pool", self.pool_var.get())
+        self.config_manager.save()
+
+    def on_streaming_changed(self):
+        """保存解压方式"""
+        self.config_manager.set("processing.streaming_extract", self.streaming_var.get())
+        self.config_manager.save()
+
+    def on_incremental_changed(self):
+        """保存增量处理设置"""
+        self.config_manager.set("processing.incremental", self.incremental_var.get())
+        self.config_manager.save()
+
+    def on_nested_changed(self):
+        """保存嵌套压缩包设置"""
+        self.config_manager.set("processing.nested", self.nested_var.get())
+        self.config_manager.save()
+
+    def on_repack_changed(self):
+        """保存直接打包输出设置"""
+        self.config_manager.set("processing.repack", self.repack_var.get())
+        self.config_manager.save()
+
+    def on_low_memory_changed(self):
+        """保存省内存模式设置"""
+        self.config_manager.set("processing.low_memory", self.low_memory_var.get())
+        self.config_manager.save()
+
+    def on_profile_changed(self):
+        """保存分阶段计时设置"""
+        self.config_manager.set("processing.profile", self.profile_var.get())
+        self.config_manager.save()
+
     def setup_status_display(self, parent):
         """设置状态显示区域"""
         status_frame = tk.Frame(parent, bg=self.colors['bg_card'])
@@ -467,10 +991,11 @@ class ModernFileFilterApp:
             title="选择压缩包文件",
             initialdir=last_dir,
             filetypes=[
-                ("压缩包文件", "*.zip;*.rar;*.7z"),
+                ("压缩包文件", "*.zip;*.rar;*.7z;*.tar;*.tar.gz;*.tgz;*.tar.bz2;*.tar.xz;*.tar.zst"),
                 ("ZIP文件", "*.zip"),
                 ("RAR文件", "*.rar"),
                 ("7Z文件", "*.7z"),
+                ("TAR文件", "*.tar;*.tar.gz;*.tgz;*.tar.bz2;*.tar.xz;*.tar.zst"),
                 ("所有文件", "*.*")
             ]
         )
@@ -493,9 +1018,23 @@ class ModernFileFilterApp:
             except:
                 self.file_info_label.config(text=f"✅ {file_name}")
 
+            self.open_listing(file_path)
+
+    def on_archive_entered(self, event=None):
+        """手动输入路径或 http(s) 地址后回车：打开预览列表"""
+        archive_path = self.archive_entry.get().strip()
+        if is_url(archive_path):
+            # 远程压缩包按需通过 Range 请求读取，预览只取中央目录
+            self.file_info_label.config(text=f"🌐 {archive_path}")
+            self.open_listing(archive_path)
+        elif os.path.isfile(archive_path):
+            self.file_info_label.config(text=f"✅ {os.path.basename(archive_path)}")
+            self.open_listing(archive_path)
+
     def clear_keywords(self):
         """清空关键字"""
         self.keyword_text.delete(1.0, tk.END)
+        self.on_keywords_changed()
 
     def format_file_size(self, size_bytes):
         """格式化文件大小"""
@@ -517,6 +1056,56 @@ class ModernFileFilterApp:
     def update_progress(self, value):
         """更新进度条"""
         self.progress_var.set(value)
+        self.progress_bar.place(x=0, y=0, relheight=1, relwidth=max(0.0, min(value, 100)) / 100)
+
+    def format_progress(self, snapshot):
+        """进度详情：数量、速度和预计剩余时间"""
+        return (f"{snapshot.files}/{snapshot.total_files} 个文件 · "
+                f"{snapshot.files_per_sec:.0f} 个/秒 · "
+                f"{snapshot.bytes_per_sec / (1024 * 1024):.1f} MB/秒 · "
+                f"剩余 {format_duration(snapshot.eta)}")
+
+    def poll_progress(self, progress):
+        """在主线程中按固定帧率读取处理线程的进度并刷新界面"""
+        status = None
+        for kind, args in progress.drain():
+            if kind == "status":
+                # 同一帧内的多次状态更新只显示最后一次
+                status = args
+            elif kind == "done":
+                if status:
+                    self.update_status(*status)
+                    status = None
+                self.update_progress(100)
+                self.show_completion_dialog(*args)
+            elif kind == "error":
+                if status:
+                    self.update_status(*status)
+                    status = None
+                messagebox.showerror("错误", f"处理失败: {args[0]}")
+            elif kind == "preview":
+                if status:
+                    self.update_status(*status)
+                    status = None
+                self.show_preview(*args)
+            elif kind == "preview_error":
+                if status:
+                    self.update_status(*status)
+                    status = None
+                messagebox.showerror("错误", f"预览失败: {args[0]}")
+
+        if status:
+            self.update_status(*status)
+
+        if progress.finished and not progress.events:
+            return
+
+        if progress.started is not None:
+            snapshot = progress.snapshot()
+            self.update_progress(snapshot.percent)
+            self.status_detail.config(text=self.format_progress(snapshot))
+
+        self.root.after(1000 // DEFAULT_FPS, lambda: self.poll_progress(progress))
 
     def preview_files(self):
         """预览文件"""
@@ -525,7 +1114,7 @@ class ModernFileFilterApp:
             messagebox.showerror("错误", "请选择压缩包文件")
             return
 
-        if not os.path.exists(archive_path):
+        if not is_url(archive_path) and not os.path.exists(archive_path):
             messagebox.showerror("错误", "压缩包文件不存在")
             return
 
@@ -535,30 +1124,78 @@ class ModernFileFilterApp:
             return
 
         try:
-            keywords = [k.strip() for k in keywords_text.split('\n') if k.strip()]
-
-            matched_count = 0
-            total_count = 0
-
-            with zipfile.ZipFile(archive_path, 'r') as zip_file:
-                file_list = [f for f in zip_file.filelist if not f.is_dir()]
-                total_count = len(file_list)
+            matcher = KeywordMatcher(parse_keywords(keywords_text), self.keyword_mode())
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
 
-                for file_info in file_list:
-                    filename = file_info.filename
-                    for keyword in keywords:
-                        if keyword.lower() in filename.lower():
-                            matched_count += 1
-                            break
+        if self.previewing is not None and self.previewing.is_alive():
+            return
 
-            messagebox.showinfo("预览结果",
+        # 界面控件只在主线程读取；读取中央目录和抽样测速在线程中进行，不阻塞界面
+        try:
+            workers = max(1, self.workers_var.get())
+        except tk.TclError:
+            workers = 1
+        options = ProcessOptions(self.operation_var.get(), workers=workers,
+                                 pool_kind=self.pool_var.get(),
+                                 unmatched_policy=self.unmatched_var.get(),
+                                 match_target=self.match_target_var.get())
+        self.update_status("正在预览...", "读取成员列表并抽样测速", "🔄")
+        progress = ProgressTracker()
+        self.previewing = threading.Thread(target=self.preview_files_thread,
+                                           args=(archive_path, matcher, options, progress))
+        self.previewing.daemon = True
+        self.previewing.start()
+        self.poll_progress(progress)
+
+    def preview_files_thread(self, archive_path, matcher, options, progress):
+        """在线程中预览并生成处理计划，结果通过 progress 传回主线程显示"""
+        try:
+            result = self.engine.preview(archive_path, matcher, options)
+            # 处理计划：各磁盘需要的空间、剩余空间和预计耗时
+            plan = self.engine.plan(archive_path, matcher, default_output_dir(), options,
+                                    measure=True)
+            progress.status("预览完成", f"匹配: {result.matched_count}/{result.total_count}", "✅")
+            progress.post("preview", result, plan)
+        except Exception as e:
+            progress.status("预览失败", str(e), "❌")
+            progress.post("preview_error", str(e))
+        finally:
+            progress.finish()
+
+    def show_preview(self, result, plan):
+        """显示预览结果，询问是否保存处理计划"""
+        total_count, matched_count = result.total_count, result.matched_count
+        try:
+            plan_lines = []
+            for volume in plan.volumes():
+                state = "✅" if volume.required + RESERVE_BYTES <= volume.free else "❌ 空间不足"
+                plan_lines.append(f"{volume.path}\n需要 {self.format_file_size(volume.required)}，"
+                                  f"剩余 {self.format_file_size(volume.free)} {state}")
+            if plan.estimated_seconds is not None:
+                plan_lines.append(f"预计耗时: {format_duration(plan.estimated_seconds)}")
+
+            save = messagebox.askyesno("预览结果",
                               f"预览完成！\n\n"
                               f"总文件数: {total_count}\n"
                               f"匹配文件: {matched_count}\n"
-                              f"未匹配文件: {total_count - matched_count}")
+                              f"未匹配文件: {total_count - matched_count}\n\n"
+                              f"跳过未匹配文件可少解压 "
+                              f"{self.format_file_size(result.unmatched_bytes)}"
+                              f"（共 {self.format_file_size(result.total_bytes)}），"
+                              f"少读取 {self.format_file_size(result.unmatched_compressed_bytes)}\n\n"
+                              + "\n".join(plan_lines) +
+                              "\n\n是否把处理计划（每个文件的目标路径）保存为 JSON 文件？")
+            if save:
+                plan_path = filedialog.asksaveasfilename(title="保存处理计划",
+                                                         defaultextension=".json",
+                                                         filetypes=[("JSON 文件", "*.json")])
+                if plan_path:
+                    plan.write_json(plan_path)
 
         except Exception as e:
-            messagebox.showerror("错误", f"预览失败: {str(e)}")
+            messagebox.showerror("错误", f"保存处理计划失败: {str(e)}")
 
     def start_processing(self):
         """开始处理"""
@@ -567,7 +1204,7 @@ class ModernFileFilterApp:
             messagebox.showerror("错误", "请选择压缩包文件")
             return
 
-        if not os.path.exists(archive_path):
+        if not is_url(archive_path) and not os.path.exists(archive_path):
             messagebox.showerror("错误", "压缩包文件不存在")
             return
 
@@ -576,97 +1213,74 @@ class ModernFileFilterApp:
             messagebox.showerror("错误", "请输入关键字")
             return
 
-        thread = threading.Thread(target=self.process_files_thread,
-                                 args=(archive_path, keywords_text))
-        thread.daemon = True
-        thread.start()
-
-    def process_files_thread(self, archive_path, keywords_text):
-        """在线程中处理文件"""
         try:
-            self.update_status("正在处理...", "解压和筛选文件中", "🔄")
-            self.update_progress(0)
-
-            keywords = [k.strip() for k in keywords_text.split('\n') if k.strip()]
-            operation_mode = self.operation_var.get()
-
-            desktop = os.path.join(os.path.expanduser("~"), "Desktop")
-            output_dir = os.path.join(desktop, "FileMover_Output")
-            matched_dir = os.path.join(output_dir, "匹配文件")
-            unmatched_dir = os.path.join(output_dir, "未匹配文件")
+            matcher = KeywordMatcher(parse_keywords(keywords_text), self.keyword_mode())
+        except ValueError as e:
+            messagebox.showerror("错误", str(e))
+            return
 
-            for d in [output_dir, matched_dir, unmatched_dir]:
-                os.makedirs(d, exist_ok=True)
+        self.save_keywords()
 
-            matched_count, total_count = self.process_archive_files(
-                archive_path, keywords, matched_dir, unmatched_dir, operation_mode)
+        # 界面控件只在主线程读取，处理线程拿到的是普通值
+        operation_mode = self.operation_var.get()
+        extract_mode = EXTRACT_STREAM if self.streaming_var.get() else EXTRACT_TEMP
+        try:
+            workers = max(1, self.workers_var.get())
+        except tk.TclError:
+            workers = 1
+        pool_kind = self.pool_var.get()
+
+        self.update_status("正在处理...", "解压和筛选文件中", "🔄")
+        self.update_progress(0)
+
+        options = ProcessOptions(operation_mode, extract_mode, workers, pool_kind,
+                                 self.unmatched_var.get(), incremental=self.incremental_var.get(),
+                                 dedup=self.dedup_var.get(), nested=self.nested_var.get(),
+                                 match_target=self.match_target_var.get(),
+                                 repack=REPACK_ZIP if self.repack_var.get() else None,
+                                 low_memory=self.low_memory_var.get(),
+                                 durability=self.durability_var.get())
+        progress = ProgressTracker()
+        profile = RunProfile() if self.profile_var.get() else None
+        thread = threading.Thread(target=self.process_files_thread,
+                                 args=(archive_path, matcher, options, progress, profile))
+        thread.daemon = True
+        thread.start()
+        self.processing = (thread, progress)
 
-            self.update_status("处理完成", f"匹配: {matched_count}/{total_count}", "✅")
-            self.update_progress(100)
+        self.poll_progress(progress)
 
-            self.root.after(0, lambda: self.show_completion_dialog(output_dir, matched_count, total_count))
+    def process_files_thread(self, archive_path, matcher, options, progress, profile=None):
+        """在线程中处理文件（不直接操作界面，进度和结果通过 progress 传回主线程）"""
+        try:
+            output_dir = default_output_dir()
+            result = self.engine.process(archive_path, matcher, output_dir, options, progress,
+                                         profile)
+            matched_count, total_count = result.matched_count, result.total_count
+            if profile is not None:
+                profile.finish()
+                profile.write_json(os.path.join(output_dir, PROFILE_NAME))
+
+            detail = f"匹配: {matched_count}/{total_count}"
+            if result.skipped_count:
+                detail += f"，未变化跳过: {result.skipped_count}"
+            if result.dedup_count:
+                detail += (f"，去重: {result.dedup_count} 个文件"
+                           f"（少写 {result.dedup_bytes / 1024 / 1024:.1f} MB，"
+                           f"约省 {result.dedup_seconds:.1f} 秒）")
+            progress.status("处理完成", detail, "✅")
+            progress.post("done", output_dir, matched_count, total_count)
+
+        except ProcessCancelled:
+            # 窗口正在关闭，运行日志已在引擎中关闭，下次运行从这里继续
+            pass
 
         except Exception as e:
-            self.update_status("处理失败", str(e), "❌")
-            self.root.after(0, lambda: messagebox.showerror("错误", f"处理失败: {str(e)}"))
-
-    def process_archive_files(self, archive_path, keywords, matched_dir, unmatched_dir, operation_mode):
-        """处理压缩包文件"""
-        matched_count = 0
-        total_count = 0
-
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                with zipfile.ZipFile(archive_path, 'r') as zip_file:
-                    file_list = [f for f in zip_file.filelist if not f.is_dir()]
-                    total_count = len(file_list)
-
-                    for i, file_info in enumerate(file_list):
-                        progress = (i + 1) / total_count * 100
-                        self.update_progress(progress)
-
-                        filename = file_info.filename
-
-                        is_matched = False
-                        for keyword in keywords:
-                            if keyword.lower() in filename.lower():
-                                is_matched = True
-                                break
-
-                        try:
-                            zip_file.extract(file_info, temp_dir)
-                            source_path = os.path.join(temp_dir, filename)
-
-                            target_dir = matched_dir if is_matched else unmatched_dir
-                            target_path = os.path.join(target_dir, os.path.basename(filename))
-
-                            counter = 1
-                            original_target = target_path
-                            while os.path.exists(target_path):
-                                name, ext = os.path.splitext(original_target)
-                                target_path = f"{name}_{counter}{ext}"
-                                counter += 1
-
-                            if operation_mode == "move":
-                                shutil.move(source_path, target_path)
-                            elif operation_mode == "copy":
-                                shutil.copy2(source_path, target_path)
-                            elif operation_mode == "link":
-                                if platform.system() == "Windows":
-                                    shutil.copy2(source_path, target_path)
-                                else:
-                                    os.symlink(source_path, target_path)
-
-                            if is_matched:
-                                matched_count += 1
-
-                        except Exception as e:
-                            continue
-
-            except Exception as e:
-                raise Exception(f"无法处理压缩包: {e}")
+            progress.status("处理失败", str(e), "❌")
+            progress.post("error", str(e))
 
-        return matched_count, total_count
+        finally:
+            progress.finish()
 
     def show_completion_dialog(self, output_dir, matched_count, total_count):
         """处理完成后直接打开文件夹"""
@@ -688,10 +1302,21 @@ class ModernFileFilterApp:
 
     def on_closing(self):
         """窗口关闭事件"""
+        if self.listing is not None:
+            self.listing.close()
+        self.save_keywords()
+        if self.processing is not None:
+            thread, progress = self.processing
+            progress.cancel()
+            # 等处理线程写完当前成员、关闭运行日志；迟迟不结束（单个成员很大）时照常退出，
+            # 写到一半的成员在下次运行时删除重写
+            thread.join(PROCESS_STOP_TIMEOUT)
         self.root.destroy()
 
 
 if __name__ == "__main__":
+    # 打包后的程序使用进程池时需要
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ModernFileFilterApp(root)
     root.mainloop()
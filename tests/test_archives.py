@@ -0,0 +1,82 @@
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from filemover.archives import open_archive
+from filemover.engine import FileMoverEngine, ProcessOptions
+from filemover.matcher import KeywordMatcher
+
+
+def read_members(path, wanted=None):
+    with open_archive(path) as archive:
+        return [(entry.position, entry.name, stream.read())
+                for entry, stream in archive.iter_members(wanted)]
+
+
+@pytest.fixture
+def seven_zip(tmp_path):
+    py7zr = pytest.importorskip("py7zr")
+    path = str(tmp_path / "a.7z")
+    with py7zr.SevenZipFile(path, "w") as archive:
+        archive.writestr(b"first", "d/report.txt")
+        archive.writestr(b"", "d/empty.txt")
+        archive.writestr(b"other", "d/other.txt")
+        # 同名成员
+        archive.writestr(b"second", "d/report.txt")
+    return path
+
+
+def test_7z_members_with_same_name(seven_zip):
+    assert sorted(read_members(seven_zip)) == [
+        (0, "d/report.txt", b"first"),
+        (1, "d/empty.txt", b""),
+        (2, "d/other.txt", b"other"),
+        (3, "d/report.txt", b"second"),
+    ]
+
+
+def test_7z_wanted_subset(seven_zip):
+    members = read_members(seven_zip, lambda entry: entry.position in (1, 3))
+    assert sorted(members) == [(1, "d/empty.txt", b""), (3, "d/report.txt", b"second")]
+
+
+def test_7z_process_keeps_both_same_named_members(seven_zip, tmp_path):
+    output_dir = str(tmp_path / "out")
+    result = FileMoverEngine().process(seven_zip, KeywordMatcher(["report"]), output_dir,
+                                       ProcessOptions("copy"))
+    assert (result.matched_count, result.failed_count) == (2, 0)
+    matched = os.path.join(output_dir, "匹配文件")
+    contents = set()
+    for name in os.listdir(matched):
+        with open(os.path.join(matched, name), "rb") as f:
+            contents.add(f.read())
+    assert contents == {b"first", b"second"}
+
+
+@pytest.fixture(params=[False, True], ids=["normal", "solid"])
+def rar(tmp_path, request):
+    pytest.importorskip("rarfile")
+    if shutil.which("rar") is None:
+        pytest.skip("需要 rar 命令生成测试用的压缩包")
+    source = tmp_path / "src"
+    for name, data in [("a/report.txt", b"first"), ("b/report.txt", b"second"),
+                       ("b/other.txt", b"other")]:
+        (source / name).parent.mkdir(parents=True, exist_ok=True)
+        (source / name).write_bytes(data)
+    path = str(tmp_path / "a.rar")
+    args = ["rar", "a", "-idq", "-r"] + (["-s"] if request.param else [])
+    subprocess.run(args + [path, "a", "b"], cwd=source, check=True)
+    return path
+
+
+def test_rar_members(rar):
+    members = {name: data for _, name, data in read_members(rar)}
+    assert members == {"a/report.txt": b"first", "b/report.txt": b"second",
+                       "b/other.txt": b"other"}
+
+
+def test_rar_wanted_subset(rar):
+    members = read_members(rar, lambda entry: entry.name.endswith("report.txt"))
+    assert sorted(data for _, _, data in members) == [b"first", b"second"]
@@ -0,0 +1,65 @@
+import os
+import zipfile
+
+import pytest
+
+from filemover.batch import BatchScheduler
+from filemover.engine import MATCHED_DIR_NAME, ProcessOptions, open_journal
+from filemover.linking import STORE_DIR_NAME
+from filemover.matcher import KeywordMatcher
+
+
+def make_zip(path, prefix, count):
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(count):
+            zf.writestr(f"d/key_{i}.txt", f"{prefix}{i}")
+
+
+@pytest.mark.parametrize("pool_kind", ["thread", "process"])
+def test_batch_link_mode_uses_content_store(tmp_path, pool_kind):
+    archives = [str(tmp_path / "a.zip"), str(tmp_path / "b.zip")]
+    make_zip(archives[0], "a", 20)
+    make_zip(archives[1], "b", 20)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("link", durability="batch")
+
+    results = BatchScheduler(2, pool_kind, options=options).run(
+        archives, KeywordMatcher(["key"]), output_dir)
+
+    assert [(r.matched_count, r.failed_count, r.error) for r in results] == [(20, 0, None)] * 2
+    for archive in ("a", "b"):
+        assert os.path.isdir(os.path.join(output_dir, archive, STORE_DIR_NAME))
+        assert len(os.listdir(os.path.join(output_dir, archive, MATCHED_DIR_NAME))) == 20
+
+
+def test_merged_batch_resumes_without_duplicates(tmp_path):
+    """合并输出时续传：上次写到一半的文件先删除，按原来的名字重新写出，不被别的压缩包占用"""
+    archives = [str(tmp_path / "a.zip"), str(tmp_path / "b.zip")]
+    make_zip(archives[0], "a", 50)
+    make_zip(archives[1], "b", 50)
+    output_dir = str(tmp_path / "out")
+    matched_dir = os.path.join(output_dir, MATCHED_DIR_NAME)
+    matcher = KeywordMatcher(["key"])
+    options = ProcessOptions("copy")
+
+    # 模拟中断：a.zip 的前 10 个成员已完成，第 10 个写到一半
+    journal = open_journal(output_dir, archives[0], matcher, options, options.output_writer())
+    os.makedirs(matched_dir)
+    with zipfile.ZipFile(archives[0]) as zf:
+        infos = zf.infolist()
+    for i in range(11):
+        target_path = os.path.join(matched_dir, f"key_{i}.txt")
+        journal.reserve([(i, target_path)])
+        with open(target_path, "w") as f:
+            f.write(f"a{i}" if i < 10 else "partial")
+        if i < 10:
+            journal.record(i, infos[i].CRC)
+    journal.close()
+
+    results = BatchScheduler(2, merge=True, options=options).run(archives, matcher, output_dir)
+
+    assert [r.matched_count for r in results] == [50, 50]
+    assert len(os.listdir(matched_dir)) == 100
+    for i in range(50):
+        with open(os.path.join(matched_dir, f"key_{i}.txt")) as f:
+            assert f.read() == f"a{i}"
@@ -0,0 +1,35 @@
+import io
+
+import pytest
+
+from filemover.content import ContentMatcher
+from filemover.matcher import KeywordMatcher
+
+
+def scan(keyword, data):
+    found, _ = ContentMatcher(KeywordMatcher([keyword])).scan(io.BytesIO(data))
+    return found
+
+
+@pytest.mark.parametrize("keyword, data", [
+    ("report", b"Quarterly REPORT 2024"),
+    # 資 的 GBK 编码为 D9 59，第二个字节是 ASCII 的 Y，数据转小写时会被一起转换
+    ("資料", "客戶資料表".encode("gbk")),
+    ("資料", "客戶資料表".encode("utf-8")),
+    # 非 ASCII 字母的大小写由关键字的各种写法覆盖
+    ("Ärger", "viel Ärger".encode("utf-8")),
+    ("Ärger", "VIEL ÄRGER".encode("utf-8")),
+    ("ärger", "Viel Ärger".encode("utf-8")),
+])
+def test_substring_keyword_found(keyword, data):
+    assert scan(keyword, data)
+
+
+def test_substring_keyword_not_found():
+    assert not scan("資料", "客戶清單".encode("gbk"))
+
+
+def test_keyword_across_chunks():
+    data = b"x" * 10 + "資料".encode("gbk") + b"y" * 10
+    content = ContentMatcher(KeywordMatcher(["資料"]), chunk_size=11)
+    assert content.scan(io.BytesIO(data))[0]
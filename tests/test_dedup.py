@@ -0,0 +1,70 @@
+import csv
+import os
+import zipfile
+
+import pytest
+
+from filemover.dedup import DEDUP_LINK, DEDUP_MANIFEST, DEDUP_MANIFEST_NAME, DedupPlan
+from filemover.engine import MATCHED_DIR_NAME, FileMoverEngine, ProcessOptions
+from filemover.index import ArchiveIndex, ZipMemberReader
+from filemover.matcher import KeywordMatcher
+
+DATA = b"same content " * 1000
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("a/key_1.txt", DATA, zipfile.ZIP_DEFLATED)
+        zf.writestr("b/key_2.txt", b"other " * 100, zipfile.ZIP_DEFLATED)
+        # 压缩方式不同、内容相同
+        zf.writestr("c/key_3.txt", DATA, zipfile.ZIP_STORED)
+        zf.writestr("d/key_4.txt", DATA, zipfile.ZIP_DEFLATED)
+        zf.writestr("e/key_5.txt", b"")
+        zf.writestr("f/key_6.txt", b"")
+
+
+def test_plan_groups_same_content(tmp_path):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    index = ArchiveIndex.build(path)
+    with ZipMemberReader(path) as reader:
+        plan = DedupPlan.build(reader, index, range(len(index)))
+    # 空文件不去重
+    assert plan.duplicates == {2: 0, 3: 0}
+    assert plan.leaders == {0}
+    assert plan.hashed_bytes > 0
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_process_links_duplicates(tmp_path, workers):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("copy", workers=workers, dedup=DEDUP_LINK)
+
+    result = FileMoverEngine().process(path, KeywordMatcher(["key"]), output_dir, options)
+
+    assert (result.matched_count, result.dedup_count, result.dedup_bytes) == \
+        (6, 2, 2 * len(DATA))
+    matched_dir = os.path.join(output_dir, MATCHED_DIR_NAME)
+    inodes = {os.stat(os.path.join(matched_dir, f"key_{i}.txt")).st_ino for i in (1, 3, 4)}
+    assert len(inodes) == 1
+    with open(os.path.join(matched_dir, "key_4.txt"), "rb") as f:
+        assert f.read() == DATA
+
+
+def test_manifest_lists_duplicates_without_writing(tmp_path):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("copy", dedup=DEDUP_MANIFEST)
+
+    result = FileMoverEngine().process(path, KeywordMatcher(["key"]), output_dir, options)
+
+    assert result.dedup_count == 2
+    assert sorted(os.listdir(os.path.join(output_dir, MATCHED_DIR_NAME))) == \
+        ["key_1.txt", "key_2.txt", "key_5.txt", "key_6.txt"]
+    with open(os.path.join(output_dir, DEDUP_MANIFEST_NAME), encoding="utf-8") as f:
+        rows = list(csv.reader(f, delimiter="\t"))[1:]
+    assert [row[0] for row in rows] == ["c/key_3.txt", "d/key_4.txt"]
+    assert all(row[3].endswith("key_1.txt") for row in rows)
@@ -0,0 +1,26 @@
+import os
+import zipfile
+
+from filemover.engine import FileMoverEngine, ProcessOptions
+from filemover.incremental import crc_cache_path
+from filemover.matcher import KeywordMatcher
+
+
+def test_crc_cache_is_kept_outside_result_folders(tmp_path):
+    archive_path = str(tmp_path / "a.zip")
+    names = [f"key_{i}.txt" for i in range(5)] + [".filemover_crc.tsv"]
+    with zipfile.ZipFile(archive_path, "w") as zf:
+        for name in names:
+            zf.writestr(f"d/{name}", name)
+    output_dir = str(tmp_path / "out")
+    matched_dir = os.path.join(output_dir, "匹配文件")
+    matcher = KeywordMatcher(["key", "crc"])
+    options = ProcessOptions("copy", incremental=True)
+
+    FileMoverEngine().process(archive_path, matcher, output_dir, options)
+    result = FileMoverEngine().process(archive_path, matcher, output_dir, options)
+
+    assert result.skipped_count == len(names)
+    # 与缓存旧文件名相同的成员照常写出，不改名为 _1
+    assert sorted(os.listdir(matched_dir)) == sorted(names)
+    assert os.path.exists(crc_cache_path(matched_dir))
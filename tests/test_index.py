@@ -0,0 +1,116 @@
+import os
+import struct
+import zipfile
+
+from filemover.index import (ArchiveIndex, ArchiveIndexCache, ZipMemberReader, _zip64_fields,
+                             iter_central_blocks)
+
+
+def make_zip(path, count=50, comment=b""):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("目录/", b"")
+        for i in range(count):
+            zf.writestr(f"目录/报告_{i}.txt", f"内容 {i}".encode() * (i + 1))
+        zf.writestr(zipfile.ZipInfo("plain.txt"), b"ascii")
+        zf.comment = comment
+
+
+def assert_same_as_zipfile(index, path):
+    with zipfile.ZipFile(path) as zf:
+        infos = [info for info in zf.infolist() if not info.is_dir()]
+    assert len(index) == len(infos)
+    for i, info in enumerate(infos):
+        file_info = index.zipinfo(i)
+        assert file_info.filename == info.filename
+        assert (file_info.file_size, file_info.compress_size, file_info.CRC) == \
+            (info.file_size, info.compress_size, info.CRC)
+        assert file_info.date_time == info.date_time
+
+
+def test_index_matches_zipfile(tmp_path):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    index = ArchiveIndex.build(path)
+    assert_same_as_zipfile(index, path)
+    with ZipMemberReader(path) as reader:
+        assert reader.open(index.zipinfo(2)).read() == "内容 2".encode() * 3
+
+
+def test_comment_with_end_signature_and_prepended_data(tmp_path):
+    """注释中含结尾记录签名、压缩包前附加了数据（自解压程序）"""
+    reference = str(tmp_path / "a.zip")
+    make_zip(reference)
+    path = str(tmp_path / "b.zip")
+    make_zip(path, comment=b"PK\005\006" + b"\0" * 30)
+    with open(path, "rb") as f:
+        data = f.read()
+    sfx = str(tmp_path / "b.exe")
+    with open(sfx, "wb") as f:
+        f.write(b"MZ" + b"\0" * 1000 + data)
+
+    # zipfile 会把注释中的签名当作结尾记录，只能与不带注释的同样内容比较
+    index = ArchiveIndex.build(sfx)
+    assert_same_as_zipfile(index, reference)
+    with ZipMemberReader(sfx) as reader:
+        assert reader.open(index.zipinfo(0)).read() == "内容 0".encode()
+
+
+def test_small_blocks_split_headers(tmp_path):
+    """文件头跨块时接到下一块继续解析"""
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    with open(path, "rb") as f:
+        blocks = [(base, [index.name(i) for i in range(len(index))])
+                  for base, index in iter_central_blocks(f, block_size=100)]
+    names = [name for _, block in blocks for name in block]
+    assert names == list(ArchiveIndex.build(path).iter_names())
+    assert [base for base, _ in blocks] == \
+        [sum(len(block) for _, block in blocks[:k]) for k in range(len(blocks))]
+
+
+def test_zip64_extra_fields():
+    """只有标记为 0xFFFFFFFF 的字段从 ZIP64 扩展字段中按顺序读出"""
+    extra = struct.pack("<2H", 0x5455, 4) + b"\0" * 4 + \
+        struct.pack("<2H2Q", 0x0001, 16, 5 << 32, 7 << 32)
+    assert list(_zip64_fields(extra, 0xFFFFFFFF, 10, 0xFFFFFFFF)) == [5 << 32, 10, 7 << 32]
+    assert list(_zip64_fields(b"", 1, 2, 3)) == [1, 2, 3]
+
+
+def test_cache_reuses_and_rebuilds_changed_archive(tmp_path):
+    path = str(tmp_path / "a.zip")
+    make_zip(path, 10)
+    cache = ArchiveIndexCache()
+    index = cache.get(path)
+    assert cache.get(path) is index
+    assert cache.find(path) is index
+
+    make_zip(path, 20)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+    assert cache.find(path) is None
+    assert len(cache.get(path)) == 21
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    paths = [str(tmp_path / f"{name}.zip") for name in "abc"]
+    for path in paths:
+        make_zip(path, 100)
+    size = ArchiveIndex.build(paths[0]).nbytes
+    cache = ArchiveIndexCache(max_bytes=size * 2)
+
+    a = cache.get(paths[0])
+    cache.get(paths[1])
+    # 最近用过 a，加入 c 时淘汰的是 b
+    assert cache.get(paths[0]) is a
+    cache.get(paths[2])
+    assert cache.find(paths[0]) is a
+    assert cache.find(paths[1]) is None
+    assert cache.find(paths[2]) is not None
+
+
+def test_cache_keeps_oversized_latest_index(tmp_path):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    cache = ArchiveIndexCache(max_bytes=1)
+    index = cache.get(path)
+    assert cache.find(path) is index
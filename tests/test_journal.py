@@ -0,0 +1,121 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from filemover.engine import FileMoverEngine, ProcessOptions
+from filemover.journal import RunJournal, journal_path
+from filemover.matcher import KeywordMatcher
+from filemover.progress import ProcessCancelled, ProgressTracker
+
+SETTINGS = {"matcher": ["substring", ["key"]]}
+
+
+def write(path, data=b"x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def test_resume_removes_unrecorded_targets(tmp_path):
+    root = str(tmp_path / "out")
+    path = str(tmp_path / "out.journal" / "a.log")
+    done = os.path.join(root, "匹配文件", "key 1.txt")
+    partial = os.path.join(root, "匹配文件", "key 2.txt")
+
+    journal = RunJournal(path, SETTINGS, root=root)
+    journal.reserve([(0, done), (1, partial)])
+    write(done)
+    journal.record(0, 0x1234)
+    write(partial)
+    # 模拟进程被杀：缓冲区中的记录交给操作系统，但不 fsync、不正常关闭
+    journal._file.flush()
+    journal._file.close()
+
+    resumed = RunJournal(path, SETTINGS, root=root)
+    resumed.recover()
+    assert resumed.is_done(0, 0x1234)
+    assert not resumed.is_done(1, 0x5678)
+    assert os.path.exists(done)
+    assert not os.path.exists(partial)
+    resumed.close(complete=True)
+    assert not os.path.exists(path)
+
+
+def test_reused_name_is_not_removed(tmp_path):
+    """写出失败后名字被释放、由后面的成员写出并完成，不算未完成"""
+    root = str(tmp_path / "out")
+    path = str(tmp_path / "out.journal" / "a.log")
+    target = os.path.join(root, "匹配文件", "key.txt")
+
+    journal = RunJournal(path, SETTINGS, root=root)
+    journal.reserve([(0, target)])
+    journal.reserve([(1, target)])
+    write(target)
+    journal.record(1, 0x1)
+    journal.close()
+
+    resumed = RunJournal(path, SETTINGS, root=root)
+    resumed.recover()
+    assert os.path.exists(target)
+
+
+def test_changed_settings_discard_journal(tmp_path):
+    path = str(tmp_path / "out.journal" / "a.log")
+    journal = RunJournal(path, SETTINGS)
+    journal.record(0, 0x1)
+    journal.close()
+    assert not RunJournal(path, {"matcher": ["substring", ["other"]]}).is_done(0, 0x1)
+
+
+class CancellingTracker(ProgressTracker):
+    """处理到第 stop_at 个成员时取消，相当于界面关闭窗口"""
+
+    def __init__(self, stop_at):
+        super().__init__()
+        self.stop_at = stop_at
+
+    def advance(self, files=1, nbytes=0):
+        if self.files >= self.stop_at:
+            self.cancel()
+        super().advance(files, nbytes)
+
+
+def make_tar(path, count):
+    with tarfile.open(path, "w") as tf:
+        for i in range(count):
+            data = f"{i}".encode()
+            info = tarfile.TarInfo(f"d/key_{i}.txt")
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+
+def make_zip(path, count):
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(count):
+            zf.writestr(f"d/key_{i}.txt", f"{i}")
+
+
+@pytest.mark.parametrize("suffix, options", [
+    (".zip", {"workers": 1}),
+    (".zip", {"workers": 2}),
+    (".zip", {"low_memory": True}),
+    (".tar", {}),
+])
+def test_cancelled_run_resumes_without_duplicates(tmp_path, suffix, options):
+    archive_path = str(tmp_path / f"a{suffix}")
+    (make_zip if suffix == ".zip" else make_tar)(archive_path, 1000)
+    output_dir = str(tmp_path / "out")
+    matcher = KeywordMatcher(["key"])
+    options = ProcessOptions("copy", pool_kind="thread", **options)
+
+    with pytest.raises(ProcessCancelled):
+        FileMoverEngine().process(archive_path, matcher, output_dir, options, CancellingTracker(300))
+    assert os.path.exists(journal_path(output_dir, archive_path))
+
+    result = FileMoverEngine().process(archive_path, matcher, output_dir, options)
+    assert result.matched_count == 1000
+    assert sorted(os.listdir(os.path.join(output_dir, "匹配文件"))) == \
+        sorted(f"key_{i}.txt" for i in range(1000))
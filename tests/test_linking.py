@@ -0,0 +1,91 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from filemover import linking
+from filemover.archives import ArchiveEntry
+from filemover.index import ZipMemberReader
+from filemover.linking import LINK_COPY, LINK_HARD, ContentStore, link_or_copy, reflink
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("d/key.txt", b"data" * 100)
+    with zipfile.ZipFile(path) as zf:
+        return zf.getinfo("d/key.txt")
+
+
+def test_hard_link(tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"data")
+    target = tmp_path / "b.txt"
+    assert link_or_copy(str(source), str(target)) == LINK_HARD
+    assert os.stat(target).st_nlink == 2
+
+
+def test_falls_back_to_copy(tmp_path, monkeypatch):
+    """硬链接和 reflink 都不行（跨文件系统、不支持写时复制）时复制"""
+    def refuse(*args):
+        raise OSError("不支持")
+
+    monkeypatch.setattr(os, "link", refuse)
+    monkeypatch.setattr(linking, "reflink", refuse)
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"data")
+    target = tmp_path / "b.txt"
+    assert link_or_copy(str(source), str(target)) == LINK_COPY
+    assert target.read_bytes() == b"data"
+    assert os.stat(target).st_nlink == 1
+
+
+def test_failed_reflink_leaves_no_file(tmp_path):
+    source = tmp_path / "a.txt"
+    source.write_bytes(b"data")
+    target = tmp_path / "b.txt"
+    try:
+        reflink(str(source), str(target))
+    except OSError:
+        assert not target.exists()
+    else:
+        pytest.skip("文件系统支持 reflink")
+
+
+def test_store_extracts_once(tmp_path, monkeypatch):
+    archive_path = str(tmp_path / "a.zip")
+    file_info = make_zip(archive_path)
+    store = ContentStore(str(tmp_path / "store"), archive_path)
+    extracted = []
+    stream_member = linking.stream_member
+
+    def counting(reader, info, target_path, writer=None):
+        extracted.append(info.filename)
+        stream_member(reader, info, target_path, writer)
+
+    monkeypatch.setattr(linking, "stream_member", counting)
+    with ZipMemberReader(archive_path) as reader:
+        store.place(reader, file_info, str(tmp_path / "1.txt"))
+        store.place(reader, file_info, str(tmp_path / "2.txt"))
+        assert extracted == ["d/key.txt"]
+
+        # 内容库中大小不对的（写到一半的）文件重新解压
+        with open(store.path_for(file_info), "r+b") as f:
+            f.truncate(10)
+        store.place(reader, file_info, str(tmp_path / "3.txt"))
+    assert len(extracted) == 2
+    assert (tmp_path / "3.txt").read_bytes() == b"data" * 100
+    assert not [name for _, _, files in os.walk(store.root) for name in files
+                if name.endswith(".part")]
+
+
+def test_stream_members_without_crc_are_kept_apart(tmp_path):
+    archive_path = tmp_path / "a.tar"
+    archive_path.write_bytes(b"")
+    store = ContentStore(str(tmp_path / "store"), str(archive_path))
+    first = ArchiveEntry("d/key.txt", 4, None, None, None, 0)
+    second = ArchiveEntry("d/key.txt", 4, None, None, None, 1)
+    store.place_stream(first, io.BytesIO(b"aaaa"), str(tmp_path / "1.txt"))
+    store.place_stream(second, io.BytesIO(b"bbbb"), str(tmp_path / "2.txt"))
+    assert (tmp_path / "1.txt").read_bytes() == b"aaaa"
+    assert (tmp_path / "2.txt").read_bytes() == b"bbbb"
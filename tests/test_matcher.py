@@ -0,0 +1,29 @@
+import pytest
+
+from filemover.matcher import MATCH_REGEX, KeywordMatcher
+
+
+def test_substring_ignores_case():
+    matcher = KeywordMatcher(["Report", "订单"])
+    assert matcher.match("data/REPORT_2024.csv")
+    assert matcher.match("导出/订单明细.xlsx")
+    assert not matcher.match("data/other.csv")
+
+
+def test_regex_keywords():
+    matcher = KeywordMatcher([r"^log/\d+\.txt$", "inv(oice)?"], MATCH_REGEX)
+    assert matcher.match("log/123.txt")
+    assert matcher.match("INVOICE.pdf")
+    assert not matcher.match("log/abc.txt")
+
+
+@pytest.mark.parametrize("keywords", [
+    ["(unclosed"],
+    # 单独有效，合并后同名的组重复定义
+    ["(?P<id>a)", "(?P<id>b)"],
+    # 单独有效，合并后全局标志不在开头
+    ["abc", "(?i)def"],
+])
+def test_invalid_regex_raises_value_error(keywords):
+    with pytest.raises(ValueError):
+        KeywordMatcher(keywords, MATCH_REGEX)
@@ -0,0 +1,94 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from filemover.engine import MATCHED_DIR_NAME, UNMATCHED_DIR_NAME, FileMoverEngine, ProcessOptions
+from filemover.matcher import KeywordMatcher
+from filemover.nested import (BudgetReader, NestedLimitExceeded, NestedLimits, spool_member,
+                              virtual_path)
+
+
+def zip_bytes(members):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buf.getvalue()
+
+
+def make_nested(path, bomb_size=0):
+    """outer.zip -> inner.zip（含 report.txt 和 deep.zip -> report_deep.txt）"""
+    deep = zip_bytes({"report_deep.txt": b"deep"})
+    inner = zip_bytes({"report.txt": b"inner", "other.txt": b"x", "deep.zip": deep})
+    members = {"top.txt": b"top", "d/inner.zip": inner}
+    if bomb_size:
+        members["bomb.zip"] = zip_bytes({"zeros.bin": b"\0" * bomb_size})
+    with open(path, "wb") as f:
+        f.write(zip_bytes(members))
+
+
+def test_limits():
+    limits = NestedLimits(max_depth=2, max_bytes=10)
+    assert limits.can_descend("a.zip", 1)
+    assert not limits.can_descend("a.zip", 2)
+    assert not limits.can_descend("a.txt", 0)
+
+    reader = BudgetReader(io.BytesIO(b"x" * 20), limits)
+    assert reader.read(10) == b"x" * 10
+    with pytest.raises(NestedLimitExceeded):
+        reader.read(1)
+    assert limits.exhausted
+    assert virtual_path("", "a.zip") == "a.zip"
+    assert virtual_path("a.zip", "b.txt") == "a.zip/b.txt"
+
+
+def test_spool_member_spills_to_disk():
+    limits = NestedLimits(spill_bytes=100)
+    with spool_member(io.BytesIO(b"x" * 50), limits) as small:
+        assert not small._rolled
+        assert small.read() == b"x" * 50
+    with spool_member(io.BytesIO(b"y" * 500), limits) as large:
+        assert large._rolled
+        assert large.read() == b"y" * 500
+    assert limits.used_bytes == 550
+
+
+def test_nested_members_match_virtual_paths(tmp_path):
+    path = str(tmp_path / "outer.zip")
+    make_nested(path)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("copy", nested=True)
+
+    result = FileMoverEngine().process(path, KeywordMatcher(["inner.zip/"]), output_dir, options)
+
+    # 关键字按 d/inner.zip/deep.zip/report_deep.txt 这样的完整虚拟路径匹配
+    assert (result.matched_count, result.total_count, result.failed_count) == (3, 4, 0)
+    assert sorted(os.listdir(os.path.join(output_dir, MATCHED_DIR_NAME))) == \
+        ["other.txt", "report.txt", "report_deep.txt"]
+    assert os.listdir(os.path.join(output_dir, UNMATCHED_DIR_NAME)) == ["top.txt"]
+
+
+def test_depth_limit_writes_container_as_file(tmp_path):
+    path = str(tmp_path / "outer.zip")
+    make_nested(path)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("copy", nested=True, nested_depth=1)
+
+    FileMoverEngine().process(path, KeywordMatcher(["report"]), output_dir, options)
+
+    assert "deep.zip" in os.listdir(os.path.join(output_dir, UNMATCHED_DIR_NAME))
+    assert "report_deep.txt" not in os.listdir(os.path.join(output_dir, MATCHED_DIR_NAME))
+
+
+def test_byte_limit_stops_bomb(tmp_path):
+    path = str(tmp_path / "outer.zip")
+    make_nested(path, bomb_size=8 * 1024 * 1024)
+    output_dir = str(tmp_path / "out")
+    options = ProcessOptions("copy", nested=True, nested_max_bytes=1024 * 1024)
+
+    result = FileMoverEngine().process(path, KeywordMatcher(["report"]), output_dir, options)
+
+    assert result.failed_count >= 1
+    assert "zeros.bin" not in os.listdir(os.path.join(output_dir, UNMATCHED_DIR_NAME))
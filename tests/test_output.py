@@ -0,0 +1,95 @@
+import io
+import os
+import pickle
+
+import pytest
+
+from filemover.journal import RunJournal
+from filemover.output import (DURABILITY_BATCH, DURABILITY_FILE, DURABILITY_NONE,
+                              PREALLOCATE_MIN_BYTES, OutputWriter)
+
+
+def write_files(writer, directory, count):
+    for i in range(count):
+        writer.write(io.BytesIO(b"x" * i), os.path.join(directory, f"{i}.txt"), i)
+
+
+def test_durability_levels_fsync_counts(tmp_path):
+    none = OutputWriter(DURABILITY_NONE)
+    write_files(none, str(tmp_path), 5)
+    none.sync()
+    assert none.fsyncs == 0
+
+    # 每个文件连同所在目录
+    per_file = OutputWriter(DURABILITY_FILE)
+    write_files(per_file, str(tmp_path), 5)
+    assert per_file.fsyncs == 10
+
+    # 每 3 个文件一次：3 个文件加 1 个目录；剩下的由 sync 补上
+    batch = OutputWriter(DURABILITY_BATCH, sync_every=3)
+    write_files(batch, str(tmp_path), 7)
+    assert batch.fsyncs == 8
+    batch.sync()
+    assert batch.fsyncs == 10
+    batch.sync()
+    assert batch.fsyncs == 10
+
+
+def test_journal_syncs_output_first(tmp_path, monkeypatch):
+    """运行日志 fsync 之前，已记录成员的输出先落盘"""
+    if not os.path.isdir("/proc/self/fd"):
+        pytest.skip("需要 /proc/self/fd")
+    synced = []
+    real_fsync = os.fsync
+
+    def fsync(fd):
+        synced.append(os.readlink(f"/proc/self/fd/{fd}"))
+        real_fsync(fd)
+
+    writer = OutputWriter(DURABILITY_BATCH, sync_every=1000)
+    journal = RunJournal(str(tmp_path / "out.journal" / "a.log"), {}, before_sync=writer.sync,
+                         sync_every=1)
+    target_path = str(tmp_path / "a.txt")
+    writer.write(io.BytesIO(b"data"), target_path, 4)
+    monkeypatch.setattr(os, "fsync", fsync)
+    journal.record(0, 0x1)
+    journal.close()
+    assert synced.index(target_path) < synced.index(journal.path)
+
+
+def test_failed_write_removes_partial_file(tmp_path):
+    class Broken(io.RawIOBase):
+        def __init__(self):
+            self.reads = 0
+
+        def read(self, size=-1):
+            self.reads += 1
+            if self.reads > 1:
+                raise OSError("读取失败")
+            return b"x" * size
+
+    target_path = str(tmp_path / "a.bin")
+    with pytest.raises(OSError):
+        OutputWriter().write(Broken(), target_path, 4 * 1024 * 1024)
+    assert not os.path.exists(target_path)
+
+
+def test_preallocated_file_is_truncated_to_data(tmp_path):
+    target_path = str(tmp_path / "a.bin")
+    written = OutputWriter().write(io.BytesIO(b"short"), target_path, PREALLOCATE_MIN_BYTES * 2)
+    assert written == 5
+    assert os.path.getsize(target_path) == 5
+
+
+def test_pickled_writer_keeps_settings_not_pending(tmp_path):
+    writer = OutputWriter(DURABILITY_BATCH, sync_every=10)
+    write_files(writer, str(tmp_path), 2)
+    copy = pickle.loads(pickle.dumps(writer))
+    assert (copy.durability, copy.sync_every) == (DURABILITY_BATCH, 10)
+    copy.sync()
+    assert copy.fsyncs == 0
+
+
+def test_unknown_durability():
+    with pytest.raises(ValueError):
+        OutputWriter("always")
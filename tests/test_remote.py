@@ -0,0 +1,168 @@
+import os
+import threading
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from filemover.engine import MATCHED_DIR_NAME, ArchiveError, FileMoverEngine, ProcessOptions
+from filemover.matcher import KeywordMatcher
+from filemover.remote import (DEFAULT_BLOCK_SIZE, RangeReader, RemoteError, forget, remote_file,
+                              remote_stats)
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """只支持 Range 请求的静态文件服务，带强 ETag，If-Match 不符时返回 412"""
+
+    def do_GET(self):
+        data, etag = self.server.files[self.path]
+        self.server.headers.append(dict(self.headers))
+        if_match = self.headers.get("If-Match")
+        if if_match is not None and if_match != etag:
+            self.send_error(412)
+            return
+        start, end = self.headers["Range"][len("bytes="):].split("-")
+        start, end = int(start), min(int(end), len(data) - 1)
+        self.server.ranges.append((start, end))
+        self.send_response(206)
+        self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data[start:end + 1])
+
+    def log_message(self, *args):
+        pass
+
+
+class PlainHandler(RangeHandler):
+    """不理会 Range，总是返回整个文件"""
+
+    def do_GET(self):
+        data, _ = self.server.files[self.path]
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except ConnectionError:
+            # 客户端看到 200 就断开了
+            pass
+
+
+def start_server(handler):
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.files = {}
+    httpd.ranges = []
+    httpd.headers = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    return httpd
+
+
+@pytest.fixture
+def server():
+    httpd = start_server(RangeHandler)
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def serve(server, name, data, etag='"v1"'):
+    server.files[f"/{name}"] = (data, etag)
+    url = f"http://127.0.0.1:{server.server_address[1]}/{name}"
+    forget(url)
+    return url
+
+
+def make_zip(path):
+    """成员数据远大于中央目录的压缩包"""
+    with zipfile.ZipFile(path, "w") as zf:
+        for i in range(8):
+            zf.writestr(f"d/key_{i}.bin", os.urandom(512 * 1024))
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_url_preview_fetches_only_tail_and_central_directory(tmp_path, server):
+    data = make_zip(str(tmp_path / "a.zip"))
+    url = serve(server, "a.zip", data)
+    engine = FileMoverEngine()
+    matcher = KeywordMatcher(["key"])
+
+    result = engine.preview(url, matcher)
+    plan = engine.plan(url, matcher, str(tmp_path / "out"), ProcessOptions("copy"), measure=True)
+
+    assert result.matched_count == 8
+    assert len(plan.entries) == 8
+    assert plan.estimated_seconds is None
+    stats = remote_stats(url)
+    # 确认 Range 的 1 字节，加上结尾记录和中央目录所在的块（可能跨一个块边界）
+    tail = 2 * DEFAULT_BLOCK_SIZE
+    assert stats.bytes_fetched <= 1 + tail
+    assert all(start == 0 or start >= len(data) - tail for start, _ in server.ranges)
+
+
+def test_reader_reads_across_blocks(tmp_path, server):
+    data = make_zip(str(tmp_path / "a.zip"))
+    url = serve(server, "a.zip", data)
+    reader = RangeReader(remote_file(url))
+    start = DEFAULT_BLOCK_SIZE - 10
+    reader.seek(start)
+    assert reader.read(DEFAULT_BLOCK_SIZE * 3) == data[start:start + DEFAULT_BLOCK_SIZE * 3]
+    reader.seek(-5, os.SEEK_END)
+    assert reader.read() == data[-5:]
+    assert reader.read() == b""
+
+
+def test_process_url(tmp_path, server):
+    path = str(tmp_path / "a.zip")
+    make_zip(path)
+    with open(path, "rb") as f:
+        url = serve(server, "a.zip", f.read())
+    output_dir = str(tmp_path / "out")
+
+    result = FileMoverEngine().process(url, KeywordMatcher(["key_1", "key_2"]), output_dir,
+                                       ProcessOptions("copy", workers=2))
+
+    assert (result.matched_count, result.failed_count) == (2, 0)
+    with zipfile.ZipFile(path) as zf:
+        for name in ("key_1.bin", "key_2.bin"):
+            with open(os.path.join(output_dir, MATCHED_DIR_NAME, name), "rb") as f:
+                assert f.read() == zf.read(f"d/{name}")
+
+
+def test_replaced_file_raises(tmp_path, server):
+    """确认 Range 之后的请求带 If-Match；文件被替换后返回 412，报错并丢弃缓存"""
+    data = make_zip(str(tmp_path / "a.zip"))
+    url = serve(server, "a.zip", data)
+    remote = remote_file(url)
+    remote.read(0, 100)
+    assert server.headers[-1]["If-Match"] == '"v1"'
+
+    server.files["/a.zip"] = (data, '"v2"')
+    with pytest.raises(RemoteError, match="替换"):
+        remote.read(len(data) - 100, len(data))
+    assert remote_file(url) is not remote
+    assert remote_file(url).etag == '"v2"'
+
+
+def test_weak_etag_is_not_used_for_if_match(tmp_path, server):
+    data = make_zip(str(tmp_path / "a.zip"))
+    url = serve(server, "a.zip", data, etag='W/"v1"')
+    remote_file(url).read(0, 100)
+    assert "If-Match" not in server.headers[-1]
+
+
+def test_server_without_range_support(tmp_path):
+    httpd = start_server(PlainHandler)
+    try:
+        data = make_zip(str(tmp_path / "a.zip"))
+        url = serve(httpd, "a.zip", data)
+        with pytest.raises(RemoteError, match="Range"):
+            remote_file(url)
+        with pytest.raises(ArchiveError, match="Range"):
+            FileMoverEngine().preview(url, KeywordMatcher(["key"]))
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
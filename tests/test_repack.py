@@ -0,0 +1,97 @@
+import io
+import os
+import tarfile
+import zipfile
+
+import pytest
+
+from filemover import repack
+from filemover.engine import UNMATCHED_SKIP, FileMoverEngine, ProcessOptions, repack_paths
+from filemover.matcher import KeywordMatcher
+from filemover.repack import REPACK_TAR, REPACK_ZIP
+
+MEMBERS = {
+    "d/key_small.txt": b"small",
+    "d/key_large.bin": os.urandom(64 * 1024) * 40,
+    "d/other.txt": b"other " * 1000,
+    "e/key_empty.txt": b"",
+}
+
+
+def make_zip(path):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in MEMBERS.items():
+            method = zipfile.ZIP_STORED if name.endswith(".bin") else zipfile.ZIP_DEFLATED
+            zf.writestr(zipfile.ZipInfo(name, (2020, 1, 2, 3, 4, 6)), data, method)
+
+
+def make_tar(path):
+    with tarfile.open(path, "w") as tf:
+        for name, data in MEMBERS.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = 1600000000
+            tf.addfile(info, io.BytesIO(data))
+
+
+def read_output(path, fmt):
+    if fmt == REPACK_ZIP:
+        with zipfile.ZipFile(path) as zf:
+            assert zf.testzip() is None
+            return {info.filename: zf.read(info) for info in zf.infolist()}
+    with tarfile.open(path) as tf:
+        return {info.name: tf.extractfile(info).read() for info in tf.getmembers()}
+
+
+def repack_archive(tmp_path, source, fmt, **options):
+    archive_path = str(tmp_path / f"a.{source}")
+    (make_zip if source == "zip" else make_tar)(archive_path)
+    output_dir = str(tmp_path / "out")
+    result = FileMoverEngine().process(archive_path, KeywordMatcher(["key"]), output_dir,
+                                       ProcessOptions("copy", repack=fmt, **options))
+    return archive_path, output_dir, result
+
+
+@pytest.mark.parametrize("source, fmt", [("zip", REPACK_ZIP), ("zip", REPACK_TAR),
+                                         ("tar", REPACK_ZIP), ("tar", REPACK_TAR)])
+def test_repack_splits_members(tmp_path, source, fmt):
+    archive_path, output_dir, result = repack_archive(tmp_path, source, fmt)
+
+    assert (result.matched_count, result.total_count, result.failed_count) == (3, 4, 0)
+    unmatched_path, matched_path = repack_paths(output_dir, archive_path, fmt)
+    matched = read_output(matched_path, fmt)
+    assert matched == {name: data for name, data in MEMBERS.items() if "key" in name}
+    assert read_output(unmatched_path, fmt) == {"d/other.txt": MEMBERS["d/other.txt"]}
+    assert not [name for name in os.listdir(output_dir) if name.endswith(".part")]
+
+
+def test_zip_to_zip_copies_compressed_data(tmp_path):
+    archive_path, output_dir, _ = repack_archive(tmp_path, "zip", REPACK_ZIP)
+    _, matched_path = repack_paths(output_dir, archive_path, REPACK_ZIP)
+    with zipfile.ZipFile(archive_path) as src, zipfile.ZipFile(matched_path) as dst:
+        for info in dst.infolist():
+            original = src.getinfo(info.filename)
+            assert (info.compress_type, info.compress_size, info.CRC, info.date_time) == \
+                (original.compress_type, original.compress_size, original.CRC,
+                 original.date_time)
+
+
+@pytest.mark.parametrize("source", ["zip", "tar"])
+def test_zip64_records(tmp_path, monkeypatch, source):
+    """超过界限时写 ZIP64 记录（把界限调小，不用生成几 GB 的数据）"""
+    monkeypatch.setattr(repack, "ZIP64_LIMIT", 1000)
+    monkeypatch.setattr(repack, "ZIP_FILECOUNT_LIMIT", 1)
+    archive_path, output_dir, _ = repack_archive(tmp_path, source, REPACK_ZIP)
+    _, matched_path = repack_paths(output_dir, archive_path, REPACK_ZIP)
+    with open(matched_path, "rb") as f:
+        assert b"PK\006\006" in f.read()
+    assert read_output(matched_path, REPACK_ZIP) == \
+        {name: data for name, data in MEMBERS.items() if "key" in name}
+
+
+def test_skip_unmatched_writes_one_archive(tmp_path):
+    archive_path, output_dir, _ = repack_archive(tmp_path, "zip", REPACK_ZIP,
+                                                 unmatched_policy=UNMATCHED_SKIP)
+    unmatched_path, matched_path = repack_paths(output_dir, archive_path, REPACK_ZIP)
+    assert os.path.exists(matched_path)
+    assert not os.path.exists(unmatched_path)
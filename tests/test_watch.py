@@ -0,0 +1,157 @@
+import os
+import time
+
+import pytest
+
+from filemover import watch
+from filemover.engine import ProcessOptions, ProcessResult
+from filemover.matcher import KeywordMatcher
+from filemover.watch import FolderWatcher
+
+SETTLE = 5.0
+
+
+class Clock:
+    """可以拨快的时钟，代替 watch 模块中的 time"""
+
+    def __init__(self):
+        self.offset = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.offset
+
+    def time(self):
+        return time.time() + self.offset
+
+    def advance(self, seconds):
+        self.offset += seconds
+
+
+class RecordingEngine:
+    """记录处理过的压缩包；during(path) 在处理中调用（模拟处理期间文件又被改写）"""
+
+    def __init__(self, during=None):
+        self.processed = []
+        self.during = during
+
+    def process(self, archive_path, matcher, output_dir, options):
+        self.processed.append(os.path.basename(archive_path))
+        if self.during is not None:
+            self.during(archive_path)
+        return ProcessResult(1, 1, 0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(watch, "time", clock)
+    return clock
+
+
+def make_watcher(tmp_path, engine=None):
+    inbound = tmp_path / "inbound"
+    inbound.mkdir(exist_ok=True)
+    return FolderWatcher(str(inbound), str(tmp_path / "out"), KeywordMatcher(["key"]),
+                         ProcessOptions("copy"), interval=0.01, settle=SETTLE,
+                         engine=engine or RecordingEngine())
+
+
+def drop(watcher, name, data=b"PK", age=0.0):
+    path = os.path.join(watcher.directory, name)
+    with open(path, "wb") as f:
+        f.write(data)
+    if age:
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_new_file_waits_until_settled(tmp_path, clock):
+    watcher = make_watcher(tmp_path)
+    path = drop(watcher, "a.zip")
+    watcher.scan()
+    assert watcher.ready == []
+
+    # 仍在写入：大小变化后重新计时
+    clock.advance(SETTLE - 1)
+    drop(watcher, "a.zip", b"PK more")
+    watcher.scan()
+    clock.advance(SETTLE - 1)
+    watcher.scan()
+    assert watcher.ready == []
+
+    clock.advance(1)
+    watcher.scan()
+    assert watcher.ready == [path]
+    item = watcher.pending[path]
+    assert item.queued - item.seen == pytest.approx(2 * SETTLE - 1, abs=0.5)
+
+
+def test_existing_file_is_queued_at_once(tmp_path, clock):
+    watcher = make_watcher(tmp_path)
+    path = drop(watcher, "a.zip", age=SETTLE * 2)
+    drop(watcher, "notes.txt", age=SETTLE * 2)
+    drop(watcher, "b.zip.part", age=SETTLE * 2)
+    watcher.scan()
+    assert watcher.ready == [path]
+
+
+def test_queued_file_that_changes_is_withdrawn(tmp_path, clock):
+    watcher = make_watcher(tmp_path)
+    path = drop(watcher, "a.zip")
+    watcher.scan()
+    clock.advance(SETTLE)
+    watcher.scan()
+    assert watcher.ready == [path]
+
+    drop(watcher, "a.zip", b"PK rewritten")
+    watcher.scan()
+    assert watcher.ready == []
+    os.remove(path)
+    watcher.scan()
+    assert watcher.idle()
+
+
+def test_processed_files_are_remembered(tmp_path, clock):
+    engine = RecordingEngine()
+    watcher = make_watcher(tmp_path, engine)
+    path = drop(watcher, "a.zip", age=SETTLE * 2)
+    watcher.run(once=True)
+    assert engine.processed == ["a.zip"]
+    assert watcher.results[0].error is None
+
+    # 重启后不再处理；替换成新版本时重新处理
+    restarted = make_watcher(tmp_path, engine)
+    restarted.run(once=True)
+    assert engine.processed == ["a.zip"]
+    drop(watcher, "a.zip", b"PK new version", age=SETTLE)
+    restarted.run(once=True)
+    assert engine.processed == ["a.zip", "a.zip"]
+
+    # 文件被取走后状态中的条目随之删除
+    os.remove(path)
+    restarted.scan()
+    assert restarted.state.done == {}
+
+
+def test_file_changed_while_processing_is_requeued(tmp_path, clock):
+    def rewrite(path):
+        with open(path, "ab") as f:
+            f.write(b" appended")
+
+    engine = RecordingEngine(rewrite)
+    watcher = make_watcher(tmp_path, engine)
+    path = drop(watcher, "a.zip", age=SETTLE * 2)
+    watcher.scan()
+    watcher._process(*watcher._take())
+    assert engine.processed == ["a.zip"]
+    assert path not in watcher.state.done
+
+    # 改写后的文件按新文件等待稳定，再处理一次
+    engine.during = None
+    watcher.scan()
+    assert watcher.ready == []
+    clock.advance(SETTLE)
+    watcher.run(once=True)
+    assert engine.processed == ["a.zip", "a.zip"]
+    assert path in watcher.state.done